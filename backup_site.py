@@ -1,11 +1,16 @@
 import os
+import argparse
+import hashlib
+import json
 import httpx
 import asyncio
 import aiofiles
 import zipfile
 import logging
 import base64
+import shutil
 import subprocess
+import tempfile
 from datetime import datetime
 from discord_webhook import DiscordWebhook
 from tqdm.asyncio import tqdm_asyncio
@@ -22,7 +27,11 @@ BACKUP_TEMP_DIR = "/tmp/site_backups/"
 DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL") 
 # PixelDrain API 金鑰
 PIXELDRAN_API_KEY = os.getenv("PIXELDRAN_API_KEY") 
+# 上傳端點 (檔名會接在後面)，可改指向本機的測試伺服器
+PIXELDRAIN_UPLOAD_URL = os.getenv("PIXELDRAIN_UPLOAD_URL", "https://pixeldrain.com/api/file/")
 LOG_FILE = "/var/log/novel_site_backup.log"
+# 增量備份的 manifest：上次備份時每個媒體檔的大小、mtime 與雜湊，以及已備份過的物件
+MANIFEST_PATH = os.getenv("BACKUP_MANIFEST_PATH", "/var/lib/novel_site_backup/manifest.json")
 
 # 資料庫設定
 DB_NAME = os.getenv("DB_NAME")
@@ -34,57 +43,239 @@ DB_HOST = os.getenv("DB_HOST", "localhost")
 logging.basicConfig(filename=LOG_FILE, level=logging.INFO,
                     format="%(asctime)s - %(levelname)s - %(message)s")
 
+# 串流讀寫的區塊大小；資料庫傾印、打包與上傳的記憶體用量都以此為上限
+CHUNK_SIZE = 1024 * 1024
+# 本身已壓縮的格式直接存入 zip，不再浪費 CPU 重新壓縮
+STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.avif', '.zip', '.gz', '.zst', '.mp4', '.webm'}
+
+def compress_type_for(path):
+    ext = os.path.splitext(path)[1].lower()
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+def dump_database_into(zipf, arcname):
+    """
+    將 pg_dump 的輸出直接串流寫入 zip 內的檔案，不落地成暫存的 .sql。
+    stderr 導向暫存檔，避免輸出過多時塞滿 pipe 造成 pg_dump 卡住。
+    """
+    # 設定環境變數以避免密碼提示
+    env = os.environ.copy()
+    if DB_PASSWORD:
+        env['PGPASSWORD'] = DB_PASSWORD
+
+    dump_command = [
+        'pg_dump',
+        '-h', DB_HOST,
+        '-U', DB_USER,
+        '-d', DB_NAME,
+    ]
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(dump_command, stdout=subprocess.PIPE, stderr=stderr, env=env)
+        try:
+            with zipf.open(arcname, 'w', force_zip64=True) as dest:
+                shutil.copyfileobj(process.stdout, dest, CHUNK_SIZE)
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        if returncode != 0:
+            stderr.seek(0)
+            raise subprocess.CalledProcessError(
+                returncode, dump_command, stderr=stderr.read().decode('utf-8', 'replace')
+            )
+
 def backup_and_zip_site(media_path, backup_dir):
     """
     傾印資料庫並將網站媒體檔案打包成 zip。
+    資料庫與媒體檔都以區塊串流寫入，記憶體用量與備份大小無關。
     """
+    zip_filepath = None
     try:
         os.makedirs(backup_dir, exist_ok=True)
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        
-        # 1. 傾印 PostgreSQL 資料庫
-        db_dump_path = os.path.join(backup_dir, f"db_dump_{timestamp}.sql")
-        logging.info(f"正在傾印資料庫至 {db_dump_path}...")
-        
-        # 設定環境變數以避免密碼提示
-        env = os.environ.copy()
-        env['PGPASSWORD'] = DB_PASSWORD
-        
-        dump_command = [
-            'pg_dump',
-            '-h', DB_HOST,
-            '-U', DB_USER,
-            '-d', DB_NAME,
-            '-f', db_dump_path
-        ]
-        subprocess.run(dump_command, check=True, env=env, capture_output=True, text=True)
-        logging.info("資料庫傾印完成。")
-
-        # 2. 打包所有資源
+
         zip_filename = f"site_backup_{timestamp}.zip"
         zip_filepath = os.path.join(backup_dir, zip_filename)
         logging.info(f"正在打包網站資源至 {zip_filepath}...")
-        
+
         with zipfile.ZipFile(zip_filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # 添加資料庫備份檔
-            zipf.write(db_dump_path, os.path.basename(db_dump_path))
-            # 添加所有媒體檔案
+            # 1. 傾印 PostgreSQL 資料庫 (直接寫入 zip)
+            logging.info("正在傾印資料庫...")
+            dump_database_into(zipf, f"db_dump_{timestamp}.sql")
+            logging.info("資料庫傾印完成。")
+
+            # 2. 添加所有媒體檔案
             for root, _, files in os.walk(media_path):
                 for file in files:
                     full_path = os.path.join(root, file)
                     rel_path = os.path.relpath(full_path, media_path)
-                    zipf.write(full_path, os.path.join('media', rel_path)) # 在 zip 內也建立 media 目錄
+                    # 在 zip 內也建立 media 目錄
+                    zipf.write(full_path, os.path.join('media', rel_path), compress_type=compress_type_for(file))
 
-        # 清理資料庫傾印檔案
-        os.remove(db_dump_path)
-        
         return zip_filepath
     except Exception as e:
         logging.error(f"備份與打包時發生錯誤: {e}")
         if isinstance(e, subprocess.CalledProcessError):
             logging.error(f"pg_dump Stderr: {e.stderr}")
+        # 清理打包到一半的檔案
+        if zip_filepath and os.path.exists(zip_filepath):
+            os.remove(zip_filepath)
+        raise
+
+# --- 增量備份 ---
+# 媒體檔以內容的 SHA-256 命名存放 (objects/ab/abcdef...)，相同內容的上傳只存一份。
+# 每份增量備份包含：資料庫傾印、當下完整的 snapshot.json (路徑 -> 雜湊)，
+# 以及先前備份中還沒有的物件。第一次執行 (或 --reset) 會包含所有物件，成為還原鏈的起點。
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def object_name(digest):
+    return f"objects/{digest[:2]}/{digest}"
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'files': {}, 'objects': [], 'chain': []}
+
+def save_manifest(manifest, manifest_path):
+    """先寫入暫存檔再取代，避免寫到一半中斷留下損壞的 manifest。"""
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+def scan_media(media_path, previous_files):
+    """
+    列出所有媒體檔並取得雜湊。
+    大小與 mtime 都和上次相同的檔案直接沿用上次的雜湊，不重新讀取內容。
+    """
+    files = {}
+    hashed = 0
+    for root, _, names in os.walk(media_path):
+        for name in names:
+            full_path = os.path.join(root, name)
+            rel_path = os.path.relpath(full_path, media_path)
+            stat = os.stat(full_path)
+            previous = previous_files.get(rel_path)
+            if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+                digest = previous['sha256']
+            else:
+                digest = file_sha256(full_path)
+                hashed += 1
+            files[rel_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+    return files, hashed
+
+def backup_incremental(media_path, backup_dir, manifest):
+    """
+    打包一份增量備份，只放入先前的備份中沒有的物件。
+    回傳 (zip 路徑, 新的 manifest)；新的 manifest 應在上傳成功後才寫回。
+    """
+    zip_filepath = None
+    try:
+        os.makedirs(backup_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        zip_filepath = os.path.join(backup_dir, f"site_delta_{timestamp}.zip")
+
+        files, hashed = scan_media(media_path, manifest['files'])
+        known = set(manifest['objects'])
+        # 同一份內容可能出現在多個路徑，只打包一次
+        new_objects = {}
+        for rel_path, info in files.items():
+            if info['sha256'] not in known:
+                new_objects.setdefault(info['sha256'], rel_path)
+        logging.info(
+            f"媒體檔 {len(files)} 個，重新計算雜湊 {hashed} 個，新物件 {len(new_objects)} 個。"
+        )
+
+        with zipfile.ZipFile(zip_filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            logging.info("正在傾印資料庫...")
+            dump_database_into(zipf, "db_dump.sql")
+            logging.info("資料庫傾印完成。")
+
+            snapshot = {
+                'created_at': timestamp,
+                'base': manifest['chain'][0]['archive'] if manifest['chain'] else None,
+                'files': {rel_path: info['sha256'] for rel_path, info in files.items()},
+            }
+            zipf.writestr('snapshot.json', json.dumps(snapshot))
+
+            for digest, rel_path in new_objects.items():
+                zipf.write(
+                    os.path.join(media_path, rel_path), object_name(digest),
+                    compress_type=compress_type_for(rel_path)
+                )
+
+        new_manifest = {
+            'files': files,
+            'objects': sorted(known | set(new_objects)),
+            'chain': manifest['chain'] + [{'archive': os.path.basename(zip_filepath)}],
+        }
+        return zip_filepath, new_manifest
+    except Exception as e:
+        logging.error(f"增量備份時發生錯誤: {e}")
+        if isinstance(e, subprocess.CalledProcessError):
+            logging.error(f"pg_dump Stderr: {e.stderr}")
+        if zip_filepath and os.path.exists(zip_filepath):
+            os.remove(zip_filepath)
         raise
 
+def restore_chain(archives, target_dir):
+    """
+    依序套用一串增量備份 (第一個必須是完整的起點)，還原最後一份的狀態：
+    媒體檔寫到 target_dir/media/，資料庫傾印寫到 target_dir/db_dump.sql。
+    """
+    locations = {}
+    for archive in archives:
+        with zipfile.ZipFile(archive) as zipf:
+            for name in zipf.namelist():
+                if name.startswith('objects/'):
+                    locations[name] = archive
+
+    latest = archives[-1]
+    with zipfile.ZipFile(latest) as zipf:
+        snapshot = json.loads(zipf.read('snapshot.json'))
+        os.makedirs(target_dir, exist_ok=True)
+        with zipf.open('db_dump.sql') as src, open(os.path.join(target_dir, 'db_dump.sql'), 'wb') as dest:
+            shutil.copyfileobj(src, dest, CHUNK_SIZE)
+
+    missing = [path for path, digest in snapshot['files'].items() if object_name(digest) not in locations]
+    if missing:
+        raise FileNotFoundError(f"還原鏈缺少 {len(missing)} 個物件，例如 {missing[0]}；請確認已包含起點的完整備份。")
+
+    media_dir = os.path.realpath(os.path.join(target_dir, 'media'))
+    # 依所在的備份檔分組，每個 zip 只開啟一次
+    by_archive = {}
+    for rel_path, digest in snapshot['files'].items():
+        by_archive.setdefault(locations[object_name(digest)], []).append((rel_path, digest))
+
+    for archive, entries in by_archive.items():
+        with zipfile.ZipFile(archive) as zipf:
+            for rel_path, digest in entries:
+                dest_path = os.path.realpath(os.path.join(media_dir, rel_path))
+                if not dest_path.startswith(media_dir + os.sep):
+                    raise ValueError(f"不合法的路徑：{rel_path}")
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                with zipf.open(object_name(digest)) as src, open(dest_path, 'wb') as dest:
+                    shutil.copyfileobj(src, dest, CHUNK_SIZE)
+
+    logging.info(f"已從 {len(archives)} 份備份還原 {len(snapshot['files'])} 個媒體檔至 {target_dir}")
+    return len(snapshot['files'])
+
+async def iter_file_chunks(file_path, chunk_size=CHUNK_SIZE):
+    """以固定大小的區塊讀取檔案，作為上傳請求的串流 body。"""
+    async with aiofiles.open(file_path, 'rb') as f:
+        while True:
+            chunk = await f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
 async def upload_to_pixeldrain(file_path, api_key):
     try:
         file_name = os.path.basename(file_path)
@@ -92,10 +283,13 @@ async def upload_to_pixeldrain(file_path, api_key):
         logging.info(f"開始上傳至 PixelDrain (檔案大小: {file_size/1024**2:.2f} MB, 檔名: {file_name})")
         headers = { "Authorization": "Basic " + base64.b64encode(bytes(":" + api_key, 'utf-8')).decode('utf-8') }
         
-        async with aiofiles.open(file_path, 'rb') as f:
-            data = await f.read()
-            async with httpx.AsyncClient(timeout=None) as client:
-                response = await client.put(f"https://pixeldrain.com/api/file/{file_name}", content=data, headers=headers)
+        # 明確給出 Content-Length，串流上傳時就不會改用 chunked transfer encoding
+        headers["Content-Length"] = str(file_size)
+
+        async with httpx.AsyncClient(timeout=None) as client:
+            response = await client.put(
+                f"{PIXELDRAIN_UPLOAD_URL}{file_name}", content=iter_file_chunks(file_path), headers=headers
+            )
         response.raise_for_status()
         result = response.json()
         file_id = result.get('id')
@@ -118,18 +312,26 @@ def send_to_discord(file_id, webhook_url):
     except Exception as e:
         logging.error(f"發送 Discord 通知時發生錯誤: {e}")
 
-async def main():
+async def main(incremental=False, reset=False):
     zip_file = None # 確保變數存在
     try:
         logging.info("--- 開始每日網站備份任務 ---")
 
         # 1. 備份與打包
-        zip_file = backup_and_zip_site(MEDIA_ROOT, BACKUP_TEMP_DIR)
+        if incremental:
+            manifest = {'files': {}, 'objects': [], 'chain': []} if reset else load_manifest(MANIFEST_PATH)
+            zip_file, new_manifest = backup_incremental(MEDIA_ROOT, BACKUP_TEMP_DIR, manifest)
+        else:
+            zip_file = backup_and_zip_site(MEDIA_ROOT, BACKUP_TEMP_DIR)
         
         # 2. 上傳至 PixelDrain
         file_id = await upload_to_pixeldrain(zip_file, PIXELDRAN_API_KEY)
         
         if file_id:
+            if incremental:
+                # 上傳成功後才更新 manifest，否則下次的增量會漏掉這次的新物件
+                new_manifest['chain'][-1]['file_id'] = file_id
+                save_manifest(new_manifest, MANIFEST_PATH)
             # 3. 傳送到 Discord
             send_to_discord(file_id, DISCORD_WEBHOOK_URL)
         else:
@@ -149,5 +351,25 @@ async def main():
             logging.info(f"已刪除暫存備份檔：{zip_file}")
         logging.info("--- 備份任務結束 ---")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="網站資料庫與媒體檔備份")
+    subparsers = parser.add_subparsers(dest='command')
+
+    backup = subparsers.add_parser('backup', help="執行備份並上傳 (預設)")
+    backup.add_argument('--incremental', action='store_true', help="只打包上次備份後新增或變更的媒體檔")
+    backup.add_argument('--reset', action='store_true', help="忽略 manifest，重新建立完整的還原起點")
+
+    restore = subparsers.add_parser('restore', help="依序套用增量備份還原媒體檔與資料庫傾印")
+    restore.add_argument('target_dir')
+    restore.add_argument('archives', nargs='+', help="由舊到新排列的增量備份 zip，第一個為起點")
+
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    args = parse_args()
+    if args.command == 'restore':
+        restore_chain(args.archives, args.target_dir)
+    else:
+        asyncio.run(main(
+            incremental=getattr(args, 'incremental', False), reset=getattr(args, 'reset', False)
+        ))
@@ -1,4 +1,5 @@
 # novel_backend/core/admin.py
+from django import forms
 from django.contrib import admin
 from django.utils.html import format_html
 from .models import CustomUser, AuthorProfile, Novel, Chapter, Volume
@@ -57,8 +58,28 @@ class NovelAdmin(admin.ModelAdmin):
         }),
     )
 
+class ChapterAdminForm(forms.ModelForm):
+    # 內文存放在 ChapterContent，不是 Chapter 的欄位，透過 Chapter.content 讀寫
+    content = forms.CharField(label="內容", widget=forms.Textarea, required=False)
+
+    class Meta:
+        model = Chapter
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.initial.setdefault('content', self.instance.content)
+
+    def save(self, commit=True):
+        # 內文沒有修改時不重新寫入 ChapterContent
+        if 'content' in self.changed_data or self.instance._state.adding:
+            self.instance.content = self.cleaned_data['content']
+        return super().save(commit=commit)
+
 @admin.register(Chapter)
 class ChapterAdmin(admin.ModelAdmin):
+    form = ChapterAdminForm
     list_display = ('title', 'novel', 'volume', 'order')
     list_filter = ('novel', 'volume')
     search_fields = ('title', 'novel__title')
@@ -0,0 +1,187 @@
+# novel_backend/core/analytics.py
+"""
+作者後台的流量分析查詢。
+
+每日的章節觀看數存放在 ChapterDailyStat (由觀看次數計數器 flush 時累加)，
+日期區間的加總、每日趨勢與章節間的留存率都在 SQL 中算好，
+即使小說有上千章、累積數年的資料，每個查詢也只掃描 (novel, date) 索引上的一段範圍。
+"""
+from datetime import date, timedelta
+
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum, Value, Window
+from django.db.models.functions import Cast, Coalesce, FirstValue, Lag, NullIf
+from django.utils import timezone
+
+from .models import Novel, Chapter, ReadingProgress, ChapterDailyStat, NovelDailyStat
+
+# 未指定區間時預設顯示最近 30 天
+DEFAULT_RANGE_DAYS = 30
+
+# 一次查詢最多涵蓋的天數 (每日趨勢會為區間內的每一天產生一列)
+MAX_RANGE_DAYS = 366
+
+
+def parse_date_range(params):
+    """
+    從查詢參數取得 (start, end)，兩端都包含在內。
+    格式為 YYYY-MM-DD；格式錯誤、start 晚於 end、區間超過 MAX_RANGE_DAYS 天時拋出 ValueError。
+    """
+    end = date.fromisoformat(params['end']) if params.get('end') else timezone.localdate()
+    if params.get('start'):
+        start = date.fromisoformat(params['start'])
+    else:
+        try:
+            start = end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+        except OverflowError:
+            # 例如 end=0001-01-05，往前推會超出 date 的範圍
+            raise ValueError('end is too early')
+    check_date_range(start, end)
+    return start, end
+
+
+def check_date_range(start, end):
+    """start 晚於 end 或區間超過 MAX_RANGE_DAYS 天時拋出 ValueError。"""
+    if start > end:
+        raise ValueError('start must not be after end')
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        raise ValueError(f'date range must not exceed {MAX_RANGE_DAYS} days')
+
+
+def daily_views(novel_id, start, end):
+    """整本小說在區間內每天的觀看數，沒有觀看的日期補 0。"""
+    totals = dict(
+        ChapterDailyStat.objects.filter(novel_id=novel_id, date__range=(start, end))
+        .values('date')
+        .annotate(total=Sum('views'))
+        .values_list('date', 'total')
+    )
+    days = (end - start).days + 1
+    return [
+        {'date': day, 'views': totals.get(day, 0)}
+        for day in (start + timedelta(days=offset) for offset in range(days))
+    ]
+
+
+def retention_curve(novel_id, start, end):
+    """
+    已發布章節依閱讀順序排列的區間觀看數與留存率。
+    retention 是相對於第一章的比例，step 是相對於上一章的比例 (上一章為 0 時為 None)。
+    """
+    range_views = Coalesce(
+        Subquery(
+            ChapterDailyStat.objects.filter(novel_id=novel_id, chapter=OuterRef('pk'), date__range=(start, end))
+            .order_by()
+            .values('chapter')
+            .annotate(total=Sum('views'))
+            .values('total')
+        ),
+        0,
+    )
+    as_float = Cast(F('range_views'), FloatField())
+    chapters = (
+        Chapter.objects.filter(novel_id=novel_id, status=Chapter.Status.PUBLISHED)
+        .annotate(range_views=range_views)
+        .annotate(
+            retention=as_float / NullIf(Window(FirstValue('range_views'), order_by=F('order').asc()), Value(0)),
+            step=as_float / NullIf(Window(Lag('range_views'), order_by=F('order').asc()), Value(0)),
+        )
+        .order_by('order')
+        .values('id', 'title', 'order', 'range_views', 'retention', 'step')
+    )
+    return [
+        {
+            'id': chapter['id'],
+            'title': chapter['title'],
+            'order': chapter['order'],
+            'views': chapter['range_views'],
+            'retention': chapter['retention'],
+            'step': chapter['step'],
+        }
+        for chapter in chapters
+    ]
+
+
+def author_dashboard(author, start, end, top=10):
+    """
+    作者所有小說的流量總覽，固定以四個查詢完成，與小說數量、章節數量無關：
+    各小說的累計與區間數字、區間內觀看最多的章節 (先只在統計表上彙總，再取這幾章的標題)、
+    每日的觀看與收藏變化。
+    區間超過 MAX_RANGE_DAYS 天時拋出 ValueError (每日趨勢會為每一天產生一列)。
+    """
+    check_date_range(start, end)
+    novel_stats = NovelDailyStat.objects.filter(novel=OuterRef('pk'), date__range=(start, end)).order_by().values('novel')
+    bookmarks = ReadingProgress.objects.filter(novel=OuterRef('pk')).order_by().values('novel')
+    novels = list(
+        Novel.objects.filter(author=author)
+        .annotate(
+            bookmark_count=Coalesce(Subquery(bookmarks.annotate(c=Count('pk')).values('c')), 0),
+            range_views=Coalesce(Subquery(novel_stats.annotate(s=Sum('views')).values('s')), 0),
+            range_bookmarks=Coalesce(Subquery(novel_stats.annotate(s=Sum('bookmarks')).values('s')), 0),
+        )
+        .order_by('-updated_at')
+        .values(
+            'id', 'title', 'cover_image', 'status', 'views', 'published_chapter_count',
+            'bookmark_count', 'range_views', 'range_bookmarks',
+        )
+    )
+
+    novel_ids = [novel['id'] for novel in novels]
+    novel_titles = {novel['id']: novel['title'] for novel in novels}
+
+    # 統計表上的彙總可以只讀 (novel, date) 索引；不 JOIN 章節表，避免對每一列都帶上標題再分組
+    top_views = list(
+        ChapterDailyStat.objects.filter(novel_id__in=novel_ids, date__range=(start, end))
+        .values('chapter')
+        .annotate(range_views=Sum('views'))
+        .order_by('-range_views', 'chapter_id')
+        .values_list('chapter', 'range_views')[:top]
+    )
+    chapter_rows = {
+        chapter['id']: chapter
+        for chapter in Chapter.objects.filter(pk__in=[pk for pk, _ in top_views]).values('id', 'title', 'views', 'novel_id')
+    } if top_views else {}
+
+    # 收藏的每日增減從 start 取到今天，才能由目前的收藏總數往回推算每天結束時的累計
+    per_day = dict(
+        (day, (views, bookmarks_delta))
+        for day, views, bookmarks_delta in NovelDailyStat.objects.filter(novel_id__in=novel_ids, date__gte=start)
+        .values('date')
+        .annotate(views=Sum('views'), bookmarks=Sum('bookmarks'))
+        .values_list('date', 'views', 'bookmarks')
+    )
+    total_bookmarks = sum(novel['bookmark_count'] for novel in novels)
+    running = total_bookmarks - sum(delta for day, (_, delta) in per_day.items() if day > end)
+    daily = []
+    for offset in range((end - start).days, -1, -1):
+        day = start + timedelta(days=offset)
+        views, delta = per_day.get(day, (0, 0))
+        daily.append({'date': day, 'views': views, 'bookmarks': delta, 'total_bookmarks': running})
+        running -= delta
+    daily.reverse()
+
+    return {
+        'start': start,
+        'end': end,
+        'totals': {
+            'novels': len(novels),
+            'chapters': sum(novel['published_chapter_count'] for novel in novels),
+            'views': sum(novel['views'] for novel in novels),
+            'bookmarks': total_bookmarks,
+            'range_views': sum(novel['range_views'] for novel in novels),
+            'range_bookmarks': sum(novel['range_bookmarks'] for novel in novels),
+        },
+        'novels': novels,
+        'top_chapters': [
+            {
+                'id': pk,
+                'title': chapter_rows[pk]['title'],
+                'novel': chapter_rows[pk]['novel_id'],
+                'novel_title': novel_titles[chapter_rows[pk]['novel_id']],
+                'views': chapter_rows[pk]['views'],
+                'range_views': range_views,
+            }
+            # 彙總之後才被刪除的章節直接略過
+            for pk, range_views in top_views if pk in chapter_rows
+        ],
+        'daily': daily,
+    }
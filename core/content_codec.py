@@ -0,0 +1,63 @@
+# novel_backend/core/content_codec.py
+"""
+章節內文的壓縮與解壓縮。
+
+CHAPTER_CONTENT_CODEC 決定新寫入的內文格式：'plain' (預設，不壓縮)、'zlib' 或 'zstd'。
+短於 CHAPTER_CONTENT_COMPRESS_MIN_BYTES 的內文一律不壓縮，省下 CPU 也保留在 DB 端的可搜尋性。
+讀取時依每一列記錄的 codec 解碼，因此切換設定不需要重寫舊資料。
+zstd 需要另外安裝 zstandard 套件；未安裝時寫入會退回 zlib。
+"""
+import logging
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import zstandard
+except ImportError:  # 選用的相依套件
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+PLAIN = 'plain'
+ZLIB = 'zlib'
+ZSTD = 'zstd'
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def _configured_codec():
+    codec = getattr(settings, 'CHAPTER_CONTENT_CODEC', PLAIN) or PLAIN
+    if codec == ZSTD and zstandard is None:
+        logger.warning("CHAPTER_CONTENT_CODEC is 'zstd' but zstandard is not installed, falling back to zlib.")
+        return ZLIB
+    if codec not in (PLAIN, ZLIB, ZSTD):
+        raise ImproperlyConfigured(f"Unknown CHAPTER_CONTENT_CODEC: {codec!r}")
+    return codec
+
+
+def encode(text, codec=None):
+    """回傳 (codec, 純文字欄位, 二進位欄位)；未壓縮時內文放在純文字欄位。"""
+    text = text or ''
+    codec = codec or _configured_codec()
+    raw = text.encode('utf-8')
+    if codec == PLAIN or len(raw) < getattr(settings, 'CHAPTER_CONTENT_COMPRESS_MIN_BYTES', 1024):
+        return PLAIN, text, None
+    if codec == ZSTD:
+        return ZSTD, '', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return ZLIB, '', zlib.compress(raw, ZLIB_LEVEL)
+
+
+def decode(codec, text, data):
+    if codec == PLAIN:
+        return text
+    data = bytes(data)  # PostgreSQL 的 bytea 會以 memoryview 取回
+    if codec == ZLIB:
+        return zlib.decompress(data).decode('utf-8')
+    if codec == ZSTD:
+        if zstandard is None:
+            raise ImproperlyConfigured("Chapter content is zstd-compressed but zstandard is not installed.")
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    raise ValueError(f"Unknown chapter content codec: {codec!r}")
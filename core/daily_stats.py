@@ -0,0 +1,66 @@
+# novel_backend/core/daily_stats.py
+"""
+每日統計桶 (NovelDailyStat 等) 的累加。
+
+觀看次數由 view_counter 的 flush 批次寫入，收藏數由 ReadingProgress 的訊號逐筆寫入；
+兩者都以 INSERT ... ON CONFLICT DO UPDATE 把增量加到當天的那一列上，
+不需要先查詢該列是否存在，也不會因為並行寫入而重複建立。
+"""
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+
+def add_daily(model, key_fields, column, deltas, day=None):
+    """
+    把 {(外鍵 id, ...): 增量} 加到 model 在 day (預設為今天) 的 column 上。
+    key_fields 是外鍵欄位名稱，與 'date' 合起來必須是 model 的唯一鍵。
+    """
+    if not deltas:
+        return
+    day = day or timezone.localdate()
+
+    opts = model._meta
+    key_models = [opts.get_field(field).related_model for field in key_fields]
+
+    if connection.vendor != 'postgresql':
+        # 開發環境 (例如 SQLite) 逐列處理即可
+        with transaction.atomic():
+            for key, delta in deltas.items():
+                if not all(related.objects.filter(pk=value).exists() for related, value in zip(key_models, key)):
+                    continue
+                lookup = {f'{field}_id': value for field, value in zip(key_fields, key)}
+                row, _ = model.objects.get_or_create(date=day, **lookup)
+                model.objects.filter(pk=row.pk).update(**{column: models.F(column) + delta})
+        return
+
+    quote = connection.ops.quote_name
+    key_columns = [opts.get_field(field).column for field in key_fields]
+    # 資料庫端沒有預設值，其餘的計數欄位明確寫入 0
+    counter_columns = [
+        field.column for field in opts.concrete_fields
+        if not field.primary_key and field.column not in key_columns and field.name != 'date'
+    ]
+    columns = ', '.join(map(quote, key_columns + ['date'] + counter_columns))
+    placeholders = ', '.join(['%s'] * len(key_columns) + ['%s::date'] + ['%s'] * len(counter_columns))
+    values = ', '.join([f'({placeholders})'] * len(deltas))
+    params = []
+    # 固定順序寫入，多個 worker 同時 flush 時不會互相等待對方鎖住的列而死結
+    for key, delta in sorted(deltas.items()):
+        params.extend(key)
+        params.append(day)
+        params.extend(delta if name == column else 0 for name in counter_columns)
+
+    # 計數累積期間小說或章節可能已被刪除，略過這些列，不讓整批因外鍵錯誤而失敗
+    exists = ' AND '.join(
+        f'EXISTS (SELECT 1 FROM {quote(related._meta.db_table)} WHERE {quote(related._meta.pk.column)} = v.{quote(key_column)})'
+        for related, key_column in zip(key_models, key_columns)
+    )
+    table = quote(opts.db_table)
+    sql = (
+        f'INSERT INTO {table} ({columns}) '
+        f'SELECT {columns} FROM (VALUES {values}) AS v({columns}) WHERE {exists} '
+        f'ON CONFLICT ({", ".join(map(quote, key_columns + ["date"]))}) '
+        f'DO UPDATE SET {quote(column)} = {table}.{quote(column)} + EXCLUDED.{quote(column)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
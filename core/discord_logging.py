@@ -1,71 +1,233 @@
-
 import logging
 import os
+import sys
+import threading
+import time
 import traceback
+from collections import OrderedDict
 from discord_webhook import DiscordWebhook, DiscordEmbed
 
+# Discord 限制：每則訊息最多 10 個 embed，所有 embed 的文字合計不超過 6000 字
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_MESSAGE_CHARS = 5800
+# webhook 約每 2 秒 5 次，兩次送出之間至少間隔這麼久
+MIN_SEND_INTERVAL = 0.5
+
+
 class DiscordWebhookHandler(logging.Handler):
-    def __init__(self):
+    """
+    非同步的 Discord 日誌 handler。
+
+    emit() 只在請求執行緒中把紀錄整理成 embed 放進有上限的佇列，
+    實際的 HTTPS 呼叫由背景執行緒完成，因此 Discord 變慢或失效都不會拖住 Gunicorn worker。
+    相同內容的紀錄在送出前會合併成一則並附上次數，多則紀錄合併成一個請求送出；
+    佇列滿時直接丟棄，丟棄的數量會在下一則訊息中回報。
+    """
+
+    def __init__(self, queue_size=200, timeout=10):
         super().__init__()
         self.webhook_url = os.getenv("DISCORD_WEBHOOK_URL")
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._init_state()
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _init_state(self):
+        self._cond = threading.Condition(threading.Lock())
+        # key -> {'title', 'description', 'color', 'timestamp', 'count'}，依第一次出現的順序
+        self._pending = OrderedDict()
+        self.dropped = 0
+        self._pid = None
+        self._thread = None
+        self._closed = False
+        self._next_send_at = 0
 
     def emit(self, record):
         if not self.webhook_url:
             return
 
         try:
-            # 建立一個 webhook
-            webhook = DiscordWebhook(url=self.webhook_url)
+            self._ensure_sender()
+            entry = self._build_entry(record)
+        except Exception:
+            self.handleError(record)
+            return
 
-            # 建立一個嵌入式訊息
-            if record.levelno >= logging.ERROR:
-                title = f"❌ Backend Error: {record.levelname}"
-                color = "E74C3C" # 紅色
+        key = (entry['title'], entry['description'])
+        with self._cond:
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending['count'] += 1
+            elif len(self._pending) >= self.queue_size:
+                self.dropped += 1
+                return
             else:
-                title = f"ℹ️ Backend Info: {record.levelname}"
-                color = "3498DB" # 藍色
+                self._pending[key] = entry
+            self._cond.notify()
+
+    def _build_entry(self, record):
+        # 建立一個嵌入式訊息
+        if record.levelno >= logging.ERROR:
+            title = f"❌ Backend Error: {record.levelname}"
+            color = "E74C3C" # 紅色
+        else:
+            title = f"ℹ️ Backend Info: {record.levelname}"
+            color = "3498DB" # 藍色
 
-            description = f"""**Message:**
-{record.getMessage()}
+        description = f"""**Message:**
+{record.getMessage()[:1500]}
 
 """
 
-            # 如果有例外訊息，加入 traceback
-            if record.exc_info:
-                exc_type, exc_value, exc_traceback = record.exc_info
-                tb_list = traceback.format_exception(exc_type, exc_value, exc_traceback)
-                
-                # Take the last 10 lines of the traceback
-                truncated_tb_list = tb_list[-10:]
-                tb_str = "".join(truncated_tb_list)
+        # 如果有例外訊息，加入 traceback
+        if record.exc_info:
+            exc_type, exc_value, exc_traceback = record.exc_info
+            tb_list = traceback.format_exception(exc_type, exc_value, exc_traceback)
 
-                # Add a message if the traceback was truncated
-                if len(tb_list) > 10:
-                    tb_str = "(Traceback truncated - showing last 10 lines)\n" + tb_str
+            # Take the last 10 lines of the traceback
+            truncated_tb_list = tb_list[-10:]
+            tb_str = "".join(truncated_tb_list)
 
-                # Apply the character limit for Discord
-                if len(tb_str) > 1800:
-                    tb_str = tb_str[:1790] + "...\n(Further truncated due to Discord limit)"
+            # Add a message if the traceback was truncated
+            if len(tb_list) > 10:
+                tb_str = "(Traceback truncated - showing last 10 lines)\n" + tb_str
 
-                description += f"""**Traceback:**
+            # Apply the character limit for Discord
+            if len(tb_str) > 1800:
+                tb_str = tb_str[:1790] + "...\n(Further truncated due to Discord limit)"
+
+            description += f"""**Traceback:**
 ```python
 {tb_str}
 ```"""
 
+        return {
+            'title': title,
+            'description': description,
+            'color': color,
+            'timestamp': record.created,
+            'count': 1,
+        }
 
-            embed = DiscordEmbed(
-                title=title,
-                description=description,
-                color=color
-            )
-            
-            embed.set_timestamp()
-
+    def _ensure_sender(self):
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='discord-log-sender', daemon=True)
+            self._thread.start()
+
+    def _reset_after_fork(self):
+        # 子行程不繼承父行程的佇列與鎖，第一次 emit 時再啟動自己的執行緒
+        self._init_state()
+
+    def _take_batch(self):
+        """取出一則訊息的份量：最多 10 個 embed，且總字數不超過 Discord 的上限。"""
+        batch = []
+        size = 0
+        while self._pending and len(batch) < MAX_EMBEDS_PER_MESSAGE:
+            key, entry = next(iter(self._pending.items()))
+            entry_size = len(entry['title']) + len(entry['description'])
+            if batch and size + entry_size > MAX_MESSAGE_CHARS:
+                break
+            del self._pending[key]
+            batch.append(entry)
+            size += entry_size
+        dropped, self.dropped = self.dropped, 0
+        return batch, dropped
+
+    def _requeue(self, batch, dropped):
+        """送出失敗時放回佇列前端，之後進來的相同紀錄仍會合併到同一筆。"""
+        with self._cond:
+            for entry in reversed(batch):
+                key = (entry['title'], entry['description'])
+                pending = self._pending.pop(key, None)
+                if pending is not None:
+                    entry['count'] += pending['count']
+                self._pending[key] = entry
+                self._pending.move_to_end(key, last=False)
+            self.dropped += dropped
+
+    def _run(self):
+        while True:
+            try:
+                if not self._run_once():
+                    return
+            except Exception:
+                # 任何錯誤都不能讓背景執行緒結束，否則之後的紀錄只會一直堆在佇列裡
+                self._write_stderr(f"Discord log sender failed:\n{traceback.format_exc()}")
+                time.sleep(MIN_SEND_INTERVAL)
+
+    def _run_once(self):
+        """等待並送出一則訊息；handler 已關閉且沒有剩下的紀錄時回傳 False。"""
+        with self._cond:
+            while not self._pending and not self.dropped and not self._closed:
+                self._cond.wait()
+            if self._closed and not self._pending and not self.dropped:
+                return False
+            wait = self._next_send_at - time.monotonic()
+        if wait > 0:
+            # 等待速率限制的期間，新進的相同紀錄會繼續合併
+            time.sleep(wait)
+
+        with self._cond:
+            batch, dropped = self._take_batch()
+        if batch or dropped:
+            self._send(batch, dropped)
+        return True
+
+    @staticmethod
+    def _write_stderr(message):
+        # 直接寫到 stderr 而不經過 logging，避免錯誤訊息又回到這個 handler
+        try:
+            sys.stderr.write(message + "\n")
+            sys.stderr.flush()
+        except Exception:
+            pass
+
+    def _send(self, batch, dropped):
+        webhook = DiscordWebhook(url=self.webhook_url, timeout=self.timeout)
+        if dropped:
+            webhook.set_content(f"⚠️ Discord 日誌佇列已滿，丟棄了 {dropped} 筆紀錄。")
+        for entry in batch:
+            title = entry['title']
+            if entry['count'] > 1:
+                title += f" (x{entry['count']})"
+            embed = DiscordEmbed(title=title, description=entry['description'], color=entry['color'])
+            embed.set_timestamp(entry['timestamp'])
             webhook.add_embed(embed)
-            response = webhook.execute()
 
+        self._next_send_at = time.monotonic() + MIN_SEND_INTERVAL
+        try:
+            response = webhook.execute()
         except Exception as e:
-            # 如果發送到 Discord 時出錯，打印到控制台
-            print(f"Error sending log to Discord: {e}")
-            print(f"Original log record: {self.format(record)}")
+            # 如果發送到 Discord 時出錯，寫到 stderr；這批紀錄直接放棄，避免 Discord 失效時無限重試
+            self._write_stderr(f"Error sending log to Discord: {e}")
+            for entry in batch:
+                self._write_stderr(f"Original log record: {entry['description']}")
+            return
 
+        if response.status_code == 429:
+            self._requeue(batch, dropped)
+            self._next_send_at = time.monotonic() + self._retry_after(response)
+        elif response.headers.get('X-RateLimit-Remaining') == '0':
+            reset_after = float(response.headers.get('X-RateLimit-Reset-After') or MIN_SEND_INTERVAL)
+            self._next_send_at = time.monotonic() + reset_after
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return float(response.json()['retry_after'])
+        except Exception:
+            return float(response.headers.get('Retry-After') or 1)
+
+    def close(self):
+        """關閉時給背景執行緒一點時間把剩下的紀錄送出。"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=self.timeout)
+        super().close()
@@ -0,0 +1,427 @@
+# novel_backend/core/exports.py
+"""
+離線閱讀用的匯出檔：整本小說或單一分卷的 EPUB，或 HTML 檔的 zip。
+
+已發布的章節以 .iterator() 逐章讀取、寫入壓縮檔，每寫完一章就把新產生的位元組交給回應，
+整本小說不需要同時放在記憶體中。壓縮檔本身寫在 EXPORT_ROOT 下的暫存檔，完成後改名成快取檔；
+檔名帶有內容版本 (小說與分卷的 updated_at，章節變動會更新小說的 updated_at)，
+版本不變時直接回傳快取檔，有章節變動後的第一次下載才重新產生。
+同一版本同時只會有一個請求在產生：產生時建立 <快取檔>.building 標記檔，
+其他請求等它完成後直接讀取快取檔；標記檔太久沒有更新 (產生的行程已中止) 時由下一個請求接手。
+
+內文引用的上傳圖片一併打包，連結改成壓縮檔內的相對路徑；srcset 等只在網站上有意義的屬性會移除。
+"""
+import mimetypes
+import os
+import posixpath
+import re
+import time
+import uuid
+import zipfile
+from html import escape
+from html.parser import HTMLParser
+from itertools import groupby
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db.models import Max
+from django.utils import timezone
+
+from .http_cache import make_etag
+from .models import Chapter
+
+EXPORT_TYPES = {
+    'epub': 'application/epub+zip',
+    'zip': 'application/zip',
+}
+
+# 匯出內容的語言 (站內小說皆為繁體中文)
+EXPORT_LANGUAGE = 'zh-Hant'
+
+# 一次從資料庫取回的章節數
+CHUNK_SIZE = 50
+
+# 改變匯出檔的格式時遞增，讓舊的快取檔失效
+FORMAT_VERSION = 1
+
+# 產生中的標記檔超過這個秒數沒有更新，視為產生的行程已中止 (產生期間每寫完一個項目就更新一次)
+BUILD_STALE_SECONDS = 120
+# 等待其他請求產生同一版本時，檢查快取檔的間隔秒數
+BUILD_POLL_SECONDS = 0.5
+# 讀取快取檔送出時每次的大小
+READ_CHUNK_SIZE = 64 * 1024
+
+_VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr',
+])
+# 匯出檔中用不到的屬性 (衍生版本的網址在離線時無法使用)
+_DROPPED_ATTRIBUTES = frozenset(['srcset', 'sizes', 'loading'])
+# XML 允許的屬性名稱
+_ATTRIBUTE_NAME = re.compile(r'^[A-Za-z_:][-A-Za-z0-9_:.]*$')
+
+
+class _XhtmlWriter(HTMLParser):
+    """
+    把 Tiptap 產生的 HTML 轉成 well-formed 的 XHTML：自閉合空元素、補上未關閉的標籤、
+    重新 escape 文字與屬性，並把指向 MEDIA_URL 的圖片改成壓縮檔內的路徑。
+    """
+
+    def __init__(self, resolve_media):
+        super().__init__(convert_charrefs=True)
+        self.resolve_media = resolve_media
+        self.parts = []
+        self.stack = []
+
+    def _attributes(self, tag, attrs):
+        rendered = []
+        for name, value in attrs:
+            if name in _DROPPED_ATTRIBUTES or not _ATTRIBUTE_NAME.match(name):
+                continue
+            value = value or ''
+            if tag == 'img' and name == 'src':
+                value = self.resolve_media(value)
+            rendered.append(f' {name}="{escape(value)}"')
+        if tag == 'img' and not any(name == 'alt' for name, _ in attrs):
+            # EPUB 要求圖片都有 alt
+            rendered.append(' alt=""')
+        return ''.join(rendered)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_ELEMENTS:
+            self.parts.append(f'<{tag}{self._attributes(tag, attrs)} />')
+            return
+        self.parts.append(f'<{tag}{self._attributes(tag, attrs)}>')
+        self.stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _VOID_ELEMENTS:
+            self.parts.append(f'<{tag}{self._attributes(tag, attrs)} />')
+        else:
+            self.parts.append(f'<{tag}{self._attributes(tag, attrs)}></{tag}>')
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        while self.stack:
+            open_tag = self.stack.pop()
+            self.parts.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        self.parts.append(escape(data, quote=False))
+
+    def convert(self, html):
+        self.feed(html or '')
+        self.close()
+        while self.stack:
+            self.parts.append(f'</{self.stack.pop()}>')
+        return ''.join(self.parts)
+
+
+def _page(title, body, xhtml):
+    head = f'<meta charset="utf-8" /><title>{escape(title)}</title>'
+    if xhtml:
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n<!DOCTYPE html>\n'
+            f'<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+            f'lang="{EXPORT_LANGUAGE}" xml:lang="{EXPORT_LANGUAGE}">'
+            f'<head>{head}</head><body>{body}</body></html>'
+        )
+    return f'<!DOCTYPE html>\n<html lang="{EXPORT_LANGUAGE}"><head>{head}</head><body>{body}</body></html>'
+
+
+class NovelExport:
+    """一本小說 (或其中一個分卷) 的匯出檔。"""
+
+    def __init__(self, novel, volume=None, export_type='epub'):
+        if export_type not in EXPORT_TYPES:
+            raise ValueError(f'Unknown export type: {export_type!r}')
+        self.novel = novel
+        self.volume = volume
+        self.export_type = export_type
+        self.scope = f'volume-{volume.pk}' if volume is not None else 'novel'
+        self._version = None
+        self._lock_token = uuid.uuid4().hex
+
+    @property
+    def content_type(self):
+        return EXPORT_TYPES[self.export_type]
+
+    @property
+    def version(self):
+        """內容版本；分卷的標題、說明或任何章節變動都會讓它改變。"""
+        if self._version is None:
+            if self.volume is None:
+                volumes = self.novel.volumes.aggregate(latest=Max('updated_at'))['latest']
+                parts = (self.novel.pk, self.novel.updated_at, volumes)
+            else:
+                parts = (self.novel.pk, self.novel.updated_at, self.volume.pk, self.volume.updated_at)
+            self._version = make_etag(FORMAT_VERSION, self.export_type, *parts).strip('"')
+        return self._version
+
+    @property
+    def directory(self):
+        return os.path.join(settings.EXPORT_ROOT, str(self.novel.pk))
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f'{self.scope}-{self.version}.{self.export_type}')
+
+    @property
+    def title(self):
+        if self.volume is None:
+            return self.novel.title
+        return f'{self.novel.title} - {self.volume.title}'
+
+    @property
+    def filename(self):
+        return f'{self.title}.{self.export_type}'
+
+    @property
+    def lock_path(self):
+        return f'{self.path}.building'
+
+    def cached_path(self):
+        """目前版本的快取檔已存在時回傳其路徑。"""
+        return self.path if os.path.exists(self.path) else None
+
+    def stream(self):
+        """
+        產生匯出檔的內容 (bytes 區塊)，同時寫入快取檔。
+        其他請求正在產生同一版本時，等它完成後送出快取檔的內容，不重複產生。
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        while True:
+            cached = self.cached_path()
+            if cached is not None:
+                # 等待期間已由其他請求產生完成
+                yield from self._read(cached)
+                return
+            if self._acquire_lock():
+                break
+            time.sleep(BUILD_POLL_SECONDS)
+        try:
+            # 對方可能在上面檢查之後、移除標記檔之前剛好完成
+            missing = self.cached_path() is None
+            if missing:
+                yield from self._generate()
+        finally:
+            self._release_lock()
+        if not missing:
+            yield from self._read(self.path)
+
+    def _acquire_lock(self):
+        """建立產生中的標記檔；其他行程正在產生同一版本時回傳 False。過期的標記檔會被取代。"""
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                pass
+            else:
+                # 寫入自己的識別碼，結束時只移除自己建立的標記檔
+                with os.fdopen(fd, 'w') as fh:
+                    fh.write(self._lock_token)
+                return True
+            try:
+                if time.time() - os.path.getmtime(self.lock_path) < BUILD_STALE_SECONDS:
+                    return False
+                os.remove(self.lock_path)
+            except FileNotFoundError:
+                # 對方剛好完成並移除了標記檔
+                pass
+        return False
+
+    def _owns_lock(self):
+        try:
+            with open(self.lock_path) as fh:
+                return fh.read() == self._lock_token
+        except FileNotFoundError:
+            return False
+
+    def _release_lock(self):
+        # 產生得太慢 (例如客戶端讀取很慢) 時標記檔可能已被其他請求視為過期而取代
+        if self._owns_lock():
+            os.remove(self.lock_path)
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'rb') as fh:
+            while True:
+                data = fh.read(READ_CHUNK_SIZE)
+                if not data:
+                    return
+                yield data
+
+    def _generate(self):
+        """
+        寫出壓縮檔並逐段送出，完成後改名成快取檔。
+        中途中斷 (例如客戶端斷線) 時刪除暫存檔，不留下不完整的快取。
+        """
+        tmp = f'{self.path}.{uuid.uuid4().hex}.tmp'
+        finished = False
+        try:
+            with open(tmp, 'w+b') as fh:
+                sent = 0
+
+                def take():
+                    # zipfile 寫完一個項目後才會回頭補上該項目的大小與 CRC，之前的位元組都已確定
+                    nonlocal sent
+                    fh.flush()
+                    end = fh.tell()
+                    fh.seek(sent)
+                    data = fh.read(end - sent)
+                    fh.seek(end)
+                    sent = end
+                    return data
+
+                with zipfile.ZipFile(fh, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                    for _ in self._write(archive):
+                        # 更新標記檔的時間，表示仍在產生中
+                        if self._owns_lock():
+                            os.utime(self.lock_path)
+                        data = take()
+                        if data:
+                            yield data
+                data = take()
+                if data:
+                    yield data
+            os.replace(tmp, self.path)
+            finished = True
+            self._remove_stale()
+        finally:
+            if not finished and os.path.exists(tmp):
+                os.remove(tmp)
+
+    def build(self):
+        """產生快取檔 (已存在則略過)，回傳其路徑。"""
+        if self.cached_path() is None:
+            for _ in self.stream():
+                pass
+        return self.path
+
+    def _remove_stale(self):
+        # 同一個範圍的舊版本
+        prefix = f'{self.scope}-'
+        suffix = f'.{self.export_type}'
+        current = os.path.basename(self.path)
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(prefix) and entry.name.endswith(suffix) and entry.name != current:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+
+    def _chapters(self):
+        chapters = Chapter.objects.filter(novel=self.novel, status=Chapter.Status.PUBLISHED)
+        if self.volume is not None:
+            chapters = chapters.filter(volume=self.volume)
+        return chapters.select_related('body').order_by('order').iterator(chunk_size=CHUNK_SIZE)
+
+    def _write(self, archive):
+        """依序寫入每個項目，每寫完一個 yield 一次，讓 stream() 送出新產生的位元組。"""
+        epub = self.export_type == 'epub'
+        root = 'OEBPS/' if epub else ''
+        extension = 'xhtml' if epub else 'html'
+        volume_titles = dict(self.novel.volumes.values_list('id', 'title'))
+        # 壓縮檔內的圖片路徑 -> 上傳檔案的路徑；不存在的檔案為 None
+        images = {}
+
+        def resolve_media(src):
+            if not src.startswith(settings.MEDIA_URL):
+                return src
+            name = posixpath.normpath(unquote(src[len(settings.MEDIA_URL):]))
+            # 內文是使用者輸入：/media/../ 之類跳出 MEDIA_ROOT 的路徑保留原網址，不打包
+            if name.startswith(('/', '../')) or name in ('.', '..'):
+                return src
+            target = f'images/{name}'
+            if target not in images:
+                try:
+                    images[target] = name if default_storage.exists(name) else None
+                except SuspiciousFileOperation:
+                    images[target] = None
+            return f'../{target}' if images[target] else src
+
+        if epub:
+            # mimetype 必須是第一個項目且不壓縮
+            archive.writestr(zipfile.ZipInfo('mimetype'), 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+            archive.writestr('META-INF/container.xml', (
+                '<?xml version="1.0" encoding="utf-8"?>\n'
+                '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+                '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml" />'
+                '</rootfiles></container>'
+            ))
+            yield
+
+        toc = []
+        for number, chapter in enumerate(self._chapters(), start=1):
+            href = f'chapters/{number:04d}.{extension}'
+            body = _XhtmlWriter(resolve_media).convert(chapter.content)
+            archive.writestr(root + href, _page(chapter.title, f'<h2>{escape(chapter.title)}</h2>{body}', epub))
+            toc.append((volume_titles.get(chapter.volume_id), chapter.title, href))
+            yield
+
+        cover = None
+        if self.novel.cover_image and default_storage.exists(self.novel.cover_image.name):
+            cover = f'images/{self.novel.cover_image.name}'
+            images[cover] = self.novel.cover_image.name
+        for target, name in images.items():
+            if name is None:
+                continue
+            with default_storage.open(name, 'rb') as fh:
+                # 圖片本身已經壓縮過
+                archive.writestr(root + target, fh.read(), compress_type=zipfile.ZIP_STORED)
+            yield
+
+        if epub:
+            archive.writestr('OEBPS/nav.xhtml', self._nav(toc, xhtml=True))
+            archive.writestr('OEBPS/content.opf', self._package(toc, images, cover))
+        else:
+            archive.writestr('index.html', self._nav(toc, xhtml=False))
+        yield
+
+    def _nav(self, toc, xhtml):
+        groups = []
+        for volume_title, entries in groupby(toc, key=lambda entry: entry[0]):
+            items = ''.join(f'<li><a href="{escape(href)}">{escape(title)}</a></li>' for _, title, href in entries)
+            if volume_title and self.volume is None:
+                groups.append(f'<li><span>{escape(volume_title)}</span><ol>{items}</ol></li>')
+            else:
+                groups.append(items)
+        body = f'<h1>{escape(self.title)}</h1><ol>{"".join(groups)}</ol>'
+        if xhtml:
+            body = f'<nav epub:type="toc" id="toc">{body}</nav>'
+        return _page(self.title, body, xhtml)
+
+    def _package(self, toc, images, cover):
+        author = self.novel.author
+        identifier = f'urn:novel:{self.novel.pk}:{self.scope}:{self.version}'
+        manifest = ['<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav" />']
+        spine = []
+        for number, (_, _, href) in enumerate(toc, start=1):
+            manifest.append(f'<item id="c{number:04d}" href="{escape(href)}" media-type="application/xhtml+xml" />')
+            spine.append(f'<itemref idref="c{number:04d}" />')
+        for number, (target, name) in enumerate(images.items(), start=1):
+            if name is None:
+                continue
+            media_type = mimetypes.guess_type(posixpath.basename(name))[0] or 'application/octet-stream'
+            properties = ' properties="cover-image"' if target == cover else ''
+            manifest.append(f'<item id="img{number}" href="{escape(target)}" media-type="{media_type}"{properties} />')
+        modified = timezone.now().strftime('%Y-%m-%dT%H:%M:%SZ')
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<dc:identifier id="book-id">{escape(identifier)}</dc:identifier>'
+            f'<dc:title>{escape(self.title)}</dc:title>'
+            f'<dc:creator>{escape(author.pen_name or author.user.username)}</dc:creator>'
+            f'<dc:language>{EXPORT_LANGUAGE}</dc:language>'
+            f'<meta property="dcterms:modified">{modified}</meta>'
+            '</metadata>'
+            f'<manifest>{"".join(manifest)}</manifest>'
+            f'<spine>{"".join(spine)}</spine>'
+            '</package>'
+        )
@@ -0,0 +1,84 @@
+# novel_backend/core/http_cache.py
+"""
+公開讀取端點的 HTTP 條件式請求 (ETag / Last-Modified)。
+
+retrieve 先以一次只取時間戳與少數欄位的查詢算出驗證值，
+客戶端帶來的 If-None-Match / If-Modified-Since 仍然有效時直接回 304，
+不載入分卷、章節樹或內文，也不執行序列化。
+
+回應一律帶 Cache-Control: no-cache，瀏覽器每次重新造訪都會回源驗證，
+因此觀看次數 (在判斷 304 之前記錄) 不會因為快取而少算。
+回應內容會依登入身分 (作者的編輯檢視) 而不同，所以加上 Vary: Authorization，
+已登入的回應標為 private，避免共用快取把作者看到的草稿交給其他讀者。
+304 不含內文，觀看次數等欄位沿用客戶端快取中的值。
+"""
+import hashlib
+
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """由組成回應內容的版本資訊算出強 ETag。"""
+    digest = hashlib.blake2b('|'.join(map(str, parts)).encode('utf-8'), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def latest(*timestamps):
+    """回傳最新的時間戳，忽略 None (例如沒有分卷的小說)。"""
+    timestamps = [ts for ts in timestamps if ts is not None]
+    return max(timestamps) if timestamps else None
+
+
+class ConditionalGetMixin:
+    """
+    為 retrieve 加上條件式請求支援。
+
+    子類別實作 get_validators()，回傳 (組成 ETag 的值, Last-Modified 時間或 None)；
+    物件不存在時回傳 None。retrieve 在呼叫 super().retrieve() 之前
+    先呼叫 not_modified_response()，拿到回應就直接回傳。
+    """
+    # 由 not_modified_response() 設定，finalize_response() 據此補上標頭
+    conditional_etag = None
+    conditional_last_modified = None
+
+    def get_validators(self):
+        raise NotImplementedError('subclasses of ConditionalGetMixin must provide get_validators()')
+
+    def load_validators(self):
+        """計算這次請求的 ETag 與 Last-Modified；物件不存在時拋出 404。"""
+        try:
+            validators = self.get_validators()
+        except (TypeError, ValueError):
+            # 與 get_object_or_404 相同，格式錯誤的 pk 視為不存在
+            raise Http404
+        if validators is None:
+            raise Http404
+        parts, last_modified = validators
+        self.conditional_etag = make_etag(type(self).__name__, *parts)
+        self.conditional_last_modified = last_modified
+
+    def not_modified_response(self):
+        """客戶端的快取仍然有效時回傳 304，否則回傳 None。"""
+        if self.conditional_etag is None:
+            self.load_validators()
+        last_modified = self.conditional_last_modified
+        return get_conditional_response(
+            self.request,
+            etag=self.conditional_etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.conditional_etag is not None and response.status_code in (200, 304):
+            response['ETag'] = self.conditional_etag
+            if self.conditional_last_modified is not None:
+                response['Last-Modified'] = http_date(self.conditional_last_modified.timestamp())
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, public=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+        return response
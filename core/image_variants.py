@@ -0,0 +1,149 @@
+# novel_backend/core/image_variants.py
+"""
+上傳圖片的衍生版本：依用途縮成數個寬度，並轉成 WebP 與 AVIF。
+
+檔名由原圖路徑決定：variants/<原圖路徑去掉副檔名>.<寬度>w.<格式>，
+serializer 不必另外查詢就能組出 srcset。原圖比目標寬度小時不放大，直接以原尺寸輸出，所以每個寬度的檔案都存在。
+產生完成後把原圖路徑寫入該列的 image_variants 欄位，serializer 只比對這個欄位，不必逐張向 storage 確認檔案是否存在；
+產生時則以最後寫入的檔案 (最大寬度的最後一種格式) 判斷是否已產生過。
+
+封面、分卷封面與頭像在儲存後 (transaction commit 時) 產生，章節插圖在上傳時產生；
+既有的圖片以 build_image_variants 指令回填。動畫 GIF 等多影格圖片保留原檔，不產生衍生版本。
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+VARIANT_ROOT = 'variants'
+
+# 用途 -> 輸出的寬度 (由小到大)
+KIND_WIDTHS = {
+    'cover': (200, 400, 800),
+    'avatar': (64, 128, 256),
+    'chapter': (480, 960, 1600),
+}
+
+# (副檔名, Pillow 格式, 編碼參數)；AVIF 需要 Pillow 編譯時支援 libavif
+FORMATS = [
+    (ext, fmt, params)
+    for ext, fmt, params, feature in [
+        ('webp', 'WEBP', {'quality': 80, 'method': 4}, 'webp'),
+        ('avif', 'AVIF', {'quality': 55, 'speed': 8}, 'avif'),
+    ]
+    if features.check(feature)
+]
+
+# 模型 label -> (圖片欄位, 用途)，由 core/models.py 的 post_save 訊號使用
+MODEL_IMAGE_FIELDS = {
+    'core.Novel': ('cover_image', 'cover'),
+    'core.Volume': ('cover_image', 'cover'),
+    'core.CustomUser': ('avatar', 'avatar'),
+}
+
+
+def variant_name(name, width, ext):
+    return f'{VARIANT_ROOT}/{os.path.splitext(name)[0]}.{width}w.{ext}'
+
+
+def has_variants(name, kind):
+    if not FORMATS:
+        return False
+    return default_storage.exists(variant_name(name, KIND_WIDTHS[kind][-1], FORMATS[-1][0]))
+
+
+def _prepare(image):
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGB', 'RGBA'):
+        return image
+    has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def generate_variants(name, kind, force=False):
+    """產生 name 的所有衍生版本，回傳寫入的檔名；已存在 (且未指定 force) 或無法處理時回傳空列表。"""
+    if not FORMATS or (not force and has_variants(name, kind)):
+        return []
+
+    with default_storage.open(name, 'rb') as fh, Image.open(fh) as image:
+        if getattr(image, 'is_animated', False):
+            return []
+        image = _prepare(image)
+        image.load()
+
+    written = []
+    for width in KIND_WIDTHS[kind]:
+        if image.width > width:
+            resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        else:
+            resized = image
+        for ext, fmt, params in FORMATS:
+            buffer = BytesIO()
+            resized.save(buffer, fmt, **params)
+            target = variant_name(name, width, ext)
+            # 固定檔名：先刪除舊檔，避免 storage 自動改名
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+            written.append(target)
+    return written
+
+
+def delete_variants(name, kind):
+    """刪除 name 的所有衍生版本 (原圖被刪除時使用)。"""
+    for width in KIND_WIDTHS[kind]:
+        for ext, _, _ in FORMATS:
+            target = variant_name(name, width, ext)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+
+
+def safe_generate_variants(name, kind, force=False):
+    """generate_variants 的包裝：圖片損毀或格式不支援時只記錄錯誤，不影響呼叫端。"""
+    try:
+        return generate_variants(name, kind, force)
+    except Exception:
+        logger.exception("Failed to generate image variants for %s", name)
+        return []
+
+
+def build_variants(model, pk, field, name, kind, force=False):
+    """
+    產生 name 的衍生版本，成功後在 model 的資料列記下 image_variants = name，回傳是否已就緒。
+    只更新圖片欄位仍是 name 的列：產生期間圖片又被換掉時不會誤記。
+    """
+    if not (safe_generate_variants(name, kind, force) or has_variants(name, kind)):
+        return False
+    model.objects.filter(pk=pk, **{field: name}).update(image_variants=name)
+    return True
+
+
+def schedule_variants(instance):
+    """模型儲存後，在 commit 時為其圖片欄位產生衍生版本。"""
+    field, kind = MODEL_IMAGE_FIELDS[instance._meta.label]
+    image = getattr(instance, field)
+    if image and instance.image_variants != image.name:
+        model, pk, name = type(instance), instance.pk, image.name
+        transaction.on_commit(lambda: build_variants(model, pk, field, name, kind))
+
+
+def variant_srcsets(name, kind, request=None):
+    """回傳 {'webp': 'url 200w, ...', 'avif': ...}；呼叫端須先確認衍生版本已產生 (image_variants)。"""
+    if not name or not FORMATS:
+        return None
+    srcsets = {}
+    for ext, _, _ in FORMATS:
+        entries = []
+        for width in KIND_WIDTHS[kind]:
+            url = default_storage.url(variant_name(name, width, ext))
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            entries.append(f'{url} {width}w')
+        srcsets[ext] = ', '.join(entries)
+    return srcsets
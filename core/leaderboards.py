@@ -0,0 +1,94 @@
+# novel_backend/core/leaderboards.py
+"""
+預先計算的排行榜。
+
+refresh_leaderboards() 從 NovelDailyStat 的每日統計桶加總出日榜 (今天)、週榜 (最近 7 天)、
+月榜 (最近 30 天)，總榜則直接讀取 Novel.views 與目前的收藏數，
+每個組合取前 N 名寫入 LeaderboardEntry，並一併記下卡片顯示的收藏數。
+讀取排行榜時只需依 rank 取出這 N 列，不必在每次請求時對書架與章節做彙總。
+
+由 refresh_leaderboards 管理指令定期執行 (例如每 10 分鐘的 cron)，
+尚未 flush 的觀看次數與兩次重建之間的變動會在下一次重建時反映。
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Novel, ReadingProgress, NovelDailyStat, LeaderboardEntry
+
+Board = LeaderboardEntry.Board
+Period = LeaderboardEntry.Period
+
+# 每個排行榜保留的名次數
+DEFAULT_SIZE = 100
+
+# 滾動區間的天數 (包含今天)
+WINDOW_DAYS = {
+    Period.DAILY: 1,
+    Period.WEEKLY: 7,
+    Period.MONTHLY: 30,
+}
+
+
+def _window_scores(board, days, size, today):
+    start = today - timedelta(days=days - 1)
+    return (
+        NovelDailyStat.objects.filter(date__gte=start, date__lte=today)
+        .values('novel')
+        .annotate(score=Sum(board))
+        .filter(score__gt=0)
+        .order_by('-score', 'novel')
+        .values_list('novel', 'score')[:size]
+    )
+
+
+def _all_time_scores(board, size):
+    if board == Board.VIEWS:
+        return Novel.objects.filter(views__gt=0).order_by('-views', 'id').values_list('id', 'views')[:size]
+    return (
+        ReadingProgress.objects.values('novel')
+        .annotate(score=Count('pk'))
+        .order_by('-score', 'novel')
+        .values_list('novel', 'score')[:size]
+    )
+
+
+def compute_scores(board, period, size=DEFAULT_SIZE, today=None):
+    """回傳 [(novel_id, score), ...]，依分數由高到低排序。"""
+    if period == Period.ALL_TIME:
+        return list(_all_time_scores(board, size))
+    return list(_window_scores(board, WINDOW_DAYS[period], size, today or timezone.localdate()))
+
+
+def _bookmark_counts(novel_ids):
+    """回傳 {novel_id: 收藏數}，沒有被收藏的小說不在結果中。"""
+    return dict(
+        ReadingProgress.objects.filter(novel__in=novel_ids)
+        .values('novel')
+        .annotate(c=Count('pk'))
+        .order_by()
+        .values_list('novel', 'c')
+    )
+
+
+def refresh_leaderboards(size=DEFAULT_SIZE):
+    """重建所有排行榜，回傳寫入的列數。"""
+    now = timezone.now()
+    today = timezone.localdate(now)
+    entries = [
+        LeaderboardEntry(board=board, period=period, rank=rank, novel_id=novel_id, score=score, computed_at=now)
+        for board in Board.values
+        for period in Period.values
+        for rank, (novel_id, score) in enumerate(compute_scores(board, period, size, today), start=1)
+    ]
+    # 所有排行榜上的小說以一次分組查詢取得收藏數
+    counts = _bookmark_counts({entry.novel_id for entry in entries})
+    for entry in entries:
+        entry.bookmark_count = counts.get(entry.novel_id, 0)
+    # 在同一個 transaction 中替換，讀取端只會看到完整的舊表或新表
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(entries)
+    return len(entries)
@@ -0,0 +1,107 @@
+# novel_backend/core/list_cache.py
+"""
+匿名讀者的小說列表 (/api/novels/) 回應快取。
+
+首頁、探索、最近更新與排行榜只會用到少數 category / status / ordering / page 組合，
+這些組合的序列化結果放在 CACHES['responses'] 中 (local-memory、檔案或 Redis，見 settings)。
+帶有其他參數 (例如搜尋字詞) 或已登入的請求一律不快取。
+
+失效採「世代」計數：key 中帶有目前的世代編號，小說、章節、書架或作者資料變動時
+(core/models.py 的訊號) 把世代加一，舊的 key 不再被讀到，等逾時後自然淘汰。
+使用 local-memory 後端時每個 worker 各自有一份世代編號，其他 worker 的舊資料
+最多保留 RESPONSE_CACHE_TIMEOUT 秒；需要即時失效請改用檔案或 Redis 後端。
+觀看次數的寫回不會觸發失效，列表上的觀看次數同樣最多延遲一個逾時週期。
+草稿章節的儲存與閱讀進度的更新也不會觸發失效 (卡片內容不變)；草稿儲存造成的小說 updated_at 變動
+同樣最多延遲一個逾時週期才反映在列表上。
+"""
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from django.db import transaction
+
+CACHE_ALIAS = 'responses'
+GENERATION_KEY = 'novel_list:generation'
+HITS_KEY = 'novel_list:hits'
+MISSES_KEY = 'novel_list:misses'
+
+# 參數 -> 預設值；等於預設值的參數不放進 key，讓 ?category=ALL 與不帶參數共用同一筆
+CACHEABLE_PARAMS = {
+    'category': 'ALL',
+    'status': 'ALL',
+    'ordering': '',
+    'page': '1',
+}
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _incr(key, initial=1):
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # key 不存在 (第一次使用或已被淘汰)
+        cache.add(key, initial, timeout=None)
+        return initial
+
+
+def current_generation():
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # 世代 key 被淘汰後以時間重新起算，不會與舊 key 的世代重複
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def novel_list_cache_key(request):
+    """回傳這個列表請求的快取 key；不適合快取時回傳 None。"""
+    if request.user.is_authenticated:
+        return None
+    params = request.query_params
+    normalized = []
+    for name in params:
+        if name not in CACHEABLE_PARAMS:
+            return None
+        values = params.getlist(name)
+        if len(values) != 1:
+            return None
+        if values[0] not in ('', CACHEABLE_PARAMS[name]):
+            normalized.append((name, values[0]))
+    # 分頁連結是完整網址，不同網域要分開存放
+    return f'novel_list:{current_generation()}:{request.get_host()}:{urlencode(sorted(normalized))}'
+
+
+def get_cached_list(key):
+    data = get_cache().get(key)
+    _incr(HITS_KEY if data is not None else MISSES_KEY)
+    return data
+
+
+def set_cached_list(key, data):
+    get_cache().set(key, data)
+
+
+def invalidate_novel_lists():
+    """
+    讓所有已快取的列表失效。在 transaction commit 之後才換世代，
+    避免其他請求在 commit 前讀到舊資料並存進新的世代。
+    """
+    transaction.on_commit(lambda: _incr(GENERATION_KEY, initial=time.time_ns()))
+
+
+def list_cache_stats():
+    cache = get_cache()
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    return {
+        'backend': f'{type(cache).__module__}.{type(cache).__name__}',
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        'generation': cache.get(GENERATION_KEY),
+    }
@@ -0,0 +1,19 @@
+# novel_backend/core/management/commands/backfill_novel_stats.py
+from django.core.management.base import BaseCommand
+
+from core.models import Novel
+
+
+class Command(BaseCommand):
+    help = "回填小說的反正規化欄位 (最新已發布章節、已發布章節數)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('novel_ids', nargs='*', type=int, help="只回填指定的小說 ID (預設為全部)")
+
+    def handle(self, *args, **options):
+        novels = Novel.objects.all()
+        if options['novel_ids']:
+            novels = novels.filter(pk__in=options['novel_ids'])
+
+        updated = novels.refresh_chapter_stats()
+        self.stdout.write(self.style.SUCCESS(f"已更新 {updated} 本小說的章節統計。"))
@@ -0,0 +1,101 @@
+# novel_backend/core/management/commands/bench_author_analytics.py
+"""
+比較作者流量總覽的兩種取得方式：
+
+  per-novel  舊的前端流程：列出自己的小說，再對每一本呼叫 /novels/<id>/analytics/
+  dashboard  /api/analytics/author/ 一次取得 (不使用快取)
+
+在一個最後會 rollback 的 transaction 中，為不同作者建立 1、10、50 本小說 (每本 --chapters 章)
+與 --days 天的每日統計，觀察查詢數與耗時是否隨小說數量增加：
+    python manage.py bench_author_analytics --chapters 500 --days 30
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from core.models import CustomUser, AuthorProfile, Novel, Chapter
+
+
+class Command(BaseCommand):
+    help = "量測作者流量總覽端點在小說數量增加時的查詢數與耗時 (資料會 rollback)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--novels', type=int, nargs='+', default=[1, 10, 50], help="每位作者的小說數")
+        parser.add_argument('--chapters', type=int, default=500, help="每本小說的章節數")
+        parser.add_argument('--days', type=int, default=30, help="每日統計的天數")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stderr.write("此基準測試需要 PostgreSQL。")
+            return
+
+        with transaction.atomic():
+            authors = [
+                self._create_author(n, count, options['chapters'])
+                for n, count in enumerate(options['novels'])
+            ]
+            self._create_daily_stats(authors, options['days'])
+
+            client = APIClient(SERVER_NAME='localhost')
+            self.stdout.write(f"{'novels':>7} {'chapters':>9} {'mode':<10} {'queries':>8} {'ms':>9}")
+            with override_settings(AUTHOR_ANALYTICS_CACHE_TIMEOUT=0):
+                for author in authors:
+                    client.force_authenticate(author.user)
+                    novel_ids = list(author.novels.values_list('id', flat=True))
+                    chapters = len(novel_ids) * options['chapters']
+                    for mode in ('per-novel', 'dashboard'):
+                        queries, ms = self._measure(client, mode, novel_ids)
+                        self.stdout.write(f"{len(novel_ids):>7} {chapters:>9} {mode:<10} {queries:>8} {ms:>9.1f}")
+
+            transaction.set_rollback(True)
+
+    def _measure(self, client, mode, novel_ids):
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as captured:
+            if mode == 'dashboard':
+                response = client.get('/api/analytics/author/')
+                assert response.status_code == 200, response.status_code
+            else:
+                response = client.get('/api/novels/', {'my_novels': 'true'})
+                assert response.status_code == 200, response.status_code
+                for pk in novel_ids:
+                    response = client.get(f'/api/novels/{pk}/analytics/')
+                    assert response.status_code == 200, response.status_code
+        return len(captured.captured_queries), (time.perf_counter() - started) * 1000
+
+    def _create_author(self, index, novel_count, chapter_count):
+        user = CustomUser.objects.create_user(username=f'bench_analytics_{index}', password='bench', role='AUTHOR')
+        author, _ = AuthorProfile.objects.get_or_create(user=user, defaults={'pen_name': f'Bench {index}'})
+        novels = Novel.objects.bulk_create(
+            Novel(title=f'Bench {index}-{n}', author=author, description='benchmark') for n in range(novel_count)
+        )
+        Chapter.objects.bulk_create(
+            Chapter(novel=novel, title=f'Chapter {c + 1}', order=c + 1, status=Chapter.Status.PUBLISHED, views=c)
+            for novel in novels
+            for c in range(chapter_count)
+        )
+        Novel.objects.filter(author=author).refresh_chapter_stats()
+        return author
+
+    def _create_daily_stats(self, authors, days):
+        # 直接以 generate_series 產生大量統計列，比 bulk_create 快得多
+        novel_ids = list(Novel.objects.filter(author__in=authors).values_list('id', flat=True))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO core_chapterdailystat (novel_id, chapter_id, date, views) "
+                "SELECT c.novel_id, c.id, CURRENT_DATE - d, (c.id * 7 + d) %% 50 "
+                "FROM core_chapter c CROSS JOIN generate_series(0, %s) AS d "
+                "WHERE c.novel_id = ANY(%s)",
+                [days - 1, novel_ids],
+            )
+            cursor.execute(
+                "INSERT INTO core_noveldailystat (novel_id, date, views, bookmarks) "
+                "SELECT s.novel_id, s.date, SUM(s.views), COUNT(*) %% 5 "
+                "FROM core_chapterdailystat s WHERE s.novel_id = ANY(%s) GROUP BY s.novel_id, s.date",
+                [novel_ids],
+            )
+            for table in ('core_novel', 'core_chapter', 'core_chapterdailystat', 'core_noveldailystat'):
+                cursor.execute(f"ANALYZE {table}")
@@ -0,0 +1,121 @@
+# novel_backend/core/management/commands/bench_chapter_content.py
+"""
+量測章節內文移出 Chapter 表之後，各個列表查詢從 PostgreSQL 取回的資料量，
+並比較內文以 plain / zlib / zstd 存放的大小。
+
+「之前」以 annotate 把 body__text 接回每一列來模擬內文還在 Chapter 表時的列寬。
+在一個最後會 rollback 的 transaction 中建立假資料：
+    python manage.py bench_chapter_content --chapters 200 --paragraphs 40
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+
+from core import content_codec
+from core.models import CustomUser, AuthorProfile, Novel, Volume, Chapter, ChapterContent, ReadingProgress
+
+SENTENCES = [
+    '夜色漸深，城牆上的火把在風中搖曳。',
+    '她握緊手中的劍，望向遠方的山脈。',
+    '「我們必須在天亮之前離開這裡。」',
+    '古老的魔法陣在地面上緩緩亮起，空氣中瀰漫著焦灼的氣味。',
+    '少年沒有回答，只是默默地把地圖收進懷裡。',
+    '學院的鐘聲響起，所有人都停下了手邊的動作。',
+]
+
+
+class Command(BaseCommand):
+    help = "量測章節列表查詢的傳輸量與內文壓縮率 (資料會 rollback)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chapters', type=int, default=200)
+        parser.add_argument('--paragraphs', type=int, default=40, help="每章的段落數")
+        parser.add_argument('--seed', type=int, default=1798)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stderr.write("此基準測試需要 PostgreSQL。")
+            return
+
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            novel, reader, bodies = self._create_fixture(rng, options['chapters'], options['paragraphs'])
+            chapters = Chapter.objects.filter(novel=novel)
+
+            scenarios = [
+                ('chapter list', chapters.order_by('order')),
+                ('analytics', chapters.select_related('volume').order_by('order')),
+                ('reading progress', ReadingProgress.objects.filter(user=reader).select_related('last_read_chapter')),
+            ]
+            self.stdout.write(f"{'query':<18} {'inline bytes':>14} {'split bytes':>12} {'inline ms':>10} {'split ms':>9}")
+            for name, queryset in scenarios:
+                inline = self._with_inline_content(queryset)
+                inline_bytes, inline_ms = self._fetch_bytes(inline)
+                split_bytes, split_ms = self._fetch_bytes(queryset)
+                self.stdout.write(
+                    f"{name:<18} {inline_bytes:>14} {split_bytes:>12} {inline_ms:>10.1f} {split_ms:>9.1f}"
+                )
+
+            self.stdout.write('')
+            self.stdout.write(f"{'codec':<8} {'stored bytes':>14} {'ratio':>7} {'decode ms/chapter':>18}")
+            raw_size = sum(len(body.encode('utf-8')) for body in bodies)
+            codecs = [content_codec.PLAIN, content_codec.ZLIB]
+            if content_codec.zstandard is not None:
+                codecs.append(content_codec.ZSTD)
+            for codec in codecs:
+                encoded = [content_codec.encode(body, codec) for body in bodies]
+                stored = sum(len(data) if data is not None else len(text.encode('utf-8')) for _, text, data in encoded)
+                started = time.perf_counter()
+                for item in encoded:
+                    content_codec.decode(*item)
+                decode_ms = (time.perf_counter() - started) * 1000 / len(encoded)
+                self.stdout.write(f"{codec:<8} {stored:>14} {stored / raw_size:>7.2f} {decode_ms:>18.3f}")
+
+            transaction.set_rollback(True)
+
+    def _with_inline_content(self, queryset):
+        """把內文接回查詢結果，模擬內文仍存放在 Chapter 表時的列寬。"""
+        if queryset.model is ReadingProgress:
+            return queryset.annotate(inline_content=F('last_read_chapter__body__text'))
+        return queryset.annotate(inline_content=F('body__text'))
+
+    def _fetch_bytes(self, queryset):
+        """執行查詢並加總每個欄位以文字協定傳回的位元組數。"""
+        sql, params = queryset.query.sql_with_params()
+        started = time.perf_counter()
+        total = 0
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            for row in cursor.fetchall():
+                for value in row:
+                    if value is None:
+                        continue
+                    total += len(value) if isinstance(value, (bytes, memoryview)) else len(str(value).encode('utf-8'))
+        return total, (time.perf_counter() - started) * 1000
+
+    def _create_fixture(self, rng, chapter_count, paragraphs):
+        user = CustomUser.objects.create_user(username='bench_content', password='bench')
+        author = AuthorProfile.objects.create(user=user, pen_name='Bench')
+        reader = CustomUser.objects.create_user(username='bench_reader', password='bench')
+        novel = Novel.objects.create(title='Bench Content', author=author, description='benchmark')
+        volume = Volume.objects.create(novel=novel, title='Volume 1', order=1)
+
+        bodies = [
+            ''.join(
+                '<p>' + ''.join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 6))) + '</p>'
+                for _ in range(paragraphs)
+            )
+            for _ in range(chapter_count)
+        ]
+        chapters = Chapter.objects.bulk_create(
+            Chapter(novel=novel, volume=volume, title=f'Chapter {c + 1}', order=c + 1, status=Chapter.Status.PUBLISHED)
+            for c in range(chapter_count)
+        )
+        ChapterContent.objects.bulk_create(
+            ChapterContent(chapter=chapter, text=body) for chapter, body in zip(chapters, bodies)
+        )
+        ReadingProgress.objects.create(user=reader, novel=novel, last_read_chapter=chapters[-1])
+        return novel, reader, bodies
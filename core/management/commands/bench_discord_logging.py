@@ -0,0 +1,83 @@
+# novel_backend/core/management/commands/bench_discord_logging.py
+"""
+以本機假的 webhook 伺服器量測 DiscordWebhookHandler.emit() 在請求執行緒中的延遲。
+
+假伺服器每個請求都延遲 --delay 秒才回應，模擬 Discord 變慢；
+emit() 的延遲應該與 --delay 無關，伺服器收到的請求數應遠少於紀錄數 (合併與批次)：
+    python manage.py bench_discord_logging --records 500 --delay 2
+"""
+import json
+import logging
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from core.discord_logging import DiscordWebhookHandler
+
+
+class Command(BaseCommand):
+    help = "量測非同步 Discord 日誌 handler 的 emit 延遲 (使用本機假伺服器)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=500)
+        parser.add_argument('--distinct', type=int, default=20, help="不同訊息的種類數")
+        parser.add_argument('--delay', type=float, default=2.0, help="假伺服器每個請求的延遲秒數")
+        parser.add_argument('--rate-limit-every', type=int, default=3, help="每幾個請求回一次 429 (0 表示不回)")
+
+    def handle(self, *args, **options):
+        received = []
+        delay = options['delay']
+        rate_limit_every = options['rate_limit_every']
+
+        class WebhookStub(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                time.sleep(delay)
+                received.append(payload)
+                if rate_limit_every and len(received) % rate_limit_every == 0:
+                    body = json.dumps({'message': 'You are being rate limited.', 'retry_after': 0.2}).encode()
+                    self.send_response(429)
+                else:
+                    body = json.dumps({'id': str(len(received))}).encode()
+                    self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookStub)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        handler = DiscordWebhookHandler(timeout=delay + 5)
+        handler.webhook_url = f'http://127.0.0.1:{server.server_port}/webhook'
+        logger = logging.getLogger('bench_discord_logging')
+        logger.propagate = False
+        logger.addHandler(handler)
+
+        timings = []
+        for n in range(options['records']):
+            started = time.perf_counter()
+            logger.error("Frontend Error: bench message %d", n % options['distinct'])
+            timings.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        logger.removeHandler(handler)
+        handler.close()
+        drained = time.perf_counter() - started
+        server.shutdown()
+
+        embeds = sum(len(payload.get('embeds', [])) for payload in received)
+        self.stdout.write(
+            f"emit ms: median {statistics.median(timings):.3f}, max {max(timings):.3f} "
+            f"(webhook delay {delay * 1000:.0f} ms)"
+        )
+        self.stdout.write(
+            f"{options['records']} records -> {len(received)} webhook requests, {embeds} embeds, "
+            f"{handler.dropped} dropped, drained in {drained:.1f}s"
+        )
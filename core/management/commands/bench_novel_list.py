@@ -0,0 +1,82 @@
+# novel_backend/core/management/commands/bench_novel_list.py
+"""
+量測 /api/novels/ 每一頁的查詢數與回應大小，確認不會隨章節數成長。
+
+在一個最後會 rollback 的 transaction 中建立假資料，不會留下任何資料：
+    python manage.py bench_novel_list --novels 12 --chapters 10 100 500
+量測時停用匿名列表的回應快取 (core/list_cache.py)，每一輪都實際執行列表查詢。
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory
+
+from core.models import CustomUser, AuthorProfile, Novel, Volume, Chapter, ChapterContent
+from core.views import NovelViewSet
+
+
+class Command(BaseCommand):
+    help = "量測小說列表 API 的查詢數與 payload 大小 (資料會 rollback)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--novels', type=int, default=12, help="每一輪建立的小說數 (預設為一頁 12 本)")
+        parser.add_argument('--chapters', type=int, nargs='+', default=[10, 100, 500], help="每本小說的章節數")
+        parser.add_argument('--volumes', type=int, default=5, help="每本小說的分卷數")
+
+    def handle(self, *args, **options):
+        view = NovelViewSet.as_view({'get': 'list'})
+        # ALLOWED_HOSTS 不含 testserver，分頁的 next 連結需要合法的 host
+        factory = APIRequestFactory(SERVER_NAME='localhost')
+
+        self.stdout.write(f"{'chapters/novel':>15} {'queries':>8} {'bytes':>10} {'ms':>8}")
+        no_response_cache = {
+            **settings.CACHES,
+            'responses': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+        }
+        with override_settings(CACHES=no_response_cache):
+            for chapter_count in options['chapters']:
+                self._measure(view, factory, chapter_count, options)
+
+    def _measure(self, view, factory, chapter_count, options):
+        with transaction.atomic():
+            self._create_fixture(options['novels'], chapter_count, options['volumes'])
+
+            request = factory.get('/api/novels/')
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = view(request)
+                response.render()
+                elapsed = (time.perf_counter() - started) * 1000
+
+            self.stdout.write(
+                f"{chapter_count:>15} {len(ctx.captured_queries):>8} {len(response.content):>10} {elapsed:>8.1f}"
+            )
+            transaction.set_rollback(True)
+
+    def _create_fixture(self, novel_count, chapter_count, volume_count):
+        user = CustomUser.objects.create_user(username='bench_author', password='bench')
+        author = AuthorProfile.objects.create(user=user, pen_name='Bench')
+        body = '<p>' + '測試內容。' * 400 + '</p>'
+
+        for n in range(novel_count):
+            novel = Novel.objects.create(title=f'Bench Novel {n}', author=author, description='benchmark')
+            volumes = Volume.objects.bulk_create(
+                Volume(novel=novel, title=f'Volume {v + 1}', order=v + 1) for v in range(volume_count)
+            )
+            chapters = Chapter.objects.bulk_create(
+                Chapter(
+                    novel=novel,
+                    volume=volumes[c % volume_count] if volumes else None,
+                    title=f'Chapter {c + 1}',
+                    order=c + 1,
+                    status=Chapter.Status.PUBLISHED,
+                )
+                for c in range(chapter_count)
+            )
+            ChapterContent.objects.bulk_create(ChapterContent(chapter=chapter, text=body) for chapter in chapters)
+
+        # bulk_create 不會觸發章節訊號，手動回填反正規化欄位
+        Novel.objects.filter(author=author).refresh_chapter_stats()
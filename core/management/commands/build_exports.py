@@ -0,0 +1,40 @@
+# novel_backend/core/management/commands/build_exports.py
+"""
+預先產生離線閱讀檔的快取 (見 core/exports.py)，讀者下載時不必等待產生：
+    python manage.py build_exports                 # 所有小說
+    python manage.py build_exports 12 34 --volumes --type zip
+目前版本的快取檔已存在時略過。
+"""
+from django.core.management.base import BaseCommand
+
+from core.exports import EXPORT_TYPES, NovelExport
+from core.models import Novel
+
+
+class Command(BaseCommand):
+    help = "產生小說 (與分卷) 的 EPUB/zip 匯出檔快取"
+
+    def add_arguments(self, parser):
+        parser.add_argument('novel_ids', nargs='*', type=int, help="只處理這些小說 (預設為全部)")
+        parser.add_argument('--type', choices=list(EXPORT_TYPES), default='epub', help="匯出格式")
+        parser.add_argument('--volumes', action='store_true', help="同時產生每個分卷的匯出檔")
+
+    def handle(self, *args, **options):
+        novels = Novel.objects.select_related('author__user').order_by('pk')
+        if options['novel_ids']:
+            novels = novels.filter(pk__in=options['novel_ids'])
+
+        built = skipped = 0
+        for novel in novels.iterator():
+            exports = [NovelExport(novel, None, options['type'])]
+            if options['volumes']:
+                exports += [NovelExport(novel, volume, options['type']) for volume in novel.volumes.order_by('order')]
+            for export in exports:
+                if export.cached_path() is not None:
+                    skipped += 1
+                    continue
+                path = export.build()
+                built += 1
+                self.stdout.write(f"{export.title}: {path}")
+
+        self.stdout.write(self.style.SUCCESS(f"已產生 {built} 個匯出檔，{skipped} 個已是最新版本。"))
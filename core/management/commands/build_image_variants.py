@@ -0,0 +1,88 @@
+# novel_backend/core/management/commands/build_image_variants.py
+"""
+為既有的封面、分卷封面、頭像與章節插圖回填 WebP/AVIF 衍生版本。
+
+圖片編碼是 CPU 密集的工作，以 process pool 平行處理：
+    python manage.py build_image_variants --workers 4
+已有衍生版本的圖片會略過，--force 則全部重新產生。
+完成後在引用該圖片的資料列記錄 image_variants，serializer 才會輸出 srcset。
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.image_variants import generate_variants, has_variants
+from core.models import CustomUser, MediaBlob, Novel, Volume
+
+CHAPTER_IMAGE_DIR = 'chapter_images'
+
+
+def _build(name, kind, force):
+    # 在子行程中執行；例外交回主行程統一回報。回傳 (寫入的檔案數, 衍生版本是否就緒)
+    written = generate_variants(name, kind, force)
+    return len(written), bool(written) or has_variants(name, kind)
+
+
+class Command(BaseCommand):
+    help = "為既有圖片產生縮圖與 WebP/AVIF 衍生版本 (多行程)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="平行處理的行程數")
+        parser.add_argument('--force', action='store_true', help="即使已有衍生版本也重新產生")
+
+    def handle(self, *args, **options):
+        images = self._collect()
+        self.stdout.write(f"共 {len(images)} 張圖片，使用 {options['workers']} 個行程處理…")
+
+        # fork 出的子行程不可沿用父行程的資料庫連線
+        connections.close_all()
+
+        built = skipped = failed = files = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {
+                executor.submit(_build, name, kind, options['force']): name
+                for name, (kind, _) in images
+            }
+            owners = dict(images)
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    count, ready = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"{name}: {exc}")
+                    continue
+                if ready:
+                    for model, field in owners[name][1]:
+                        model.objects.filter(**{field: name}).update(image_variants=name)
+                if count:
+                    built += 1
+                    files += count
+                else:
+                    skipped += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"完成：{built} 張產生 {files} 個檔案，{skipped} 張略過，{failed} 張失敗。"
+        ))
+
+    def _collect(self):
+        """回傳 [(圖片路徑, (用途, {(模型, 欄位), ...}))]；後者是完成後要記錄 image_variants 的資料表。"""
+        images = {}
+        for model, field, kind in (
+            (Novel, 'cover_image', 'cover'),
+            (Volume, 'cover_image', 'cover'),
+            (CustomUser, 'avatar', 'avatar'),
+            (MediaBlob, 'file', 'chapter'),
+        ):
+            names = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).values_list(field, flat=True)
+            for name in names.iterator():
+                images.setdefault(name, (kind, set()))[1].add((model, field))
+        # 改為內容定址儲存之前上傳的插圖直接放在 chapter_images/ 下
+        if default_storage.exists(CHAPTER_IMAGE_DIR):
+            _, files = default_storage.listdir(CHAPTER_IMAGE_DIR)
+            for filename in files:
+                images.setdefault(f'{CHAPTER_IMAGE_DIR}/{filename}', ('chapter', set()))
+        return sorted(images.items())
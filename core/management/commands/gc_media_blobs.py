@@ -0,0 +1,53 @@
+# novel_backend/core/management/commands/gc_media_blobs.py
+"""
+刪除沒有任何章節引用的上傳圖片 (MediaBlob.ref_count = 0) 與它們的衍生版本。
+
+剛上傳、還沒隨章節儲存的圖片引用數也是 0，因此只處理超過保留期限 (預設 24 小時) 的檔案：
+    python manage.py gc_media_blobs --grace-hours 24 --dry-run
+"""
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.image_variants import delete_variants
+from core.models import MediaBlob
+
+
+class Command(BaseCommand):
+    help = "刪除沒有被任何章節引用的上傳圖片"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24, help="上傳後至少保留的時數")
+        parser.add_argument('--dry-run', action='store_true', help="只列出會被刪除的檔案")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        candidates = MediaBlob.objects.filter(ref_count=0, uploaded_at__lt=cutoff).values_list('pk', 'file', 'size')
+
+        deleted = freed = 0
+        for pk, name, size in candidates.iterator():
+            if options['dry_run']:
+                self.stdout.write(name)
+                deleted += 1
+                freed += size
+                continue
+            with transaction.atomic():
+                # 條件刪除：掃描之後才被章節引用 (或重新上傳) 的圖片會留下來
+                removed, _ = MediaBlob.objects.filter(pk=pk, ref_count=0, uploaded_at__lt=cutoff).delete()
+                if not removed:
+                    continue
+                # 資料列刪除確定之後才刪檔案
+                transaction.on_commit(lambda name=name: self._delete_files(name))
+            deleted += 1
+            freed += size
+
+        verb = "將刪除" if options['dry_run'] else "已刪除"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} 個檔案，共 {freed / 1024 / 1024:.1f} MB。"))
+
+    def _delete_files(self, name):
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        delete_variants(name, 'chapter')
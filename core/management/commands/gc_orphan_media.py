@@ -0,0 +1,48 @@
+# novel_backend/core/management/commands/gc_orphan_media.py
+"""
+找出 MEDIA_ROOT 中沒有被任何章節、封面或頭像引用的檔案，列出或搬到隔離目錄：
+    python manage.py gc_orphan_media                 # 只列出
+    python manage.py gc_orphan_media --quarantine    # 搬到 MEDIA_QUARANTINE_ROOT/<時間>/
+章節引用的檔案在儲存內文時已記在資料庫 (ChapterContent.media_paths)，不需要重新解析章節。
+"""
+import os
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.media_gc import find_orphans, referenced_paths
+
+
+class Command(BaseCommand):
+    help = "列出或隔離沒有被引用的媒體檔案"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quarantine', action='store_true', help="把孤立檔案搬到隔離目錄，而不只是列出")
+        parser.add_argument('--min-age-hours', type=float, default=24, help="只處理修改時間早於此時數的檔案")
+
+    def handle(self, *args, **options):
+        paths = referenced_paths()
+        self.stdout.write(f"共 {len(paths)} 個被引用的檔案。")
+
+        media_root = os.path.abspath(settings.MEDIA_ROOT)
+        quarantine_root = os.path.abspath(settings.MEDIA_QUARANTINE_ROOT)
+        # 隔離目錄設在 MEDIA_ROOT 之內時不掃描它
+        skip = os.path.relpath(quarantine_root, media_root) + '/'
+        target_root = os.path.join(quarantine_root, timezone.now().strftime('%Y%m%d-%H%M%S'))
+
+        count = total = 0
+        for path, size in find_orphans(media_root, paths, options['min_age_hours'] * 3600):
+            if path.startswith(skip):
+                continue
+            count += 1
+            total += size
+            if options['quarantine']:
+                target = os.path.join(target_root, path)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(os.path.join(media_root, path), target)
+            self.stdout.write(f"{path}\t{size}")
+
+        verb = f"已搬到 {target_root}" if options['quarantine'] and count else "未被引用"
+        self.stdout.write(self.style.SUCCESS(f"{count} 個檔案{verb}，共 {total / 1024 / 1024:.1f} MB。"))
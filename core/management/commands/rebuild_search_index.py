@@ -0,0 +1,31 @@
+# novel_backend/core/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from core.models import Novel
+from core.search import novel_document
+
+
+class Command(BaseCommand):
+    help = "重建所有小說的全文搜尋向量"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        novels = Novel.objects.select_related('author__user').only(
+            'id', 'title', 'description', 'author__pen_name', 'author__user__username'
+        ).iterator(chunk_size=batch_size)
+
+        batch = []
+        total = 0
+        for novel in novels:
+            novel.search_vector = novel_document(novel)
+            batch.append(novel)
+            if len(batch) >= batch_size:
+                total += Novel.objects.bulk_update(batch, ['search_vector'])
+                batch = []
+        if batch:
+            total += Novel.objects.bulk_update(batch, ['search_vector'])
+
+        self.stdout.write(self.style.SUCCESS(f"已重建 {total} 本小說的搜尋向量。"))
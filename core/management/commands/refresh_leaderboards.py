@@ -0,0 +1,15 @@
+# novel_backend/core/management/commands/refresh_leaderboards.py
+from django.core.management.base import BaseCommand
+
+from core.leaderboards import DEFAULT_SIZE, refresh_leaderboards
+
+
+class Command(BaseCommand):
+    help = "重建日榜、週榜、月榜與總榜 (建議以 cron 定期執行)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=DEFAULT_SIZE, help="每個排行榜保留的名次數")
+
+    def handle(self, *args, **options):
+        total = refresh_leaderboards(options['size'])
+        self.stdout.write(self.style.SUCCESS(f"已寫入 {total} 筆排行榜名次。"))
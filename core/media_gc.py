@@ -0,0 +1,107 @@
+# novel_backend/core/media_gc.py
+"""
+找出 MEDIA_ROOT 中沒有被任何資料引用的檔案 (gc_orphan_media 指令使用)。
+
+引用來源：
+  - 章節內文中的媒體網址 (img src、srcset、連結)，儲存內文時記在 ChapterContent.media_paths
+  - 小說封面、分卷封面、使用者頭像
+  - MediaBlob 記錄的上傳圖片 (引用數歸零後由 gc_media_blobs 處理，這裡一律保留)
+檔案以完整路徑比對；只有 variants/ 下的衍生版本對應回原圖 (見 core/image_variants.py)，原圖被引用時衍生版本也保留。
+
+章節引用由資料庫去除重複後逐列讀取，媒體目錄以 os.scandir 逐層走訪，
+記憶體用量只和被引用的檔案數有關，與章節數、檔案數無關。
+"""
+import os
+import re
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.db.models import F, Func
+from django.utils import timezone
+
+from .image_variants import VARIANT_ROOT
+from .models import ChapterContent, CustomUser, MediaBlob, Novel, Volume
+
+_MEDIA_URL = re.compile(re.escape(settings.MEDIA_URL) + r'([^"\'\s?#,<>()]+)')
+_VARIANT_PREFIX = f'{VARIANT_ROOT}/'
+_VARIANT_SUFFIX = re.compile(r'\.\d+w$')
+
+
+def referenced_media(html):
+    """內文中引用的媒體檔案路徑 (相對於 MEDIA_ROOT)。"""
+    return {unquote(path) for path in _MEDIA_URL.findall(html or '')}
+
+
+def original_base(path):
+    """
+    衍生版本對應的原圖路徑 (不含副檔名)：variants/novel_covers/a.400w.webp 對應到 novel_covers/a。
+    原圖本身回傳去掉副檔名的路徑，用來和衍生版本比對。
+    """
+    if path.startswith(_VARIANT_PREFIX):
+        return _VARIANT_SUFFIX.sub('', os.path.splitext(path[len(_VARIANT_PREFIX):])[0])
+    return os.path.splitext(path)[0]
+
+
+def referenced_paths():
+    """所有被引用的檔案路徑 (完整路徑)。"""
+    paths = set()
+    chapter_paths = (
+        ChapterContent.objects.order_by()
+        .annotate(path=Func(F('media_paths'), function='unnest'))
+        .values_list('path', flat=True)
+        .distinct()
+    )
+    paths.update(chapter_paths.iterator())
+    for model, field in ((Novel, 'cover_image'), (Volume, 'cover_image'), (CustomUser, 'avatar')):
+        names = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).values_list(field, flat=True)
+        paths.update(names.iterator())
+    paths.update(MediaBlob.objects.values_list('file', flat=True).iterator())
+    return paths
+
+
+def referenced_bases(paths):
+    """回傳 (被引用原圖的 original_base, 內文直接引用的衍生版本所對應的 original_base)。"""
+    originals, variants = set(), set()
+    for path in paths:
+        (variants if path.startswith(_VARIANT_PREFIX) else originals).add(original_base(path))
+    return originals, variants
+
+
+def is_referenced(path, paths, originals, variants):
+    """
+    檔案是否被引用：完整路徑相符；或是衍生版本而原圖被引用；或是原圖而內文直接引用了它的衍生版本。
+    originals 與 variants 為 referenced_bases(paths) 的結果。
+    """
+    if path in paths:
+        return True
+    if path.startswith(_VARIANT_PREFIX):
+        return original_base(path) in originals
+    return original_base(path) in variants
+
+
+def walk_media(root):
+    """逐一產生 (相對路徑, os.DirEntry)；以堆疊走訪，不會一次列出整個目錄樹。"""
+    stack = ['']
+    while stack:
+        relative = stack.pop()
+        with os.scandir(os.path.join(root, relative)) as entries:
+            for entry in entries:
+                path = f'{relative}/{entry.name}' if relative else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield path, entry
+
+
+def find_orphans(root, paths, min_age):
+    """產生 (相對路徑, 大小)：沒有被引用、且修改時間早於 min_age 秒之前的檔案。"""
+    originals, variants = referenced_bases(paths)
+    cutoff = timezone.now().timestamp() - min_age
+    for path, entry in walk_media(root):
+        if is_referenced(path, paths, originals, variants):
+            continue
+        stat = entry.stat(follow_symlinks=False)
+        # 剛上傳、還沒隨表單儲存的檔案先不處理
+        if stat.st_mtime > cutoff:
+            continue
+        yield path, stat.st_size
@@ -0,0 +1,106 @@
+# novel_backend/core/media_store.py
+"""
+上傳圖片的內容定址儲存。
+
+檔案以 SHA-256 命名：chapter_images/<前兩碼>/<雜湊><副檔名>，MediaBlob 記錄雜湊到檔案的對應。
+同一張圖再次上傳時以唯一索引查到既有的檔案，直接回傳網址，不再寫入第二份。
+
+章節儲存時從內文找出引用的圖片，與 MediaBlob.chapters 比對後只調整有變動的引用數；
+引用數歸零的檔案由 gc_media_blobs 指令在保留期限後刪除 (草稿剛上傳、尚未儲存的圖片也是 0)。
+"""
+import hashlib
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import MediaBlob
+
+BLOB_ROOT = 'chapter_images'
+
+# 內文中指向上傳圖片的網址 (src 或 href)；variants/ 下的衍生版本不會符合
+_MEDIA_PATH = re.compile(re.escape(settings.MEDIA_URL) + rf'({BLOB_ROOT}/[^"\'\s?#,<>]+)')
+
+
+def content_hash(upload):
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_path(digest, upload):
+    # DRF 的 ImageField 驗證時已由 Pillow 判斷出實際格式，副檔名以它為準
+    ext = mimetypes.guess_extension(getattr(upload, 'content_type', None) or '') or ''
+    if not ext:
+        ext = os.path.splitext(upload.name)[1].lower()
+    return f'{BLOB_ROOT}/{digest[:2]}/{digest}{ext}'
+
+
+def store_upload(upload):
+    """
+    儲存上傳的圖片，回傳 (blob, created)。
+    內容相同的圖片已存在時不寫入任何檔案，created 為 False。
+    """
+    digest = content_hash(upload)
+    blob = MediaBlob.objects.filter(sha256=digest).first()
+    if blob is not None and default_storage.exists(blob.file):
+        if blob.ref_count == 0:
+            MediaBlob.objects.filter(pk=blob.pk).update(uploaded_at=timezone.now())
+        return blob, False
+
+    path = blob_path(digest, upload)
+    written = False
+    if not default_storage.exists(path):
+        upload.seek(0)
+        # 兩個請求同時上傳同一張圖時，storage 可能替後寫入的那份改名；以實際寫入的路徑為準
+        path = default_storage.save(path, upload)
+        written = True
+    blob, created = MediaBlob.objects.get_or_create(sha256=digest, defaults={'file': path, 'size': upload.size})
+    if not created and blob.file != path:
+        if default_storage.exists(blob.file):
+            # 另一個請求先建立了資料列，它記錄的檔案才是正本；刪掉這次多寫的那份
+            if written:
+                default_storage.delete(path)
+        else:
+            # 資料列還在但檔案已遺失 (例如手動清理過 MEDIA_ROOT)
+            blob.file = path
+            blob.uploaded_at = timezone.now()
+            blob.save(update_fields=['file', 'uploaded_at'])
+    return blob, created
+
+
+def referenced_paths(html):
+    """內文中引用的上傳圖片路徑 (相對於 MEDIA_ROOT)。"""
+    return set(_MEDIA_PATH.findall(html or ''))
+
+
+def sync_chapter_media(chapter, content, created=False):
+    """
+    讓 chapter 對上傳圖片的引用與內文一致，並調整對應的引用數。
+    新建且內文沒有圖片的章節不需要任何查詢。
+    """
+    paths = referenced_paths(content)
+    if created and not paths:
+        return
+
+    through = MediaBlob.chapters.through
+    with transaction.atomic():
+        # 鎖住這些列：gc_media_blobs 以 ref_count=0 為條件刪除，會等到這裡 commit 後重新判斷
+        wanted = set(
+            MediaBlob.objects.select_for_update().filter(file__in=paths).values_list('pk', flat=True)
+        ) if paths else set()
+        current = set() if created else set(
+            through.objects.filter(chapter=chapter).values_list('mediablob_id', flat=True)
+        )
+        added, removed = wanted - current, current - wanted
+        if added:
+            through.objects.bulk_create([through(chapter=chapter, mediablob_id=pk) for pk in added])
+            MediaBlob.objects.filter(pk__in=added).update(ref_count=models.F('ref_count') + 1)
+        if removed:
+            through.objects.filter(chapter=chapter, mediablob_id__in=removed).delete()
+            MediaBlob.objects.filter(pk__in=removed).update(ref_count=models.F('ref_count') - 1)
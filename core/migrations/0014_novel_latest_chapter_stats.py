@@ -0,0 +1,34 @@
+# Generated by Django 4.2.23 on 2026-10-18 18:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_chapter_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='novel',
+            name='latest_chapter',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.chapter', verbose_name='最新章節'),
+        ),
+        migrations.AddField(
+            model_name='novel',
+            name='latest_chapter_title',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='最新章節標題'),
+        ),
+        migrations.AddField(
+            model_name='novel',
+            name='latest_chapter_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='最新章節更新時間'),
+        ),
+        migrations.AddField(
+            model_name='novel',
+            name='published_chapter_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='已發布章節數'),
+        ),
+    ]
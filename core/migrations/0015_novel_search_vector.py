@@ -0,0 +1,39 @@
+# Generated by Django 4.2.23 on 2026-10-18 18:13
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def build_search_vectors(apps, schema_editor):
+    from core.search import build_document
+
+    Novel = apps.get_model('core', 'Novel')
+    novels = Novel.objects.select_related('author__user').iterator(chunk_size=1000)
+    for novel in novels:
+        document = build_document(
+            (novel.title, 'A'),
+            (f'{novel.author.pen_name} {novel.author.user.username}', 'B'),
+            (novel.description, 'C'),
+        )
+        Novel.objects.filter(pk=novel.pk).update(search_vector=document)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_novel_latest_chapter_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='novel',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='novel',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='novel_search_vector_gin'),
+        ),
+        migrations.RunPython(build_search_vectors, migrations.RunPython.noop),
+    ]
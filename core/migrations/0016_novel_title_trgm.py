@@ -0,0 +1,20 @@
+# Generated by Django 4.2.23 on 2026-10-18 18:13
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_novel_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='novel',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='novel_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
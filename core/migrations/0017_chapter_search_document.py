@@ -0,0 +1,47 @@
+# Generated by Django 4.2.23 on 2026-10-18 18:15
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_search_documents(apps, schema_editor):
+    from core.search import build_document, html_to_text
+
+    Chapter = apps.get_model('core', 'Chapter')
+    ChapterSearchDocument = apps.get_model('core', 'ChapterSearchDocument')
+
+    batch = []
+    for chapter in Chapter.objects.only('id', 'title', 'content').iterator(chunk_size=500):
+        document = build_document(
+            (chapter.title, 'A'),
+            (html_to_text(chapter.content), 'B'),
+        )
+        batch.append(ChapterSearchDocument(chapter_id=chapter.pk, search_vector=document))
+        if len(batch) >= 500:
+            ChapterSearchDocument.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ChapterSearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_novel_title_trgm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChapterSearchDocument',
+            fields=[
+                ('chapter', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='core.chapter')),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+            options={
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='chapter_search_vector_gin')],
+            },
+        ),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+    ]
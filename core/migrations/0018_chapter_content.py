@@ -0,0 +1,62 @@
+# Generated by Django 4.2.23 on 2026-10-18 18:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def move_content_out(apps, schema_editor):
+    # 一條 INSERT ... SELECT 搬移，不經過 Python；既有內文先以未壓縮格式存放
+    schema_editor.execute(
+        "INSERT INTO core_chaptercontent (chapter_id, codec, text) "
+        "SELECT id, 'plain', content FROM core_chapter"
+    )
+
+
+def move_content_back(apps, schema_editor):
+    from core.content_codec import decode
+
+    Chapter = apps.get_model('core', 'Chapter')
+    ChapterContent = apps.get_model('core', 'ChapterContent')
+
+    batch = []
+    for body in ChapterContent.objects.iterator(chunk_size=500):
+        batch.append(Chapter(pk=body.chapter_id, content=decode(body.codec, body.text, body.data)))
+        if len(batch) >= 500:
+            Chapter.objects.bulk_update(batch, ['content'])
+            batch = []
+    if batch:
+        Chapter.objects.bulk_update(batch, ['content'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_chapter_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChapterContent',
+            fields=[
+                ('chapter', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='body', serialize=False, to='core.chapter')),
+                ('codec', models.CharField(choices=[('plain', '未壓縮'), ('zlib', 'zlib'), ('zstd', 'zstd')], default='plain', max_length=8, verbose_name='壓縮格式')),
+                ('text', models.TextField(blank=True, default='', verbose_name='內容')),
+                ('data', models.BinaryField(blank=True, null=True, verbose_name='壓縮後內容')),
+            ],
+        ),
+        migrations.RunPython(move_content_out, move_content_back),
+        # 反向時先以空字串為預設值加回 NOT NULL 欄位 (已有資料列)，內文由 move_content_back 填回
+        migrations.RunSQL(
+            sql='ALTER TABLE core_chapter DROP COLUMN content',
+            reverse_sql=[
+                "ALTER TABLE core_chapter ADD COLUMN content text NOT NULL DEFAULT ''",
+                'ALTER TABLE core_chapter ALTER COLUMN content DROP DEFAULT',
+            ],
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='chapter',
+                    name='content',
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_chapter_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='volume',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='最後更新時間'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.23 on 2026-10-18 18:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_volume_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NovelDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='觀看數')),
+                ('bookmarks', models.IntegerField(default=0, verbose_name='收藏增減')),
+                ('novel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='core.novel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='novel_daily_stat_date_idx')],
+                'unique_together': {('novel', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(choices=[('views', '人氣'), ('bookmarks', '收藏')], max_length=20)),
+                ('period', models.CharField(choices=[('daily', '日榜'), ('weekly', '週榜'), ('monthly', '月榜'), ('all_time', '總榜')], max_length=20)),
+                ('rank', models.PositiveIntegerField(verbose_name='名次')),
+                ('score', models.BigIntegerField(verbose_name='分數')),
+                ('computed_at', models.DateTimeField(verbose_name='計算時間')),
+                ('novel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.novel')),
+            ],
+            options={
+                'ordering': ['board', 'period', 'rank'],
+                'unique_together': {('board', 'period', 'rank')},
+            },
+        ),
+    ]
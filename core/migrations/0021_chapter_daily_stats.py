@@ -0,0 +1,28 @@
+# Generated by Django 4.2.23 on 2026-10-18 18:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_leaderboards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChapterDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='觀看數')),
+                ('chapter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='core.chapter')),
+                ('novel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chapter_daily_stats', to='core.novel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['novel', 'date'], include=('chapter', 'views'), name='chapter_daily_stat_range_idx')],
+                'unique_together': {('novel', 'chapter', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-18 18:44
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_chapter_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('file', models.CharField(max_length=255, unique=True, verbose_name='檔案路徑')),
+                ('size', models.PositiveBigIntegerField(verbose_name='檔案大小')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='引用數')),
+                ('uploaded_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='上傳時間')),
+                ('chapters', models.ManyToManyField(blank=True, related_name='media_blobs', to='core.chapter')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('ref_count', 0)), fields=['uploaded_at'], name='media_blob_unreferenced_idx')],
+            },
+        ),
+    ]
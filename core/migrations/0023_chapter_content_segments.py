@@ -0,0 +1,36 @@
+# Generated by Django 4.2.23 on 2026-10-18 18:47
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+def compute_segments(apps, schema_editor):
+    from core.content_codec import decode
+    from core.segments import split_offsets
+
+    ChapterContent = apps.get_model('core', 'ChapterContent')
+
+    batch = []
+    for body in ChapterContent.objects.iterator(chunk_size=500):
+        body.segments = split_offsets(decode(body.codec, body.text, body.data))
+        batch.append(body)
+        if len(batch) >= 500:
+            ChapterContent.objects.bulk_update(batch, ['segments'])
+            batch = []
+    if batch:
+        ChapterContent.objects.bulk_update(batch, ['segments'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chaptercontent',
+            name='segments',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.PositiveIntegerField(), blank=True, default=list, size=None, verbose_name='區段起點'),
+        ),
+        migrations.RunPython(compute_segments, migrations.RunPython.noop),
+    ]
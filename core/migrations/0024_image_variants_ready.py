@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_chapter_content_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='image_variants',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='已產生衍生版本的圖片'),
+        ),
+        migrations.AddField(
+            model_name='mediablob',
+            name='image_variants',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='已產生衍生版本的圖片'),
+        ),
+        migrations.AddField(
+            model_name='novel',
+            name='image_variants',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='已產生衍生版本的圖片'),
+        ),
+        migrations.AddField(
+            model_name='volume',
+            name='image_variants',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='已產生衍生版本的圖片'),
+        ),
+    ]
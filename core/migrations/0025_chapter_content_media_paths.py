@@ -0,0 +1,44 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:19
+
+import re
+from urllib.parse import unquote
+
+import django.contrib.postgres.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+def compute_media_paths(apps, schema_editor):
+    # 與 core.media_gc.referenced_media 相同的規則
+    from core.content_codec import decode
+
+    media_url = re.compile(re.escape(settings.MEDIA_URL) + r'([^"\'\s?#,<>()]+)')
+    ChapterContent = apps.get_model('core', 'ChapterContent')
+
+    batch = []
+    for body in ChapterContent.objects.iterator(chunk_size=500):
+        html = decode(body.codec, body.text, body.data) or ''
+        body.media_paths = sorted({unquote(path) for path in media_url.findall(html)})
+        if not body.media_paths:
+            continue
+        batch.append(body)
+        if len(batch) >= 500:
+            ChapterContent.objects.bulk_update(batch, ['media_paths'])
+            batch = []
+    if batch:
+        ChapterContent.objects.bulk_update(batch, ['media_paths'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_image_variants_ready'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chaptercontent',
+            name='media_paths',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), blank=True, default=list, size=None, verbose_name='引用的媒體檔案'),
+        ),
+        migrations.RunPython(compute_media_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_chapter_content_media_paths'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='bookmark_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='收藏數'),
+        ),
+    ]
@@ -1,9 +1,14 @@
 # novel_backend/core/models.py
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 class CustomUser(AbstractUser):
     class Role(models.TextChoices):
@@ -24,6 +29,8 @@ class CustomUser(AbstractUser):
         blank=True, 
         verbose_name="頭像"
     )
+    # 已產生衍生版本的圖片路徑 (見 core/image_variants.py)；與目前的圖片相同時 serializer 才輸出 srcset
+    image_variants = models.CharField(max_length=255, blank=True, default='', editable=False, verbose_name="已產生衍生版本的圖片")
     
     discord_webhook_url = models.URLField(
         max_length=200, 
@@ -54,6 +61,27 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
     if instance.role == CustomUser.Role.AUTHOR:
         AuthorProfile.objects.get_or_create(user=instance)
 
+class NovelQuerySet(models.QuerySet):
+    def refresh_chapter_stats(self, **extra):
+        """
+        以單一 UPDATE 重新計算最新已發布章節與已發布章節數 (反正規化欄位)。
+        章節的儲存/刪除訊號與回填指令都使用這個方法；extra 為一併寫入的其他欄位。
+        """
+        published = Chapter.objects.filter(novel=models.OuterRef('pk'), status=Chapter.Status.PUBLISHED)
+        latest = published.order_by('-updated_at')
+        return self.update(
+            latest_chapter=models.Subquery(latest.values('pk')[:1]),
+            latest_chapter_title=Coalesce(
+                models.Subquery(latest.values('title')[:1]), models.Value('')
+            ),
+            latest_chapter_updated_at=models.Subquery(latest.values('updated_at')[:1]),
+            published_chapter_count=Coalesce(
+                models.Subquery(published.order_by().values('novel').annotate(c=models.Count('pk')).values('c')), 0
+            ),
+            **extra,
+        )
+
+
 class Novel(models.Model):
     class Status(models.TextChoices):
         ONGOING = "ONGOING", "連載中"
@@ -79,15 +107,121 @@ class Novel(models.Model):
     )
     description = models.TextField(verbose_name="簡介")
     cover_image = models.ImageField(upload_to='novel_covers/', null=True, blank=True, verbose_name="封面圖片")
+    # 封面的衍生版本產生完成時記下封面路徑
+    image_variants = models.CharField(max_length=255, blank=True, default='', editable=False, verbose_name="已產生衍生版本的圖片")
     status = models.CharField(max_length=50, choices=Status.choices, default=Status.ONGOING, verbose_name="狀態")
     category = models.CharField(max_length=50, choices=Category.choices, default=Category.OTHERS, verbose_name="分類")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="建立時間")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="最後更新時間")
     views = models.PositiveIntegerField(default=0, verbose_name="總觀看次數")
 
+    # 以下為反正規化欄位，由章節的儲存/刪除訊號維護，列表頁不必再查章節表
+    latest_chapter = models.ForeignKey(
+        'Chapter',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="最新章節"
+    )
+    latest_chapter_title = models.CharField(max_length=255, blank=True, default='', verbose_name="最新章節標題")
+    latest_chapter_updated_at = models.DateTimeField(null=True, blank=True, verbose_name="最新章節更新時間")
+    published_chapter_count = models.PositiveIntegerField(default=0, verbose_name="已發布章節數")
+
+    # 全文搜尋用的 tsvector，由 pre_save 訊號維護 (斷詞見 core/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = NovelQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='novel_search_vector_gin'),
+            GinIndex(fields=['title'], name='novel_title_trgm', opclasses=['gin_trgm_ops']),
+        ]
+
     def __str__(self):
         return self.title
 
+@receiver(pre_save, sender=Novel)
+def update_novel_search_vector(sender, instance, update_fields=None, **kwargs):
+    """儲存小說時一併重建搜尋向量，與其他欄位在同一個 UPDATE 中寫入。"""
+    if update_fields is not None and 'search_vector' not in update_fields:
+        return
+    from .search import novel_document
+    # 搜尋文件需要筆名與帳號；instance 上沒有快取時以一次查詢取回作者與使用者
+    author = instance.author if Novel.author.is_cached(instance) else None
+    if author is None or not AuthorProfile.user.is_cached(author):
+        author = AuthorProfile.objects.select_related('user').get(pk=instance.author_id)
+    instance.search_vector = novel_document(instance, author=author)
+
+def _refresh_author_novels_search_vector(author):
+    """以 author (需已帶有 user) 重建該作者所有小說的搜尋向量，一次 bulk_update 寫回。"""
+    from .search import novel_document
+    novels = list(author.novels.only('id', 'title', 'description'))
+    for novel in novels:
+        novel.search_vector = novel_document(novel, author=author)
+    Novel.objects.bulk_update(novels, ['search_vector'], batch_size=500)
+
+@receiver(pre_save, sender=AuthorProfile)
+def track_pen_name_change(sender, instance, update_fields=None, **kwargs):
+    """記下這次儲存是否改了筆名；只改簡介等其他欄位時不必重建搜尋向量。"""
+    instance._pen_name_changed = False
+    if instance._state.adding or (update_fields is not None and 'pen_name' not in update_fields):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list('pen_name', flat=True).first()
+    instance._pen_name_changed = previous is not None and previous != instance.pen_name
+
+@receiver(post_save, sender=AuthorProfile)
+def update_author_novels_search_vector(sender, instance, created, **kwargs):
+    """筆名變更時，更新該作者所有小說的搜尋向量。"""
+    if not getattr(instance, '_pen_name_changed', False):
+        return
+    _refresh_author_novels_search_vector(instance)
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def track_username_change(sender, instance, update_fields=None, **kwargs):
+    """帳號也在小說的搜尋文件中；記下這次儲存是否改了帳號，由 post_save 更新搜尋向量。"""
+    instance._username_changed = False
+    if instance._state.adding or (update_fields is not None and 'username' not in update_fields):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+    instance._username_changed = previous is not None and previous != instance.username
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_user_novels_search_vector(sender, instance, created, **kwargs):
+    """帳號變更時，更新該使用者 (作者) 所有小說的搜尋向量。"""
+    if not getattr(instance, '_username_changed', False):
+        return
+    author = AuthorProfile.objects.filter(user=instance).first()
+    if author is not None:
+        author.user = instance
+        _refresh_author_novels_search_vector(author)
+
+@receiver(post_save, sender=Novel)
+@receiver(models.signals.post_delete, sender=Novel)
+def invalidate_novel_seo_cache(sender, instance, **kwargs):
+    """小說的標題、簡介或封面可能改變，清除 SEO 頁面的 meta 快取。"""
+    from .seo_views import invalidate_novel_seo
+    invalidate_novel_seo(instance.pk)
+
+@receiver(post_save, sender=AuthorProfile)
+@receiver(models.signals.post_delete, sender=AuthorProfile)
+def invalidate_author_seo_cache(sender, instance, **kwargs):
+    """筆名出現在作者頁與該作者所有小說頁的標題中，兩者一併清除。"""
+    from .seo_views import invalidate_author_seo, invalidate_novel_seo
+    invalidate_author_seo(instance.user_id)
+    novel_ids = list(Novel.objects.filter(author=instance).values_list('id', flat=True))
+    if novel_ids:
+        invalidate_novel_seo(*novel_ids)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_seo_cache(sender, instance, created, **kwargs):
+    """作者頁使用使用者頭像作為 og:image。"""
+    if created:
+        return
+    from .seo_views import invalidate_author_seo
+    invalidate_author_seo(instance.pk)
+
 class Volume(models.Model):
     novel = models.ForeignKey(
         Novel,
@@ -98,7 +232,9 @@ class Volume(models.Model):
     title = models.CharField(max_length=255, verbose_name="卷標題")
     description = models.TextField(verbose_name="簡介", blank=True)
     cover_image = models.ImageField(upload_to='volume_covers/', null=True, blank=True, verbose_name="卷封面")
+    image_variants = models.CharField(max_length=255, blank=True, default='', editable=False, verbose_name="已產生衍生版本的圖片")
     order = models.PositiveIntegerField(verbose_name="卷順序")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="最後更新時間")
 
     class Meta:
         unique_together = ('novel', 'order')
@@ -127,8 +263,7 @@ class Chapter(models.Model):
         verbose_name="所屬卷"
     )
     title = models.CharField(max_length=255, verbose_name="章節標題")
-    content = models.TextField(verbose_name="內容", default='')
-    order = models.PositiveIntegerField(verbose_name="章節順序")
+    # 內文存放在 ChapterContent (見下方 content 屬性)，列表與關聯查詢不會帶出整篇內文
     order = models.PositiveIntegerField(verbose_name="章節順序")
     published_at = models.DateTimeField(auto_now_add=True, verbose_name="發布時間")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="最後更新時間")
@@ -147,6 +282,125 @@ class Chapter(models.Model):
     def __str__(self):
         return f"{self.novel.title} - Chapter {self.order}: {self.title}"
 
+    # 指定給 content 但還沒寫入 ChapterContent 的內文
+    _pending_content = None
+    # 從資料庫讀出時的狀態；儲存後用來判斷是否發布或取消發布 (小說卡片是否改變)
+    _loaded_status = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    @property
+    def content(self):
+        """
+        章節內文。未預先載入時會另外查詢一次 ChapterContent，
+        需要內文的查詢請加上 select_related('body')。
+        """
+        if self._pending_content is not None:
+            return self._pending_content
+        try:
+            return self.body.value
+        except ChapterContent.DoesNotExist:
+            return ''
+
+    @content.setter
+    def content(self, value):
+        self._pending_content = value or ''
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if adding and self._pending_content is None:
+            self._pending_content = ''
+        super().save(*args, **kwargs)
+        if self._pending_content is not None:
+            from .media_store import sync_chapter_media
+            ChapterContent.store(self, self._pending_content)
+            sync_chapter_media(self, self._pending_content, created=adding)
+            self._pending_content = None
+
+
+class ChapterContent(models.Model):
+    """
+    章節內文，與 Chapter 分開存放，只有閱讀與編輯單一章節時才會讀取。
+    依 CHAPTER_CONTENT_CODEC 可選擇壓縮 (見 core/content_codec.py)；
+    未壓縮的內文放在 text，壓縮後的放在 data。
+    """
+    class Codec(models.TextChoices):
+        PLAIN = "plain", "未壓縮"
+        ZLIB = "zlib", "zlib"
+        ZSTD = "zstd", "zstd"
+
+    chapter = models.OneToOneField(
+        Chapter,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='body'
+    )
+    codec = models.CharField(max_length=8, choices=Codec.choices, default=Codec.PLAIN, verbose_name="壓縮格式")
+    text = models.TextField(blank=True, default='', verbose_name="內容")
+    data = models.BinaryField(null=True, blank=True, verbose_name="壓縮後內容")
+    # 各區段在內文中的起點 (見 core/segments.py)，閱讀器可以只載入部分區段
+    segments = ArrayField(models.PositiveIntegerField(), default=list, blank=True, verbose_name="區段起點")
+    # 內文引用的媒體檔案 (相對於 MEDIA_ROOT)，gc_orphan_media 不必重新解析所有章節 (見 core/media_gc.py)
+    media_paths = ArrayField(models.TextField(), default=list, blank=True, verbose_name="引用的媒體檔案")
+
+    @property
+    def value(self):
+        from .content_codec import decode
+        return decode(self.codec, self.text, self.data)
+
+    @classmethod
+    def store(cls, chapter, content):
+        """以單一 upsert 寫入章節內文、區段起點與引用的媒體檔案，並放進 chapter.body 的快取。"""
+        from .content_codec import encode
+        from .media_gc import referenced_media
+        from .segments import split_offsets
+        codec, text, data = encode(content)
+        body = cls(
+            chapter=chapter, codec=codec, text=text, data=data,
+            segments=split_offsets(content), media_paths=sorted(referenced_media(content)),
+        )
+        cls.objects.bulk_create(
+            [body],
+            update_conflicts=True,
+            unique_fields=['chapter'],
+            update_fields=['codec', 'text', 'data', 'segments', 'media_paths'],
+        )
+        return body
+
+
+class ChapterSearchDocument(models.Model):
+    """
+    章節內文的全文搜尋向量。
+    獨立成一張表，避免一般的章節查詢都拖著體積與內文相當的 tsvector。
+    """
+    chapter = models.OneToOneField(
+        Chapter,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    search_vector = SearchVectorField(null=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='chapter_search_vector_gin'),
+        ]
+
+@receiver(post_save, sender=Chapter)
+def update_chapter_search_document(sender, instance, **kwargs):
+    """只重建被儲存的這一章的搜尋向量 (單一 upsert)，不需要重新索引整本小說。"""
+    from .search import chapter_document
+    ChapterSearchDocument.objects.bulk_create(
+        [ChapterSearchDocument(chapter=instance, search_vector=chapter_document(instance))],
+        update_conflicts=True,
+        unique_fields=['chapter'],
+        update_fields=['search_vector'],
+    )
+
 
 class ReadingProgress(models.Model):
     """追蹤使用者的閱讀進度與書架"""
@@ -175,12 +429,227 @@ class ReadingProgress(models.Model):
     def __str__(self):
         return f"{self.user.username} is reading {self.novel.title}"
 
+class NovelDailyStat(models.Model):
+    """
+    每本小說每天的觀看數與收藏增減，供排行榜的滾動時間區間使用。
+    觀看數由觀看次數計數器 flush 時寫入，收藏由 ReadingProgress 的訊號寫入 (見 core/daily_stats.py)。
+    """
+    novel = models.ForeignKey(Novel, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField(verbose_name="日期")
+    views = models.PositiveIntegerField(default=0, verbose_name="觀看數")
+    bookmarks = models.IntegerField(default=0, verbose_name="收藏增減")
+
+    class Meta:
+        unique_together = ('novel', 'date')
+        indexes = [
+            models.Index(fields=['date'], name='novel_daily_stat_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.novel_id} @ {self.date}: {self.views} views, {self.bookmarks:+d} bookmarks"
+
+
+class ChapterDailyStat(models.Model):
+    """
+    每個章節每天的觀看數，只會累加、不會改寫過去的日期，供作者分析的時間區間與留存率使用。
+    由觀看次數計數器 flush 時寫入。novel 為反正規化欄位，讓整本小說的區間查詢只需掃描一段索引。
+    """
+    novel = models.ForeignKey(Novel, on_delete=models.CASCADE, related_name='chapter_daily_stats')
+    chapter = models.ForeignKey(Chapter, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField(verbose_name="日期")
+    views = models.PositiveIntegerField(default=0, verbose_name="觀看數")
+
+    class Meta:
+        unique_together = ('novel', 'chapter', 'date')
+        indexes = [
+            # 整本小說的日期區間查詢可以只讀索引完成
+            models.Index(fields=['novel', 'date'], include=['chapter', 'views'], name='chapter_daily_stat_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.chapter_id} @ {self.date}: {self.views} views"
+
+
+class LeaderboardEntry(models.Model):
+    """
+    預先計算好的排行榜 (refresh_leaderboards 指令定期重建)。
+    每個 (board, period) 組合存放前 N 名，讀取時依 rank 取出即可。
+    """
+    class Board(models.TextChoices):
+        VIEWS = "views", "人氣"
+        BOOKMARKS = "bookmarks", "收藏"
+
+    class Period(models.TextChoices):
+        DAILY = "daily", "日榜"
+        WEEKLY = "weekly", "週榜"
+        MONTHLY = "monthly", "月榜"
+        ALL_TIME = "all_time", "總榜"
+
+    board = models.CharField(max_length=20, choices=Board.choices)
+    period = models.CharField(max_length=20, choices=Period.choices)
+    rank = models.PositiveIntegerField(verbose_name="名次")
+    novel = models.ForeignKey(Novel, on_delete=models.CASCADE, related_name='+')
+    score = models.BigIntegerField(verbose_name="分數")
+    # 重建時一併記下的收藏數，讀取排行榜時不必再對書架計數
+    bookmark_count = models.PositiveIntegerField(default=0, verbose_name="收藏數")
+    computed_at = models.DateTimeField(verbose_name="計算時間")
+
+    class Meta:
+        unique_together = ('board', 'period', 'rank')
+        ordering = ['board', 'period', 'rank']
+
+    def __str__(self):
+        return f"{self.board}/{self.period} #{self.rank}: {self.novel_id} ({self.score})"
+
+
+class MediaBlob(models.Model):
+    """
+    以內容雜湊 (SHA-256) 存放的上傳圖片。
+    同一張圖重複上傳時直接回傳既有的檔案；ref_count 是內文引用這張圖的章節數，
+    歸零且超過保留期限的檔案由 gc_media_blobs 指令刪除。
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.CharField(max_length=255, unique=True, verbose_name="檔案路徑")
+    size = models.PositiveBigIntegerField(verbose_name="檔案大小")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="引用數")
+    chapters = models.ManyToManyField(Chapter, related_name='media_blobs', blank=True)
+    # 最近一次上傳的時間；重複上傳也會更新，剛貼進編輯器、尚未儲存的圖片不會被回收
+    uploaded_at = models.DateTimeField(default=timezone.now, verbose_name="上傳時間")
+    # 已產生衍生版本的檔案路徑；與 file 相同時表示衍生版本已就緒
+    image_variants = models.CharField(max_length=255, blank=True, default='', verbose_name="已產生衍生版本的圖片")
+
+    class Meta:
+        indexes = [
+            # 垃圾回收只查詢沒有引用的檔案
+            models.Index(fields=['uploaded_at'], condition=models.Q(ref_count=0), name='media_blob_unreferenced_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.file} ({self.ref_count} refs)"
+
+@receiver(post_save, sender=ReadingProgress)
+@receiver(models.signals.post_delete, sender=ReadingProgress)
+def record_daily_bookmark(sender, instance, created=False, **kwargs):
+    """加入書架記為當天 +1，移出書架記為 -1；更新閱讀進度不影響收藏數。"""
+    if kwargs['signal'] is post_save and not created:
+        return
+    origin = kwargs.get('origin')
+    if kwargs['signal'] is not post_save and getattr(origin, 'model', type(origin)) is not ReadingProgress:
+        # 刪除小說或使用者時連帶刪除的書架紀錄不算作取消收藏
+        return
+    from .daily_stats import add_daily
+    add_daily(NovelDailyStat, ['novel'], 'bookmarks', {(instance.novel_id,): 1 if created else -1})
+
 @receiver(post_save, sender=Chapter)
 @receiver(models.signals.post_delete, sender=Chapter)
-def update_novel_timestamp(sender, instance, **kwargs):
+def update_novel_timestamp(sender, instance, using, **kwargs):
     """
-    當章節被儲存或刪除時，更新所屬小說的 updated_at 時間。
+    當章節被儲存或刪除時，更新所屬小說的 updated_at 時間與反正規化的最新章節欄位。
     這樣可以確保小說在列表排序時能反映出最新的變動。
+    閱讀順序索引與 ETag 都以 updated_at 作為版本，時間戳一改變舊的就不再被使用。
+    """
+    schedule_novel_refresh(instance.novel_id, using)
+
+
+class _PendingNovelRefresh:
+    """一個 atomic 區塊內有章節變動的小說，commit 時以一條 UPDATE 一起更新。"""
+
+    def __init__(self, connection, block):
+        self.connection = connection
+        self.block = block
+        self.novel_ids = set()
+
+    def __call__(self):
+        _pending_refreshes(self.connection).pop(self.block, None)
+        Novel.objects.using(self.connection.alias).filter(pk__in=self.novel_ids).refresh_chapter_stats(
+            updated_at=timezone.now()
+        )
+
+
+def _pending_refreshes(connection):
+    """這個連線上尚未 commit 的 _PendingNovelRefresh，以登記它的 atomic 區塊為 key。"""
+    return connection.__dict__.setdefault('pending_novel_refreshes', {})
+
+
+def schedule_novel_refresh(novel_id, using=None):
+    """
+    安排在 transaction commit 時更新小說的 updated_at 與反正規化欄位。
+    只以 queryset.update() 寫入這幾個欄位，不重新儲存整個 Novel (也不觸發 Novel 的訊號)；
+    同一個 transaction 內的多次章節變動合併成一次，不在 transaction 中時立即執行。
     """
-    # 重新儲存 Novel 實例會觸發 auto_now=True 更新 updated_at
-    instance.novel.save()
\ No newline at end of file
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        Novel.objects.using(connection.alias).filter(pk=novel_id).refresh_chapter_stats(
+            updated_at=timezone.now()
+        )
+        return
+
+    pending_by_block = _pending_refreshes(connection)
+    open_blocks = connection.atomic_blocks
+    # 已離開的區塊：rollback 時它的 callback 已被丟棄，commit 時已執行或併入外層，都不再加入新的小說
+    for block in [b for b in pending_by_block if not any(b is open_block for open_block in open_blocks)]:
+        del pending_by_block[block]
+    # 外層區塊登記的 callback 不會因內層 rollback 被丟棄，沿用它即可；
+    # 內層 rollback 掉的章節變動也一起重算，結果仍以資料庫中的章節為準
+    for block in open_blocks:
+        pending = pending_by_block.get(block)
+        if pending is not None:
+            break
+    else:
+        block = open_blocks[-1]
+        pending = pending_by_block[block] = _PendingNovelRefresh(connection, block)
+        transaction.on_commit(pending, using=connection.alias)
+    pending.novel_ids.add(novel_id)
+
+
+@receiver(post_save, sender=Novel)
+@receiver(models.signals.post_delete, sender=Novel)
+@receiver(models.signals.post_delete, sender=ReadingProgress)
+@receiver(post_save, sender=AuthorProfile)
+def invalidate_novel_list_cache(sender, instance, **kwargs):
+    """小說卡片的內容、排序或收藏數可能改變，讓匿名列表的回應快取失效。"""
+    from .list_cache import invalidate_novel_lists
+    invalidate_novel_lists()
+
+@receiver(post_save, sender=ReadingProgress)
+def invalidate_novel_list_cache_for_bookmark(sender, instance, created, **kwargs):
+    """加入書架才會改變收藏數；更新閱讀進度不影響卡片。"""
+    if created:
+        from .list_cache import invalidate_novel_lists
+        invalidate_novel_lists()
+
+@receiver(post_save, sender=Chapter)
+@receiver(models.signals.post_delete, sender=Chapter)
+def invalidate_novel_list_cache_for_chapter(sender, instance, **kwargs):
+    """
+    卡片顯示已發布章節數與最新已發布章節 (標題與更新時間)，只有已發布、或剛取消發布的章節會改變它們；
+    草稿的自動儲存不讓快取失效。
+    """
+    published = Chapter.Status.PUBLISHED
+    was_published = instance._loaded_status == published
+    if kwargs['signal'] is post_save:
+        instance._loaded_status = instance.status
+    if instance.status == published or was_published:
+        from .list_cache import invalidate_novel_lists
+        invalidate_novel_lists()
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_novel_list_cache_for_user(sender, instance, created, **kwargs):
+    """卡片上顯示作者的使用者名稱與頭像。"""
+    if created or not hasattr(instance, 'author_profile'):
+        return
+    from .list_cache import invalidate_novel_lists
+    invalidate_novel_lists()
+
+@receiver(post_save, sender=Novel)
+@receiver(post_save, sender=Volume)
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def generate_image_variants(sender, instance, **kwargs):
+    """封面與頭像在 commit 後產生縮圖與 WebP/AVIF 版本 (見 core/image_variants.py)。"""
+    from .image_variants import schedule_variants
+    schedule_variants(instance)
+
+@receiver(models.signals.pre_delete, sender=Chapter)
+def release_chapter_media(sender, instance, **kwargs):
+    """章節刪除時釋放它對上傳圖片的引用 (M2M 關聯會隨章節一起刪除，引用數需另外扣回)。"""
+    MediaBlob.objects.filter(chapters=instance).update(ref_count=models.F('ref_count') - 1)
@@ -0,0 +1,67 @@
+# novel_backend/core/reading_order.py
+"""
+每本小說已發布章節的閱讀順序索引。
+
+索引放在 Django cache 中，key 帶上小說的 updated_at：章節的發布、取消發布、
+排序與刪除都會透過 update_novel_timestamp 訊號更新小說的 updated_at，
+因此即使每個 worker 各自使用 local-memory cache，也不會讀到過期的索引。
+"""
+from bisect import bisect_left, bisect_right
+
+from django.core.cache import cache
+
+from .models import Chapter
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class ReadingOrder:
+    """已發布章節依 order 排序後的 id 列表，附帶 id -> 位置 的對照表。"""
+
+    def __init__(self, chapters):
+        # chapters: [(id, order), ...]，已依 order 排序
+        self.chapter_ids = [chapter_id for chapter_id, _ in chapters]
+        self.orders = [order for _, order in chapters]
+        self.positions = {chapter_id: index for index, chapter_id in enumerate(self.chapter_ids)}
+
+    def neighbors(self, chapter_id, order=None):
+        """
+        回傳 (上一章 id, 下一章 id)。
+        草稿章節不在索引中，此時以傳入的 order 找出前後最近的已發布章節。
+        """
+        index = self.positions.get(chapter_id)
+        if index is not None:
+            prev_index, next_index = index - 1, index + 1
+        elif order is not None:
+            prev_index = bisect_left(self.orders, order) - 1
+            next_index = bisect_right(self.orders, order)
+        else:
+            return None, None
+
+        prev_id = self.chapter_ids[prev_index] if prev_index >= 0 else None
+        next_id = self.chapter_ids[next_index] if next_index < len(self.chapter_ids) else None
+        return prev_id, next_id
+
+    def following(self, chapter_id, count):
+        """回傳 chapter_id 之後的 count 個已發布章節 id。"""
+        index = self.positions.get(chapter_id)
+        if index is None:
+            return []
+        return self.chapter_ids[index + 1:index + 1 + count]
+
+
+def _cache_key(novel):
+    return f'reading_order:{novel.pk}:{novel.updated_at.timestamp()}'
+
+
+def get_reading_order(novel):
+    """取得小說的閱讀順序索引，cache 中沒有時以一次查詢建立。"""
+    key = _cache_key(novel)
+    reading_order = cache.get(key)
+    if reading_order is None:
+        chapters = Chapter.objects.filter(
+            novel_id=novel.pk, status=Chapter.Status.PUBLISHED
+        ).order_by('order').values_list('id', 'order')
+        reading_order = ReadingOrder(list(chapters))
+        cache.set(key, reading_order, CACHE_TIMEOUT)
+    return reading_order
@@ -0,0 +1,224 @@
+# novel_backend/core/search.py
+"""
+小說與章節內文的全文搜尋 (PostgreSQL)。
+
+PostgreSQL 內建的 parser 不會斷開中文，所以斷詞在 Python 端完成：
+英數字以單字為單位，CJK 連續字元切成重疊的雙字 (bigram)。
+tsvector / tsquery 直接以這些 token 組成字面值，不經過資料庫的 parser 與字典，
+查詢時同一段 CJK 文字的 bigram 以 <-> 串接，等同片語比對。
+標題另外建立 pg_trgm 索引，處理英數字查詢的錯字與部分相符。
+"""
+import html
+import re
+
+from django.contrib.postgres.search import SearchQueryField, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import BooleanField, F, Func, Q, Value
+from django.db.models.functions import Cast
+from django.utils.html import escape
+from rest_framework.filters import SearchFilter
+
+# 日文假名、CJK 統一漢字 (含擴充 A)、韓文音節、相容漢字
+_CJK_RANGES = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+_CJK_RE = re.compile(f'[{_CJK_RANGES}]')
+_TOKEN_RE = re.compile(f'[{_CJK_RANGES}]+|[^\\W_{_CJK_RANGES}]+')
+
+# tsvector 的限制：位置最大 16383，每個 lexeme 最多 256 個位置
+MAX_POSITION = 16383
+MAX_POSITIONS_PER_LEXEME = 256
+# 不同欄位之間的位置間隔，避免跨欄位的片語比對
+FIELD_GAP = 100
+
+# 模糊比對的相似度權重低於全文比對，確保精確命中排在前面
+TRIGRAM_WEIGHT = 0.5
+
+# 區塊標籤換成空白，行內標籤 (strong、em、a...) 直接移除，避免把中文詞切開
+_BLOCK_TAG_RE = re.compile(r'</?(?:p|h[1-6]|li|ul|ol|blockquote|pre|div|br|hr|img|table|tr|td|th)\b[^>]*>', re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]*>')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def tokenize(text):
+    """
+    將文字切成搜尋用的 token 列表 (依出現順序，可重複)。
+    每個 CJK 連續片段回傳一組 bigram；只有一個字的片段保留單字。
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer((text or '').lower()):
+        run = match.group()
+        if _CJK_RE.match(run) and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def _quote_lexeme(token):
+    return "'" + token.replace('\\', '\\\\').replace("'", "''") + "'"
+
+
+def build_document(*fields):
+    """
+    由 (文字, 權重) 組成 tsvector 字面值，權重為 'A' ~ 'D'。
+    結果可直接指定給 SearchVectorField。
+    """
+    positions = {}
+    offset = 0
+    for text, weight in fields:
+        tokens = tokenize(text)
+        for index, token in enumerate(tokens):
+            entries = positions.setdefault(token, [])
+            if len(entries) < MAX_POSITIONS_PER_LEXEME:
+                entries.append(f'{min(offset + index + 1, MAX_POSITION)}{weight}')
+        offset += len(tokens) + FIELD_GAP
+
+    return ' '.join(
+        f"{_quote_lexeme(token)}:{','.join(entries)}" for token, entries in positions.items()
+    )
+
+
+def build_query(text):
+    """
+    將使用者輸入轉成 tsquery 字面值；沒有可用 token 時回傳 None。
+    以空白分隔的詞彼此為 AND，同一詞內的 CJK bigram 以 <-> 串成片語；
+    單一 CJK 字與最後一個英數詞使用前綴比對。
+    """
+    terms = []
+    words = (text or '').split()
+    for word_index, word in enumerate(words):
+        for match in _TOKEN_RE.finditer(word.lower()):
+            run = match.group()
+            is_cjk = bool(_CJK_RE.match(run))
+            if is_cjk and len(run) > 1:
+                bigrams = [_quote_lexeme(run[i:i + 2]) for i in range(len(run) - 1)]
+                terms.append('(' + ' <-> '.join(bigrams) + ')')
+            elif is_cjk or word_index == len(words) - 1:
+                terms.append(_quote_lexeme(run) + ':*')
+            else:
+                terms.append(_quote_lexeme(run))
+    return ' & '.join(terms) or None
+
+
+def novel_document(novel, author=None):
+    """小說的搜尋文件：標題 (A)、筆名與帳號 (B)、簡介 (C)。"""
+    author = author or novel.author
+    return build_document(
+        (novel.title, 'A'),
+        (f'{author.pen_name} {author.user.username}', 'B'),
+        (novel.description, 'C'),
+    )
+
+
+def html_to_text(content):
+    """移除 Tiptap HTML 的標籤並還原實體字元；區塊之間以空白分隔，避免前後段落黏在一起。"""
+    text = _BLOCK_TAG_RE.sub(' ', content or '')
+    text = html.unescape(_TAG_RE.sub('', text))
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+def chapter_document(chapter):
+    """章節的搜尋文件：標題 (A)、去除 HTML 後的內文 (B)。"""
+    return build_document(
+        (chapter.title, 'A'),
+        (html_to_text(chapter.content), 'B'),
+    )
+
+
+def build_snippet(content, text, radius=60):
+    """
+    從章節內文擷取第一個命中詞附近的片段，命中詞以 <mark> 標示。
+    回傳值已做 HTML escape，可直接插入頁面。
+    """
+    plain = html_to_text(content)
+    words = sorted({word.lower() for word in (text or '').split()}, key=len, reverse=True)
+    lowered = plain.lower()
+
+    hits = [lowered.find(word) for word in words]
+    hits = [hit for hit in hits if hit >= 0]
+    if not hits:
+        return escape(plain[:radius * 2])
+
+    start = max(min(hits) - radius, 0)
+    end = min(min(hits) + radius, len(plain))
+    excerpt = plain[start:end]
+    pattern = re.compile('|'.join(re.escape(word) for word in words), re.IGNORECASE)
+
+    parts = []
+    cursor = 0
+    for match in pattern.finditer(excerpt):
+        parts.append(escape(excerpt[cursor:match.start()]))
+        parts.append(f'<mark>{escape(match.group())}</mark>')
+        cursor = match.end()
+    parts.append(escape(excerpt[cursor:]))
+
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if end < len(plain) else ''
+    return prefix + ''.join(parts) + suffix
+
+
+def search_chapters(queryset, text):
+    """
+    以章節的搜尋向量過濾並加上相關度 (search_rank)；非 PostgreSQL 退回 ILIKE。
+    ILIKE 只比對得到未壓縮存放的內文。
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.filter(Q(title__icontains=text) | Q(body__text__icontains=text)).annotate(
+            search_rank=Value(0.0)
+        )
+
+    raw_query = build_query(text)
+    if not raw_query:
+        return queryset.none()
+    query = TsQuery(raw_query)
+    vector = F('search_document__search_vector')
+    return queryset.filter(TsMatch(vector, query)).annotate(
+        search_rank=SearchRank(vector, query)
+    )
+
+
+class TsQuery(Cast):
+    """將 tsquery 字面值轉型為 tsquery，不經過 to_tsquery 的 parser。"""
+
+    def __init__(self, query):
+        super().__init__(Value(query), output_field=SearchQueryField())
+
+
+class TsMatch(Func):
+    """vector @@ query，可直接放進 .filter() 並使用 GIN 索引。"""
+    template = '(%(expressions)s)'
+    arg_joiner = ' @@ '
+    output_field = BooleanField()
+
+
+class NovelSearchFilter(SearchFilter):
+    """
+    取代 DRF SearchFilter 的 ILIKE '%q%'：
+    以 search_vector 的 GIN 索引做全文比對，不含 CJK 的查詢另以 pg_trgm 對標題做模糊比對，
+    結果依相關度排序 (若請求另外指定 ordering，則由 OrderingFilter 覆蓋)。
+    非 PostgreSQL 的開發環境退回原本的 SearchFilter 行為。
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if connection.vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        text = ' '.join(self.get_search_terms(request))
+        if not text:
+            return queryset
+
+        condition = Q()
+        rank = Value(0.0)
+        raw_query = build_query(text)
+        if raw_query:
+            query = TsQuery(raw_query)
+            condition |= Q(TsMatch(F('search_vector'), query))
+            rank = SearchRank(F('search_vector'), query)
+        if not _CJK_RE.search(text):
+            # 只有英數字的查詢才加上標題的模糊比對：CJK 的部分相符已由 bigram 處理，
+            # 而 C locale 下 pg_trgm 不會為 CJK 產生 trigram，只會白白掃過整個 trigram 索引
+            condition |= Q(title__trigram_similar=text)
+            rank = rank + TrigramSimilarity('title', text) * TRIGRAM_WEIGHT
+        if not condition:
+            return queryset.none()
+
+        return queryset.filter(condition).annotate(search_rank=rank).order_by('-search_rank', '-updated_at')
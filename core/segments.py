@@ -0,0 +1,68 @@
+# novel_backend/core/segments.py
+"""
+把章節內文 (Tiptap 產生的 HTML) 切成以段落為邊界的區段。
+
+只在頂層元素之間切開，每個區段本身都是完整的 HTML，閱讀器可以只載入某幾段就開始排版。
+各區段的起點 (字元位置) 在儲存內文時算好，存放在 ChapterContent.segments，
+讀取時不需要重新解析 HTML。
+"""
+import re
+from html.parser import HTMLParser
+
+# 每個區段的目標長度 (HTML 字元數)；累積到這個長度後在下一個頂層元素之前切開
+SEGMENT_TARGET_CHARS = 4000
+
+_NEWLINE = re.compile('\n')
+
+# 不會有結束標籤的元素
+_VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr',
+])
+
+
+class _BlockBoundaries(HTMLParser):
+    """記錄每個頂層元素開始的位置 (以行、欄表示)。"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.depth = 0
+        self.starts = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.depth == 0:
+            self.starts.append(self.getpos())
+        if tag not in _VOID_ELEMENTS:
+            self.depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        if self.depth == 0:
+            self.starts.append(self.getpos())
+
+    def handle_endtag(self, tag):
+        if tag not in _VOID_ELEMENTS and self.depth > 0:
+            self.depth -= 1
+
+
+def split_offsets(html, target=SEGMENT_TARGET_CHARS):
+    """回傳各區段在 html 中的起點；空內文回傳 []，其餘第一個一定是 0。"""
+    if not html:
+        return []
+    parser = _BlockBoundaries()
+    parser.feed(html)
+    parser.close()
+
+    # getpos() 的行號從 1 開始、欄位從 0 開始
+    line_starts = [0] + [match.end() for match in _NEWLINE.finditer(html)]
+    boundaries = [line_starts[line - 1] + column for line, column in parser.starts]
+
+    offsets = [0]
+    for boundary in boundaries:
+        if boundary - offsets[-1] >= target:
+            offsets.append(boundary)
+    return offsets
+
+
+def segment_slices(offsets, length):
+    """由起點列表產生每個區段的 (起點, 終點)。"""
+    ends = offsets[1:] + [length]
+    return list(zip(offsets, ends))
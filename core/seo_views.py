@@ -1,249 +1,284 @@
 import os
-from django.http import HttpResponse, Http404
+import re
+import threading
+import time
+
 from django.conf import settings
-from .models import Novel
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.html import escape
 
-def packet_novel_seo(request, pk):
-    try:
-        novel = Novel.objects.get(pk=pk)
-    except Novel.DoesNotExist:
-        # Fallback to standard index.html if novel not found, or 404.
-        # Ideally, just serve index.html and let Vue handle 404, but we want SEO.
-        # Let's serve index.html untouched so Vue shows 404 page.
-        pass
-
-    # Path to the built frontend index.html
-    index_path = os.path.join(settings.BASE_DIR, 'frontend', 'dist', 'index.html')
-    
-    try:
-        with open(index_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-    except FileNotFoundError:
-        return HttpResponse("Frontend not built.", status=500)
+from .models import Novel, AuthorProfile
 
-    # Note: 'novel' variable might be undefined if DoesNotExist happened and we "pass".
-    # Rethink logic:
-    novel_obj = None
-    try:
-        novel_obj = Novel.objects.get(pk=pk)
-    except Novel.DoesNotExist:
-        return HttpResponse(html_content) # Return standard HTML, Vue handles 404
-
-    # Prepare logic for injection
-    title = f"{novel_obj.title} - {novel_obj.author.pen_name}"
-    description = novel_obj.description[:150] + "..." if len(novel_obj.description) > 150 else novel_obj.description
-    # Escape quotes to prevent breaking HTML
-    title = title.replace('"', '&quot;')
-    description = description.replace('"', '&quot;').replace('\n', ' ')
-    
-    cover_url = ""
-    if novel_obj.cover_image:
-        # Assuming MEDIA_URL is /media/
-        cover_url = request.build_absolute_uri(novel_obj.cover_image.url)
-
-    # Meta tags to inject
-    # We will replace <title>...</title> and add other tags before </head>
-    
-    meta_tags = f"""
+# Path to the built frontend index.html
+INDEX_PATH = os.path.join(settings.BASE_DIR, 'frontend', 'dist', 'index.html')
+
+# 每隔幾秒才檢查一次 index.html 是否被重新建置，平常的請求完全不碰磁碟
+TEMPLATE_CHECK_INTERVAL = 5
+
+# 小說/作者 meta 資料的快取時間；儲存時會由訊號主動失效
+SEO_CACHE_TIMEOUT = 60 * 10
+
+_TITLE_RE = re.compile(r'<title>.*?</title>', re.IGNORECASE | re.DOTALL)
+_HEAD_END_RE = re.compile(r'</head>', re.IGNORECASE)
+_BODY_RE = re.compile(r'<body[^>]*>', re.IGNORECASE)
+
+_MISSING = 'missing'
+
+
+class IndexTemplate:
+    """
+    將 frontend/dist/index.html 解析一次並在注入點切成片段，
+    之後每個頁面只需把預先切好的片段與 meta 標籤串接起來。
+    檔案的 mtime 或大小改變時 (重新部署前端) 會自動重新載入。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked_at = 0
+        self.html = None
+        self._fragments = None
+        self.version = 0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self.html is not None and now - self._checked_at < TEMPLATE_CHECK_INTERVAL:
+            return
+        with self._lock:
+            self._checked_at = now
+            stat = os.stat(self.path)  # 前端尚未建置時拋出 FileNotFoundError
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature:
+                return
+            with open(self.path, 'r', encoding='utf-8') as f:
+                html = f.read()
+            self._fragments = self._split(html)
+            self.html = html
+            self._signature = signature
+            self.version += 1
+
+    @staticmethod
+    def _split(html):
+        """
+        切成 (title 之前, title 到 </head>, </head> 到 <body> 結尾, <body> 之後)。
+        找不到 <title> 時 title 會改放在 meta 標籤中；找不到 </head> 或 <body> 則不注入該部分。
+        """
+        title = _TITLE_RE.search(html)
+        head_end = _HEAD_END_RE.search(html)
+        body = _BODY_RE.search(html)
+
+        if title and head_end and title.end() <= head_end.start():
+            before_title, after_title = html[:title.start()], html[title.end():head_end.start()]
+        else:
+            before_title, after_title = None, html[:head_end.start()] if head_end else html
+
+        if head_end:
+            body_end = body.end() if body and body.start() >= head_end.end() else head_end.end()
+            head_to_body = html[head_end.start():body_end]
+            rest = html[body_end:]
+        else:
+            head_to_body, rest = '', ''
+
+        return before_title, after_title, head_to_body, rest, bool(body)
+
+    def raw(self):
+        self._refresh()
+        return self.html
+
+    def render(self, title, meta_tags, body_content):
+        self._refresh()
+        before_title, after_title, head_to_body, rest, has_body = self._fragments
+        title_tag = f'<title>{title}</title>'
+        if before_title is None:
+            parts = [after_title, meta_tags, title_tag]
+        else:
+            parts = [before_title, title_tag, after_title, meta_tags]
+        parts.append(head_to_body)
+        if has_body:
+            parts.append(body_content)
+        parts.append(rest)
+        return ''.join(parts)
+
+
+index_template = IndexTemplate(INDEX_PATH)
+
+
+def _meta_tags(title, description, image, og_type, twitter_card):
+    return f"""
     <meta property="og:title" content="{title}" />
     <meta property="og:description" content="{description}" />
-    <meta property="og:image" content="{cover_url}" />
-    <meta property="og:type" content="book" />
+    <meta property="og:image" content="{image}" />
+    <meta property="og:type" content="{og_type}" />
     <meta name="description" content="{description}" />
-    <meta name="twitter:card" content="summary_large_image" />
+    <meta name="twitter:card" content="{twitter_card}" />
     <meta name="twitter:title" content="{title}" />
     <meta name="twitter:description" content="{description}" />
-    <meta name="twitter:image" content="{cover_url}" />
+    <meta name="twitter:image" content="{image}" />
     """
 
-    # Simple string replacement. 
-    # NOTE: index.html has <title>Vite + Vue + TS</title>
-    
-    if '<title>' in html_content:
-        html_content = html_content.replace(
-            f'<title>Vite + Vue + TS</title>', 
-            f'<title>{title}</title>'
-        )
-    else:
-         meta_tags += f"<title>{title}</title>"
 
-    if '</head>' in html_content:
-        html_content = html_content.replace('</head>', f'{meta_tags}</head>')
-    
+def _body_content(title, description):
     # Inject SEO content (H1, Description) into body for crawlers
     # Using a hidden div or noscript is one way, but Google renders JS. 
     # However, to satisfy "H1 missing" tools, we put it in the raw HTML.
-    # We place it before #app so it's present in the DOM. 
-    seo_body_content = f"""
+    return f"""
     <div style="position: absolute; left: -9999px; top: -9999px;">
         <h1>{title}</h1>
         <p>{description}</p>
     </div>
     """
-    if '<body>' in html_content:
-        html_content = html_content.replace('<body>', f'<body>{seo_body_content}')
 
-    return HttpResponse(html_content)
 
-def packet_sitemap(request):
-    """Generates a simple sitemap.xml for novels."""
-    novels = Novel.objects.all().order_by('-updated_at')
-    xml_content = ['<?xml version="1.0" encoding="UTF-8"?>']
-    xml_content.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
-    
-    # Base URL - assuming https://novel.evanlau1798.com
-    base_url = "https://novel.evanlau1798.com"
-    
-    # Static pages
-    for path in ['', '/explore', '/leaderboard', '/updates']:
-        xml_content.append('<url>')
-        xml_content.append(f'<loc>{base_url}{path}</loc>')
-        xml_content.append('<changefreq>daily</changefreq>')
-        xml_content.append('</url>')
-
-    # Dynamic Novel pages
-    for novel in novels:
-        xml_content.append('<url>')
-        xml_content.append(f'<loc>{base_url}/novel/{novel.id}</loc>')
-        xml_content.append(f'<lastmod>{novel.updated_at.strftime("%Y-%m-%d")}</lastmod>')
-        xml_content.append('<changefreq>daily</changefreq>')
-        xml_content.append('</url>')
-    
-    xml_content.append('</urlset>')
-    return HttpResponse('\n'.join(xml_content), content_type="application/xml")
-
-from .models import AuthorProfile
+def _summary(text):
+    description = text[:150] + "..." if len(text) > 150 else text
+    return escape(description.replace('\n', ' '))
 
-def packet_author_seo(request, pk):
-    """Injects SEO tags for Author pages."""
+
+def _render_page(title, description, image, og_type, twitter_card):
     try:
-        # Assuming user_id is the pk for author url /author/<id> based on urls
-        author = AuthorProfile.objects.get(user_id=pk)
-    except AuthorProfile.DoesNotExist:
-        # Fallback to standard index
-        index_path = os.path.join(settings.BASE_DIR, 'frontend', 'dist', 'index.html')
-        try:
-            with open(index_path, 'r', encoding='utf-8') as f:
-                return HttpResponse(f.read())
-        except FileNotFoundError:
-            return HttpResponse("Frontend not built.", status=500)
+        html_content = index_template.render(
+            title,
+            _meta_tags(title, description, image, og_type, twitter_card),
+            _body_content(title, description),
+        )
+    except FileNotFoundError:
+        return HttpResponse("Frontend not built.", status=500)
+    return HttpResponse(html_content)
+
 
-    index_path = os.path.join(settings.BASE_DIR, 'frontend', 'dist', 'index.html')
+def _render_untouched():
+    """回傳原始 index.html，讓 Vue 自行顯示 404 頁面。"""
     try:
-        with open(index_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
+        return HttpResponse(index_template.raw())
     except FileNotFoundError:
         return HttpResponse("Frontend not built.", status=500)
 
-    title = f"{author.pen_name} - 小說作者"
-    # Create a cleaner textual bio
-    import re
-    clean_bio = re.sub('<[^<]+?>', '', author.bio) # Remove HTML tags
-    description = clean_bio[:150] + "..." if len(clean_bio) > 150 else clean_bio
-    description = description.replace('"', '&quot;').replace('\n', ' ')
-    
-    cover_url = ""
-    if author.user.avatar:
-        cover_url = request.build_absolute_uri(author.user.avatar.url)
-
-    meta_tags = f"""
-    <meta property="og:title" content="{title}" />
-    <meta property="og:description" content="{description}" />
-    <meta property="og:image" content="{cover_url}" />
-    <meta property="og:type" content="profile" />
-    <meta name="description" content="{description}" />
-    <meta name="twitter:card" content="summary" />
-    <meta name="twitter:title" content="{title}" />
-    <meta name="twitter:description" content="{description}" />
-    <meta name="twitter:image" content="{cover_url}" />
-    """
 
-    if '<title>' in html_content:
-        html_content = html_content.replace(f'<title>Vite + Vue + TS</title>', f'<title>{title}</title>')
-    else:
-         meta_tags += f"<title>{title}</title>"
+def novel_seo_cache_key(pk):
+    return f'seo:novel:{pk}'
 
-    if '</head>' in html_content:
-        html_content = html_content.replace('</head>', f'{meta_tags}</head>')
 
-    seo_body_content = f"""
-    <div style="position: absolute; left: -9999px; top: -9999px;">
-        <h1>{title}</h1>
-        <p>{description}</p>
-    </div>
-    """
-    if '<body>' in html_content:
-        html_content = html_content.replace('<body>', f'<body>{seo_body_content}')
+def author_seo_cache_key(user_id):
+    return f'seo:author:{user_id}'
 
-    return HttpResponse(html_content)
+
+def _novel_meta(pk):
+    """小說頁的 meta 資料；快取命中時不查資料庫，未命中時只有一次查詢。"""
+    key = novel_seo_cache_key(pk)
+    meta = cache.get(key)
+    if meta is None:
+        try:
+            novel = Novel.objects.select_related('author').only(
+                'title', 'description', 'cover_image', 'author__pen_name'
+            ).get(pk=pk)
+        except Novel.DoesNotExist:
+            meta = _MISSING
+        else:
+            meta = {
+                'title': escape(f"{novel.title} - {novel.author.pen_name}"),
+                'description': _summary(novel.description),
+                'image': novel.cover_image.url if novel.cover_image else '',
+            }
+        cache.set(key, meta, SEO_CACHE_TIMEOUT)
+    return meta
+
+
+def _author_meta(user_id):
+    key = author_seo_cache_key(user_id)
+    meta = cache.get(key)
+    if meta is None:
+        try:
+            author = AuthorProfile.objects.select_related('user').only(
+                'pen_name', 'bio', 'user__avatar'
+            ).get(user_id=user_id)
+        except AuthorProfile.DoesNotExist:
+            meta = _MISSING
+        else:
+            # Create a cleaner textual bio
+            clean_bio = re.sub('<[^<]+?>', '', author.bio) # Remove HTML tags
+            meta = {
+                'title': escape(f"{author.pen_name} - 小說作者"),
+                'description': _summary(clean_bio),
+                'image': author.user.avatar.url if author.user.avatar else '',
+            }
+        cache.set(key, meta, SEO_CACHE_TIMEOUT)
+    return meta
+
+
+def invalidate_novel_seo(*novel_ids):
+    cache.delete_many([novel_seo_cache_key(pk) for pk in novel_ids])
+
+
+def invalidate_author_seo(user_id):
+    cache.delete(author_seo_cache_key(user_id))
+
+
+def packet_novel_seo(request, pk):
+    meta = _novel_meta(pk)
+    if meta == _MISSING:
+        return _render_untouched()  # Return standard HTML, Vue handles 404
+
+    cover_url = request.build_absolute_uri(meta['image']) if meta['image'] else ""
+    return _render_page(meta['title'], meta['description'], cover_url, 'book', 'summary_large_image')
+
+def packet_author_seo(request, pk):
+    """Injects SEO tags for Author pages."""
+    # Assuming user_id is the pk for author url /author/<id> based on urls
+    meta = _author_meta(pk)
+    if meta == _MISSING:
+        return _render_untouched()
+
+    cover_url = request.build_absolute_uri(meta['image']) if meta['image'] else ""
+    return _render_page(meta['title'], meta['description'], cover_url, 'profile', 'summary')
+
+GENERAL_META = {
+    '/': {
+        'title': 'StorySphere - 探索無限的故事宇宙',
+        'description': 'StorySphere 是一個專為小說愛好者打造的閱讀平台。在這裡，您可以發現各類原創小說，與作者互動，並建立屬於您的個人書架。'
+    },
+    '/explore': {
+        'title': '探索小說 - StroySphere',
+        'description': '瀏覽最新、最熱門的小說作品，發現您的下一個最愛。'
+    },
+    '/leaderboard': {
+        'title': '排行榜 - StroySphere',
+        'description': '查看本週人氣最高、觀看次數最多的小說排行榜。'
+    },
+    '/updates': {
+        'title': '最近更新 - StroySphere',
+        'description': '追蹤剛剛更新章節的小說，不錯過任何精彩內容。'
+    }
+}
+
+_general_pages = {}
 
 def packet_general_seo(request):
     """Injects SEO tags for general pages (Home, Explore, etc)."""
     path = request.path
-    
-    meta_map = {
-        '/': {
-            'title': 'StorySphere - 探索無限的故事宇宙',
-            'description': 'StorySphere 是一個專為小說愛好者打造的閱讀平台。在這裡，您可以發現各類原創小說，與作者互動，並建立屬於您的個人書架。'
-        },
-        '/explore': {
-            'title': '探索小說 - StroySphere',
-            'description': '瀏覽最新、最熱門的小說作品，發現您的下一個最愛。'
-        },
-        '/leaderboard': {
-            'title': '排行榜 - StroySphere',
-            'description': '查看本週人氣最高、觀看次數最多的小說排行榜。'
-        },
-        '/updates': {
-            'title': '最近更新 - StroySphere',
-            'description': '追蹤剛剛更新章節的小說，不錯過任何精彩內容。'
-        }
-    }
-    
     # Normalize path (remove trailing slash for checking)
     check_path = path.rstrip('/') if path != '/' else '/'
-    data = meta_map.get(check_path, meta_map['/'])
+    if check_path not in GENERAL_META:
+        check_path = '/'
 
-    index_path = os.path.join(settings.BASE_DIR, 'frontend', 'dist', 'index.html')
+    # 一般頁面的內容固定，依 index.html 的版本整頁快取
     try:
-        with open(index_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
+        index_template.raw()
     except FileNotFoundError:
         return HttpResponse("Frontend not built.", status=500)
-
-    title = data['title']
-    description = data['description']
-    
-    # Use logo or default image
-    cover_url = "https://novel.evanlau1798.com/logo.png" # Assuming a logo exists, or use empty
-    
-    meta_tags = f"""
-    <meta property="og:title" content="{title}" />
-    <meta property="og:description" content="{description}" />
-    <meta property="og:image" content="{cover_url}" />
-    <meta property="og:type" content="website" />
-    <meta name="description" content="{description}" />
-    <meta name="twitter:card" content="summary_large_image" />
-    <meta name="twitter:title" content="{title}" />
-    <meta name="twitter:description" content="{description}" />
-    <meta name="twitter:image" content="{cover_url}" />
-    """
-
-    if '<title>' in html_content:
-         html_content = html_content.replace(f'<title>Vite + Vue + TS</title>', f'<title>{title}</title>')
-    else:
-         meta_tags += f"<title>{title}</title>"
-
-    if '</head>' in html_content:
-        html_content = html_content.replace('</head>', f'{meta_tags}</head>')
-
-    seo_body_content = f"""
-    <div style="position: absolute; left: -9999px; top: -9999px;">
-        <h1>{title}</h1>
-        <p>{description}</p>
-    </div>
-    """
-    if '<body>' in html_content:
-        html_content = html_content.replace('<body>', f'<body>{seo_body_content}')
-
+    key = (index_template.version, check_path)
+    html_content = _general_pages.get(key)
+    if html_content is None:
+        data = GENERAL_META[check_path]
+        # Use logo or default image
+        cover_url = "https://novel.evanlau1798.com/logo.png" # Assuming a logo exists, or use empty
+        html_content = index_template.render(
+            data['title'],
+            _meta_tags(data['title'], data['description'], cover_url, 'website', 'summary_large_image'),
+            _body_content(data['title'], data['description']),
+        )
+        if any(version != index_template.version for version, _ in _general_pages):
+            _general_pages.clear()
+        _general_pages[key] = html_content
     return HttpResponse(html_content)
@@ -3,7 +3,27 @@ from datetime import timedelta
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import CustomUser, AuthorProfile, Novel, Chapter, ReadingProgress, Volume # 引入 ReadingProgress 和 Volume
+from .models import CustomUser, AuthorProfile, Novel, Chapter, ChapterContent, ReadingProgress, Volume, LeaderboardEntry # 引入 ReadingProgress 和 Volume
+from .reading_order import get_reading_order
+from .search import build_snippet
+from .segments import segment_slices, split_offsets
+from .image_variants import variant_srcsets
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    圖片衍生版本的 srcset：{'webp': 'url 200w, url 400w, ...', 'avif': ...}。
+    衍生版本尚未產生時為 null，前端直接使用原圖。是否已產生只看該列的 image_variants 欄位，不查詢 storage。
+    """
+    def __init__(self, kind, **kwargs):
+        self.kind = kind
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value or value.instance.image_variants != value.name:
+            return None
+        return variant_srcsets(value.name, self.kind, self.context.get('request'))
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     remember_me = serializers.BooleanField(write_only=True, required=False, default=False)
@@ -70,12 +90,13 @@ class UserProfileSerializer(serializers.ModelSerializer):
     # 透過 source 直接訪問關聯的 AuthorProfile 欄位
     pen_name = serializers.CharField(source='author_profile.pen_name', required=False, allow_blank=True)
     bio = serializers.CharField(source='author_profile.bio', required=False, allow_blank=True)
+    avatar_variants = ImageVariantsField(kind='avatar', source='avatar')
 
     class Meta:
         model = CustomUser
         # 我們從 CustomUser 出發，可以訪問 avatar, username 等
         # 也可以透過 source='author_profile.field' 訪問作者資料
-        fields = ['id', 'username', 'email', 'avatar', 'role', 'pen_name', 'bio']
+        fields = ['id', 'username', 'email', 'avatar', 'avatar_variants', 'role', 'pen_name', 'bio']
         read_only_fields = ['username', 'email', 'role']
 
     def update(self, instance, validated_data):
@@ -116,9 +137,11 @@ class AuthorSummarySerializer(serializers.ModelSerializer):
 
 class SimpleNovelSerializer(serializers.ModelSerializer):
     """用於在作者公開頁上顯示小說列表，避免循環引用"""
+    cover_image_variants = ImageVariantsField(kind='cover', source='cover_image')
+
     class Meta:
         model = Novel
-        fields = ['id', 'title', 'author', 'cover_image', 'description', 'status', 'category', 'updated_at', 'views']
+        fields = ['id', 'title', 'author', 'cover_image', 'cover_image_variants', 'description', 'status', 'category', 'updated_at', 'views']
 
 class AuthorDetailSerializer(serializers.ModelSerializer):
     """
@@ -126,12 +149,13 @@ class AuthorDetailSerializer(serializers.ModelSerializer):
     """
     username = serializers.CharField(source='user.username', read_only=True)
     avatar = serializers.ImageField(source='user.avatar', read_only=True)
+    avatar_variants = ImageVariantsField(kind='avatar', source='user.avatar')
     user_id = serializers.IntegerField(source='user.id', read_only=True)
     novels = SimpleNovelSerializer(many=True, read_only=True) # 使用 related_name 'novels'
 
     class Meta:
         model = AuthorProfile
-        fields = ['user_id', 'username', 'pen_name', 'bio', 'avatar', 'novels']
+        fields = ['user_id', 'username', 'pen_name', 'bio', 'avatar', 'avatar_variants', 'novels']
 
 class ChapterSerializer(serializers.ModelSerializer):
     """用於在小說詳情頁顯示章節列表"""
@@ -148,23 +172,70 @@ class ChapterDetailSerializer(serializers.ModelSerializer):
         model = Chapter
         fields = ['id', 'title', 'content', 'order', 'published_at', 'updated_at', 'views', 'novel', 'volume', 'status', 'previous_chapter_id', 'next_chapter_id']
 
+    def _neighbors(self, obj):
+        # 上一章/下一章都從 cache 中的閱讀順序索引取得，不再各跑一次排序查詢
+        return get_reading_order(obj.novel).neighbors(obj.id, obj.order)
+
     def get_previous_chapter_id(self, obj):
-        # We need to find the previous published chapter in the same novel
-        prev_chapter = Chapter.objects.filter(
-            novel=obj.novel,
-            order__lt=obj.order,
-            status=Chapter.Status.PUBLISHED
-        ).order_by('-order').first()
-        return prev_chapter.id if prev_chapter else None
+        return self._neighbors(obj)[0]
 
     def get_next_chapter_id(self, obj):
-        # We need to find the next published chapter in the same novel
-        next_chapter = Chapter.objects.filter(
-            novel=obj.novel,
-            order__gt=obj.order,
-            status=Chapter.Status.PUBLISHED
-        ).order_by('order').first()
-        return next_chapter.id if next_chapter else None
+        return self._neighbors(obj)[1]
+
+class ChapterSegmentsSerializer(ChapterDetailSerializer):
+    """
+    章節內文的部分區段 (見 core/segments.py)，供閱讀器分段載入長章節。
+    要回傳的範圍由 view 放在 context 的 segment_start 與 segment_count (None 表示到最後一段)。
+    """
+    segment_count = serializers.SerializerMethodField()
+    total_length = serializers.SerializerMethodField()
+    segments = serializers.SerializerMethodField()
+
+    class Meta(ChapterDetailSerializer.Meta):
+        fields = [
+            field for field in ChapterDetailSerializer.Meta.fields if field != 'content'
+        ] + ['segment_count', 'total_length', 'segments']
+
+    def _split(self, obj):
+        if not hasattr(obj, '_segment_slices'):
+            content = obj.content
+            try:
+                offsets = obj.body.segments
+            except ChapterContent.DoesNotExist:
+                offsets = []
+            if content and not offsets:
+                offsets = split_offsets(content)
+            obj._segment_content = content
+            obj._segment_slices = segment_slices(offsets, len(content))
+        return obj._segment_content, obj._segment_slices
+
+    def get_segment_count(self, obj):
+        return len(self._split(obj)[1])
+
+    def get_total_length(self, obj):
+        return len(self._split(obj)[0])
+
+    def get_segments(self, obj):
+        content, slices = self._split(obj)
+        start = self.context.get('segment_start', 0)
+        count = self.context.get('segment_count')
+        end = len(slices) if count is None else start + count
+        return [
+            {'index': index, 'offset': begin, 'html': content[begin:finish]}
+            for index, (begin, finish) in enumerate(slices[start:end], start=start)
+        ]
+
+class ChapterSearchResultSerializer(serializers.ModelSerializer):
+    """章節內文搜尋的結果，附上命中處的片段 (已 escape，命中詞以 <mark> 標示)。"""
+    novel_title = serializers.CharField(source='novel.title', read_only=True)
+    snippet = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Chapter
+        fields = ['id', 'title', 'order', 'novel', 'novel_title', 'volume', 'status', 'snippet']
+
+    def get_snippet(self, obj):
+        return build_snippet(obj.content, self.context.get('search_text', ''))
 
 class NestedChapterSerializer(serializers.ModelSerializer):
     """用於在 Volume 內嵌套顯示章節"""
@@ -176,23 +247,25 @@ class VolumeSerializer(serializers.ModelSerializer):
     """Serializes a volume and its chapters, filtering chapters based on context."""
     chapters = serializers.SerializerMethodField()
     cover_image = serializers.ImageField(read_only=True)
+    cover_image_variants = ImageVariantsField(kind='cover', source='cover_image')
 
     class Meta:
         model = Volume
-        fields = ['id', 'title', 'order', 'chapters', 'description', 'cover_image']
+        fields = ['id', 'title', 'order', 'chapters', 'description', 'cover_image', 'cover_image_variants']
         read_only_fields = ['order']
 
     def get_chapters(self, obj):
         is_author_view = self.context.get('is_author_view', False)
         
-        # Access the prefetched chapters if available, otherwise query
-        chapters_queryset = obj.chapters.all()
+        # obj.chapters.all() 會使用 view 中 prefetch 的結果；
+        # 再呼叫 .filter() 會繞過 prefetch、每個分卷多一次查詢，所以在 Python 中過濾
+        chapters = obj.chapters.all()
 
         if not is_author_view:
-            chapters_queryset = chapters_queryset.filter(status=Chapter.Status.PUBLISHED)
+            chapters = [ch for ch in chapters if ch.status == Chapter.Status.PUBLISHED]
         
         # The chapters are already ordered by the prefetch in the view
-        serializer = NestedChapterSerializer(chapters_queryset, many=True)
+        serializer = NestedChapterSerializer(chapters, many=True)
         return serializer.data
 
 class VolumeEditSerializer(serializers.ModelSerializer):
@@ -210,16 +283,17 @@ class NovelDetailSerializer(serializers.ModelSerializer):
     # Use the new attribute 'volumes_ordered' from the prefetch
     volumes = VolumeSerializer(source='volumes_ordered', many=True, read_only=True)
     chapters_without_volume = serializers.SerializerMethodField()
-    latest_chapter = serializers.SerializerMethodField()
-    latest_chapter_updated_at = serializers.SerializerMethodField()
+    latest_chapter = serializers.CharField(source='latest_chapter_title', read_only=True)
+    cover_image_variants = ImageVariantsField(kind='cover', source='cover_image')
 
     class Meta:
         model = Novel
         fields = [
-            'id', 'title', 'author', 'description', 'cover_image', 
+            'id', 'title', 'author', 'description', 'cover_image', 'cover_image_variants',
             'status', 'category', 'created_at', 'updated_at', 'views', 
             'volumes', 'chapters_without_volume', 'latest_chapter', 'latest_chapter_updated_at'
         ]
+        read_only_fields = ['latest_chapter_updated_at']
 
     def get_chapters_without_volume(self, obj):
         is_author_view = self.context.get('is_author_view', False)
@@ -242,19 +316,35 @@ class NovelDetailSerializer(serializers.ModelSerializer):
         serializer = ChapterSerializer(chapters_list, many=True)
         return serializer.data
 
-    def get_latest_chapter(self, obj):
-        # Efficiently get latest chapter title.
-        last_chapter = obj.chapters.filter(status=Chapter.Status.PUBLISHED).order_by('-updated_at').first()
-        return last_chapter.title if last_chapter else None
 
-    def get_latest_chapter_updated_at(self, obj):
-        # Efficiently get latest chapter timestamp.
-        last_chapter = obj.chapters.filter(status=Chapter.Status.PUBLISHED).order_by('-updated_at').first()
-        return last_chapter.updated_at if last_chapter else None
+class NovelListSerializer(serializers.ModelSerializer):
+    """
+    用於小說列表 (首頁、探索、最近更新、排行榜) 的卡片資料。
+    不包含分卷與章節樹；章節數與最新章節讀取 Novel 上的反正規化欄位，
+    收藏數由 view 的 queryset 以 SQL 計算好。
+    """
+    author = AuthorSummarySerializer(read_only=True)
+    chapter_count = serializers.IntegerField(source='published_chapter_count', read_only=True)
+    latest_chapter = serializers.CharField(source='latest_chapter_title', read_only=True)
+    bookmark_count = serializers.IntegerField(read_only=True)
+    cover_image_variants = ImageVariantsField(kind='cover', source='cover_image')
+
+    class Meta:
+        model = Novel
+        fields = [
+            'id', 'title', 'author', 'description', 'cover_image', 'cover_image_variants',
+            'status', 'category', 'created_at', 'updated_at', 'views',
+            'chapter_count', 'latest_chapter', 'latest_chapter_updated_at', 'bookmark_count'
+        ]
 
-class NovelListSerializer(NovelDetailSerializer):
-    """Inherits from NovelDetailSerializer to ensure consistent chapter filtering."""
-    pass
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    """排行榜的一個名次，附上小說卡片資料。"""
+    novel = NovelListSerializer(read_only=True)
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = ['rank', 'score', 'novel']
 
 
 class ImageUploadSerializer(serializers.Serializer):
@@ -269,6 +359,9 @@ class ImageUploadSerializer(serializers.Serializer):
 
 class ChapterEditSerializer(serializers.ModelSerializer):
     """用於作者編輯章節"""
+    # content 是存放在 ChapterContent 的屬性，需明確宣告才可寫入
+    content = serializers.CharField(allow_blank=True, required=False, trim_whitespace=False, style={'base_template': 'textarea.html'})
+
     class Meta:
         model = Chapter
         fields = ['id', 'title', 'content', 'order', 'volume', 'status', 'updated_at']
@@ -278,9 +371,11 @@ class ChapterEditSerializer(serializers.ModelSerializer):
 class SimpleNovelForReadingProgressSerializer(serializers.ModelSerializer):
     """A lightweight serializer for novels in the reading progress list."""
     author = AuthorSummarySerializer(read_only=True)
+    cover_image_variants = ImageVariantsField(kind='cover', source='cover_image')
+
     class Meta:
         model = Novel
-        fields = ['id', 'title', 'cover_image', 'author', 'status']
+        fields = ['id', 'title', 'cover_image', 'cover_image_variants', 'author', 'status']
 
 
 class ReadingProgressSerializer(serializers.ModelSerializer):
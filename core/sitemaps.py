@@ -0,0 +1,205 @@
+# novel_backend/core/sitemaps.py
+"""
+sitemap index 與分片的 sitemap。
+
+每個區段 (靜態頁、小說、作者、已發布章節) 依主鍵範圍切成固定大小的分片：
+第 n 片涵蓋 id 介於 ((n-1)*SHARD_SIZE, n*SHARD_SIZE] 的資料，
+因此每片最多 SHARD_SIZE 個網址 (sitemap 協定上限為 5 萬)，
+且資料的新增與刪除不會讓網址在分片之間移動，各分片的 ETag 可以保持穩定。
+
+分片內容以 values_list().iterator() 串流輸出，不會把整張表載入記憶體；
+ETag / Last-Modified 由分片內的筆數與最大 updated_at 計算，
+每小時輪詢的爬蟲在內容沒有變動時只會得到 304。
+"""
+from django.db.models import Count, F, Max
+from django.http import Http404, StreamingHttpResponse
+from django.views.decorators.http import condition
+
+from .models import Novel, Chapter
+
+# Base URL - assuming https://novel.evanlau1798.com
+BASE_URL = "https://novel.evanlau1798.com"
+
+SHARD_SIZE = 50000
+# 每累積幾筆網址輸出一次，避免每一列都產生一個 chunk
+STREAM_BATCH = 1000
+
+STATIC_PATHS = ['', '/explore', '/leaderboard', '/updates']
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+
+
+def _lastmod(value):
+    return value.isoformat(timespec='seconds') if value else None
+
+
+def _version(state):
+    """分片的版本字串：筆數反映新增與刪除，最大 updated_at (含微秒) 反映修改。"""
+    lastmod = state['lastmod']
+    return f"{state['count']}.{lastmod.timestamp() if lastmod else 0}"
+
+
+def _url_entry(loc, lastmod=None):
+    lastmod_tag = f'<lastmod>{_lastmod(lastmod)}</lastmod>' if lastmod else ''
+    return f'<url><loc>{BASE_URL}{loc}</loc>{lastmod_tag}<changefreq>daily</changefreq></url>\n'
+
+
+class NovelSection:
+    name = 'novels'
+    key = 'id'
+
+    def queryset(self):
+        return Novel.objects.all()
+
+    def rows(self, queryset):
+        for novel_id, updated_at in queryset.values_list('id', 'updated_at').iterator(chunk_size=STREAM_BATCH):
+            yield f'/novel/{novel_id}', updated_at
+
+
+class ChapterSection:
+    name = 'chapters'
+    key = 'id'
+
+    def queryset(self):
+        return Chapter.objects.filter(status=Chapter.Status.PUBLISHED)
+
+    def rows(self, queryset):
+        for chapter_id, novel_id, updated_at in queryset.values_list(
+            'id', 'novel_id', 'updated_at'
+        ).iterator(chunk_size=STREAM_BATCH):
+            yield f'/read/{novel_id}/{chapter_id}', updated_at
+
+
+class AuthorSection:
+    """有作品的作者；作者頁的最後更新時間取其小說中最新的 updated_at。"""
+    name = 'authors'
+    key = 'author__user_id'
+
+    def queryset(self):
+        return Novel.objects.all()
+
+    def rows(self, queryset):
+        authors = queryset.values('author__user_id').annotate(lastmod=Max('updated_at')).values_list(
+            'author__user_id', 'lastmod'
+        )
+        for user_id, updated_at in authors.iterator(chunk_size=STREAM_BATCH):
+            yield f'/author/{user_id}', updated_at
+
+    def state(self, queryset):
+        return queryset.aggregate(
+            count=Count('author', distinct=True), lastmod=Max('updated_at')
+        )
+
+
+SECTIONS = {section.name: section for section in (NovelSection(), AuthorSection(), ChapterSection())}
+
+
+def _shard_bounds(page):
+    return (page - 1) * SHARD_SIZE, page * SHARD_SIZE
+
+
+def _shard_queryset(section, page):
+    low, high = _shard_bounds(page)
+    return section.queryset().filter(**{f'{section.key}__gt': low, f'{section.key}__lte': high})
+
+
+def _section_state(section, queryset):
+    if hasattr(section, 'state'):
+        return section.state(queryset)
+    return queryset.aggregate(count=Count('pk'), lastmod=Max('updated_at'))
+
+
+def _shards(section):
+    """回傳 [(分片編號, 最後更新時間), ...]，跳過沒有資料的分片；一個區段只需一次 GROUP BY 查詢。"""
+    shard = (F(section.key) - 1) / SHARD_SIZE + 1
+    return list(
+        section.queryset().annotate(shard=shard).values('shard').annotate(
+            lastmod=Max('updated_at')
+        ).values_list('shard', 'lastmod').order_by('shard')
+    )
+
+
+def _index_state(request):
+    """index 的版本：各區段的筆數與最大 updated_at。同一請求內只計算一次。"""
+    if not hasattr(request, '_sitemap_state'):
+        request._sitemap_state = [
+            _section_state(section, section.queryset()) for section in SECTIONS.values()
+        ]
+    return request._sitemap_state
+
+
+def _index_etag(request):
+    states = _index_state(request)
+    return 'index-' + '-'.join(_version(state) for state in states)
+
+
+def _index_last_modified(request):
+    values = [state['lastmod'] for state in _index_state(request) if state['lastmod']]
+    return max(values) if values else None
+
+
+@condition(etag_func=_index_etag, last_modified_func=_index_last_modified)
+def sitemap_index(request):
+    """sitemap index，列出所有非空的分片。"""
+
+    def stream():
+        yield XML_HEADER
+        yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        yield f'<sitemap><loc>{BASE_URL}/sitemap-static-1.xml</loc></sitemap>\n'
+        for section in SECTIONS.values():
+            for page, lastmod in _shards(section):
+                lastmod_tag = f'<lastmod>{_lastmod(lastmod)}</lastmod>' if lastmod else ''
+                yield f'<sitemap><loc>{BASE_URL}/sitemap-{section.name}-{page}.xml</loc>{lastmod_tag}</sitemap>\n'
+        yield '</sitemapindex>\n'
+
+    return StreamingHttpResponse(stream(), content_type="application/xml")
+
+
+def _shard_state(request, section, page):
+    if not hasattr(request, '_sitemap_state'):
+        request._sitemap_state = _section_state(SECTIONS[section], _shard_queryset(SECTIONS[section], page))
+    return request._sitemap_state
+
+
+def _shard_etag(request, section, page):
+    if section == 'static':
+        return 'static'
+    if section not in SECTIONS:
+        return None
+    state = _shard_state(request, section, page)
+    return f"{section}-{page}-{_version(state)}"
+
+
+def _shard_last_modified(request, section, page):
+    if section not in SECTIONS:
+        return None
+    return _shard_state(request, section, page)['lastmod']
+
+
+@condition(etag_func=_shard_etag, last_modified_func=_shard_last_modified)
+def sitemap_section(request, section, page):
+    """單一分片的 urlset，以 iterator() 逐批串流輸出。"""
+    if section == 'static':
+        if page != 1:
+            raise Http404
+        rows = ((path, None) for path in STATIC_PATHS)
+    elif section in SECTIONS and page >= 1:
+        target = SECTIONS[section]
+        queryset = _shard_queryset(target, page).order_by(target.key)
+        rows = target.rows(queryset)
+    else:
+        raise Http404
+
+    def stream():
+        yield XML_HEADER
+        yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        batch = []
+        for loc, lastmod in rows:
+            batch.append(_url_entry(loc, lastmod))
+            if len(batch) >= STREAM_BATCH:
+                yield ''.join(batch)
+                batch = []
+        batch.append('</urlset>\n')
+        yield ''.join(batch)
+
+    return StreamingHttpResponse(stream(), content_type="application/xml")
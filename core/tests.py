@@ -1,3 +1,922 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from PIL import Image
+
+from .analytics import MAX_RANGE_DAYS, author_dashboard, parse_date_range
+from .discord_logging import DiscordWebhookHandler
+from .exports import NovelExport
+from .leaderboards import refresh_leaderboards
+from .list_cache import get_cache as get_response_cache
+from .image_variants import FORMATS
+from .media_gc import find_orphans, referenced_paths
+from .media_store import content_hash, store_upload
+from .search import NovelSearchFilter
+from .segments import SEGMENT_TARGET_CHARS, split_offsets
+from .models import (
+    AuthorProfile, Chapter, ChapterDailyStat, CustomUser, LeaderboardEntry, MediaBlob, Novel, NovelDailyStat,
+    ReadingProgress,
+)
+from .serializers import SimpleNovelSerializer
+from .view_counter import ViewCounter
+from .views import NovelViewSet
+
+
+class ParseDateRangeTests(SimpleTestCase):
+    def test_explicit_range(self):
+        self.assertEqual(
+            parse_date_range({'start': '2024-01-01', 'end': '2024-01-31'}),
+            (date(2024, 1, 1), date(2024, 1, 31)),
+        )
+
+    def test_default_start(self):
+        start, end = parse_date_range({'end': '2024-01-31'})
+        self.assertEqual((end - start).days, 29)
+
+    def test_rejects_reversed_range(self):
+        with self.assertRaises(ValueError):
+            parse_date_range({'start': '2024-02-01', 'end': '2024-01-01'})
+
+    def test_rejects_range_over_limit(self):
+        with self.assertRaises(ValueError):
+            parse_date_range({'start': '0001-01-01', 'end': '9999-12-31'})
+        start, end = parse_date_range({'start': '2024-01-01', 'end': '2024-12-31'})
+        self.assertEqual((end - start).days + 1, MAX_RANGE_DAYS)
+
+    def test_rejects_end_that_would_overflow(self):
+        with self.assertRaises(ValueError):
+            parse_date_range({'end': '0001-01-05'})
+
+
+class AuthorDashboardRangeTests(SimpleTestCase):
+    def test_rejects_range_over_limit(self):
+        with self.assertRaises(ValueError):
+            author_dashboard(None, date(1, 1, 1), date(9999, 12, 31))
+
+
+class DiscordWebhookHandlerTests(SimpleTestCase):
+    """以本機變慢的假 webhook 伺服器測試 emit() 不會被網路呼叫拖住。"""
+
+    WEBHOOK_DELAY = 0.5
+
+    def setUp(self):
+        self.received = []
+        received, delay = self.received, self.WEBHOOK_DELAY
+
+        class WebhookStub(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                time.sleep(delay)
+                received.append(payload)
+                body = b'{}'
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookStub)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.handler = DiscordWebhookHandler(timeout=5)
+        self.handler.webhook_url = f'http://127.0.0.1:{self.server.server_port}/webhook'
+        self.logger = logging.getLogger('core.tests.discord')
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def test_emit_does_not_wait_for_webhook(self):
+        started = time.perf_counter()
+        for n in range(200):
+            self.logger.error('slow webhook %d', n % 5)
+        elapsed = time.perf_counter() - started
+        # 200 筆紀錄的 emit 總時間仍遠小於一次 webhook 呼叫
+        self.assertLess(elapsed, self.WEBHOOK_DELAY)
+
+        self.handler.close()
+        self.assertTrue(self.received)
+
+    def test_duplicates_are_coalesced(self):
+        for n in range(200):
+            self.logger.error('duplicate %d', n % 5)
+        self.handler.close()
+
+        embeds = [embed for payload in self.received for embed in payload['embeds']]
+        self.assertLess(len(self.received), 200)
+        self.assertLessEqual(len(embeds), 10)
+        total = 0
+        for embed in embeds:
+            match = re.search(r'\(x(\d+)\)$', embed['title'])
+            total += int(match.group(1)) if match else 1
+        self.assertEqual(total, 200)
+        self.assertEqual(self.handler.dropped, 0)
+
+    def test_sender_survives_unexpected_errors(self):
+        failed = threading.Event()
+        original_send = DiscordWebhookHandler._send
+
+        def send(handler, batch, dropped):
+            if not failed.is_set():
+                failed.set()
+                raise RuntimeError('boom')
+            return original_send(handler, batch, dropped)
+
+        stderr = io.StringIO()
+        with mock.patch.object(DiscordWebhookHandler, '_send', autospec=True, side_effect=send), \
+                mock.patch('sys.stderr', stderr):
+            self.logger.error('lost')
+            self.assertTrue(failed.wait(5))
+            self.logger.error('delivered')
+            self.handler.close()
+
+        self.assertFalse(self.handler._thread.is_alive())
+        descriptions = [embed['description'] for payload in self.received for embed in payload['embeds']]
+        self.assertEqual(len(descriptions), 1)
+        self.assertIn('delivered', descriptions[0])
+        self.assertIn('RuntimeError: boom', stderr.getvalue())
+
+    def test_webhook_failure_is_written_to_stderr(self):
+        self.server.shutdown()
+        self.server.server_close()
+        stderr, stdout = io.StringIO(), io.StringIO()
+        with mock.patch('sys.stderr', stderr), mock.patch('sys.stdout', stdout):
+            self.logger.error('unreachable')
+            self.handler.close()
+        self.assertIn('Error sending log to Discord', stderr.getvalue())
+        self.assertIn('unreachable', stderr.getvalue())
+        self.assertEqual(stdout.getvalue(), '')
+
+
+def png_upload(color, name='image.png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def use_temp_media_root(testcase):
+    media_root = tempfile.mkdtemp()
+    testcase.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+    settings_override = override_settings(MEDIA_ROOT=media_root)
+    settings_override.enable()
+    testcase.addCleanup(settings_override.disable)
+
+
+class MediaBlobTests(TestCase):
+    def setUp(self):
+        use_temp_media_root(self)
+        user = CustomUser.objects.create_user(username='author', password='p', role='AUTHOR')
+        self.novel = Novel.objects.create(title='t', author=user.author_profile, description='d')
+
+    def chapter(self, order, *blobs):
+        content = ''.join(f'<p><img src="{settings.MEDIA_URL}{blob.file}"></p>' for blob in blobs)
+        return Chapter.objects.create(novel=self.novel, title=f'c{order}', order=order, content=content)
+
+    def ref_count(self, blob):
+        blob.refresh_from_db()
+        return blob.ref_count
+
+    def test_duplicate_upload_reuses_file(self):
+        blob, created = store_upload(png_upload('red', 'a.png'))
+        again, created_again = store_upload(png_upload('red', 'b.png'))
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.pk, blob.pk)
+        self.assertEqual(default_storage.listdir(blob.file.rsplit('/', 1)[0])[1], [blob.file.rsplit('/', 1)[1]])
+
+    def test_concurrent_upload_keeps_first_file(self):
+        save = FileSystemStorage.save
+
+        def racing_save(storage, name, content, *args, **kwargs):
+            # 另一個請求在這次寫入前搶先存好同一張圖並建立資料列，這次寫入會被 storage 改名
+            other = save(storage, name, png_upload('blue'))
+            MediaBlob.objects.create(sha256=blob_digest, file=other, size=content.size)
+            return save(storage, name, content, *args, **kwargs)
+
+        upload = png_upload('blue')
+        blob_digest = content_hash(upload)
+        with mock.patch.object(FileSystemStorage, 'save', autospec=True, side_effect=racing_save):
+            blob, created = store_upload(upload)
+
+        self.assertFalse(created)
+        directory, filename = blob.file.rsplit('/', 1)
+        self.assertEqual(MediaBlob.objects.get().file, blob.file)
+        # 改名後多寫的那份已刪除
+        self.assertEqual(default_storage.listdir(directory)[1], [filename])
+
+    def test_missing_file_is_restored(self):
+        blob, _ = store_upload(png_upload('green'))
+        default_storage.delete(blob.file)
+        restored, _ = store_upload(png_upload('green'))
+        self.assertEqual(restored.pk, blob.pk)
+        self.assertTrue(default_storage.exists(MediaBlob.objects.get().file))
+
+    def test_ref_counts_follow_chapter_content(self):
+        first, _ = store_upload(png_upload('red'))
+        second, _ = store_upload(png_upload('blue'))
+
+        one = self.chapter(1, first, second)
+        two = self.chapter(2, first)
+        self.assertEqual(self.ref_count(first), 2)
+        self.assertEqual(self.ref_count(second), 1)
+
+        # 移除一張、重複引用同一張都不會重複計算
+        one.content = f'<p><img src="{settings.MEDIA_URL}{first.file}"><img src="{settings.MEDIA_URL}{first.file}"></p>'
+        one.save()
+        self.assertEqual(self.ref_count(first), 2)
+        self.assertEqual(self.ref_count(second), 0)
+
+        one.content = f'<p><img src="{settings.MEDIA_URL}{second.file}"></p>'
+        one.save()
+        self.assertEqual(self.ref_count(first), 1)
+        self.assertEqual(self.ref_count(second), 1)
+
+        two.delete()
+        self.assertEqual(self.ref_count(first), 0)
+        self.assertEqual(list(second.chapters.all()), [one])
+
+    def test_gc_deletes_only_expired_unreferenced_blobs(self):
+        referenced, _ = store_upload(png_upload('red'))
+        expired, _ = store_upload(png_upload('blue'))
+        recent, _ = store_upload(png_upload('green'))
+        self.chapter(1, referenced)
+        old = timezone.now() - timedelta(hours=48)
+        MediaBlob.objects.filter(pk__in=[referenced.pk, expired.pk]).update(uploaded_at=old)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('gc_media_blobs', '--dry-run', stdout=io.StringIO())
+        self.assertEqual(MediaBlob.objects.count(), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('gc_media_blobs', stdout=io.StringIO())
+        self.assertEqual(
+            set(MediaBlob.objects.values_list('pk', flat=True)), {referenced.pk, recent.pk},
+        )
+        self.assertFalse(default_storage.exists(expired.file))
+        self.assertTrue(default_storage.exists(referenced.file))
+        self.assertTrue(default_storage.exists(recent.file))
+
+
+class ImageVariantsTests(TestCase):
+    def setUp(self):
+        use_temp_media_root(self)
+        user = CustomUser.objects.create_user(username='author', password='p', role='AUTHOR')
+        self.author = user.author_profile
+
+    def test_variants_recorded_after_commit(self):
+        if not FORMATS:
+            self.skipTest('Pillow 不支援 WebP/AVIF')
+        with self.captureOnCommitCallbacks(execute=True):
+            novel = Novel.objects.create(title='t', author=self.author, description='d', cover_image=png_upload('red'))
+        self.assertEqual(novel.image_variants, '')
+        novel.refresh_from_db()
+        self.assertEqual(novel.image_variants, novel.cover_image.name)
+
+        # 序列化時只比對欄位，不向 storage 確認檔案
+        with mock.patch.object(FileSystemStorage, 'exists', autospec=True) as exists:
+            data = SimpleNovelSerializer(novel).data
+        exists.assert_not_called()
+        self.assertIn('400w', data['cover_image_variants']['webp'])
+
+    def test_replaced_image_has_no_srcset_until_built(self):
+        novel = Novel.objects.create(title='t', author=self.author, description='d', cover_image=png_upload('red'))
+        Novel.objects.filter(pk=novel.pk).update(image_variants='novel_covers/old.png')
+        novel.refresh_from_db()
+        self.assertIsNone(SimpleNovelSerializer(novel).data['cover_image_variants'])
+
+
+class NovelSearchVectorTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='writer', password='p', role='AUTHOR')
+        self.novel = Novel.objects.create(title='魔法學院', author=self.user.author_profile, description='d')
+
+    def lexemes(self):
+        return Novel.objects.values_list('search_vector', flat=True).get(pk=self.novel.pk)
+
+    def test_save_loads_author_and_user_in_one_query(self):
+        novel = Novel.objects.get(pk=self.novel.pk)
+        novel.title = '龍王'
+        # 一次查詢取回作者與使用者，一次 UPDATE
+        with self.assertNumQueries(2):
+            novel.save()
+        self.assertIn("'龍王':1A", self.lexemes())
+
+    def test_username_change_refreshes_vectors(self):
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.username = 'renamed'
+        user.save()
+        self.assertIn("'renamed'", self.lexemes())
+        self.assertNotIn("'writer'", self.lexemes())
+
+    def test_other_user_updates_skip_refresh(self):
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.last_login = timezone.now()
+        with mock.patch('core.models._refresh_author_novels_search_vector') as refresh:
+            user.save(update_fields=['last_login'])
+            user.save()
+        refresh.assert_not_called()
+
+    def test_pen_name_change_refreshes_all_novels_in_one_update(self):
+        Novel.objects.create(title='second', author=self.user.author_profile, description='d')
+        author = AuthorProfile.objects.get(pk=self.user.author_profile.pk)
+        author.pen_name = '新筆名'
+        with CaptureQueriesContext(connection) as queries:
+            author.save()
+        novel_updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "core_novel"')]
+        self.assertEqual(len(novel_updates), 1)
+        for vector in Novel.objects.values_list('search_vector', flat=True):
+            self.assertIn("'新筆':", vector)
+
+    def test_bio_change_skips_refresh(self):
+        author = AuthorProfile.objects.get(pk=self.user.author_profile.pk)
+        author.bio = 'new bio'
+        with mock.patch('core.models._refresh_author_novels_search_vector') as refresh:
+            author.save()
+        refresh.assert_not_called()
+
+
+class NovelSearchFilterTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='writer', password='p', role='AUTHOR')
+        for title in ('Legend', '魔法學院', '龍王傳說'):
+            Novel.objects.create(title=title, author=user.author_profile, description='d')
+
+    def search(self, text):
+        request = Request(APIRequestFactory().get('/api/novels/', {'search': text}))
+        queryset = NovelSearchFilter().filter_queryset(request, Novel.objects.all(), NovelViewSet())
+        return queryset, [novel.title for novel in queryset]
+
+    def test_cjk_phrase(self):
+        queryset, titles = self.search('學院')
+        self.assertEqual(titles, ['魔法學院'])
+        # CJK 查詢不使用 trigram
+        self.assertNotIn('similarity', str(queryset.query))
+
+    def test_latin_typo_uses_trigram(self):
+        _, titles = self.search('legnd')
+        self.assertEqual(titles, ['Legend'])
+
+
+class OrphanMediaTests(TestCase):
+    def setUp(self):
+        use_temp_media_root(self)
+        user = CustomUser.objects.create_user(username='author', password='p', role='AUTHOR')
+        novel = Novel.objects.create(title='t', author=user.author_profile, description='d', cover_image='novel_covers/a.png')
+        Chapter.objects.create(
+            novel=novel, title='c', order=1,
+            content=f'<p><img src="{settings.MEDIA_URL}legacy/b.png"><img srcset="{settings.MEDIA_URL}variants/inline/c.480w.webp 480w"></p>',
+        )
+        self.files = [
+            'novel_covers/a.png', 'novel_covers/a.jpg', 'variants/novel_covers/a.400w.webp',
+            'legacy/b.png', 'legacy/b.txt',
+            'inline/c.png', 'variants/inline/c.480w.webp',
+            'chapter_images/old.png',
+        ]
+        old = time.time() - 48 * 3600
+        for name in self.files:
+            path = os.path.join(settings.MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as fh:
+                fh.write(b'x')
+            os.utime(path, (old, old))
+
+    def test_chapter_references_are_stored_on_save(self):
+        self.assertEqual(
+            referenced_paths(), {'novel_covers/a.png', 'legacy/b.png', 'variants/inline/c.480w.webp'},
+        )
+
+    def test_full_paths_outside_variants(self):
+        orphans = {path for path, _ in find_orphans(settings.MEDIA_ROOT, referenced_paths(), 3600)}
+        # 與被引用的檔案只差副檔名的檔案不再被視為已引用
+        self.assertEqual(orphans, {'novel_covers/a.jpg', 'legacy/b.txt', 'chapter_images/old.png'})
+
+    def test_quarantine_moves_orphans(self):
+        quarantine = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, quarantine, ignore_errors=True)
+        with override_settings(MEDIA_QUARANTINE_ROOT=quarantine):
+            call_command('gc_orphan_media', '--quarantine', stdout=io.StringIO())
+        self.assertFalse(os.path.exists(os.path.join(settings.MEDIA_ROOT, 'novel_covers/a.jpg')))
+        self.assertTrue(os.path.exists(os.path.join(settings.MEDIA_ROOT, 'variants/novel_covers/a.400w.webp')))
+        moved = [os.path.join(root, name) for root, _, names in os.walk(quarantine) for name in names]
+        self.assertEqual(len(moved), 3)
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='author', password='p', role='AUTHOR')
+        self.popular = Novel.objects.create(title='a', author=user.author_profile, description='d', views=10)
+        self.other = Novel.objects.create(title='b', author=user.author_profile, description='d', views=5)
+        for n in range(3):
+            reader = CustomUser.objects.create_user(username=f'reader{n}', password='p')
+            ReadingProgress.objects.create(user=reader, novel=self.popular)
+        refresh_leaderboards()
+
+    def test_refresh_stores_bookmark_counts(self):
+        entries = LeaderboardEntry.objects.filter(board='views', period='all_time').order_by('rank')
+        self.assertEqual(
+            [(entry.novel_id, entry.bookmark_count) for entry in entries],
+            [(self.popular.pk, 3), (self.other.pk, 0)],
+        )
+
+    def test_leaderboard_is_a_single_query(self):
+        client = APIClient()
+        with self.assertNumQueries(1):
+            response = client.get('/api/leaderboards/', {'board': 'views', 'period': 'all_time'})
+        self.assertEqual(
+            [(item['novel']['id'], item['novel']['bookmark_count']) for item in response.data['results']],
+            [(self.popular.pk, 3), (self.other.pk, 0)],
+        )
+
+
+class NovelExportTests(TestCase):
+    def setUp(self):
+        use_temp_media_root(self)
+        export_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_root, ignore_errors=True)
+        settings_override = override_settings(EXPORT_ROOT=export_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        user = CustomUser.objects.create_user(username='author', password='p', role='AUTHOR')
+        self.novel = Novel.objects.create(title='t', author=user.author_profile, description='d')
+        for order in (1, 2):
+            Chapter.objects.create(
+                novel=self.novel, title=f'c{order}', order=order, status=Chapter.Status.PUBLISHED,
+                content=f'<p>{order}</p><img src="{settings.MEDIA_URL}../../etc/passwd">',
+            )
+
+    def export(self):
+        export = NovelExport(Novel.objects.select_related('author__user').get(pk=self.novel.pk), export_type='zip')
+        # 版本需要查詢資料庫，先在主執行緒算好
+        export.path
+        return export
+
+    def test_paths_escaping_media_root_are_left_alone(self):
+        data = b''.join(self.export().stream())
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertFalse([name for name in archive.namelist() if name.startswith('images/')])
+            self.assertIn(f'src="{settings.MEDIA_URL}../../etc/passwd"', archive.read('chapters/0001.html').decode())
+
+    @mock.patch('core.exports.BUILD_POLL_SECONDS', 0.01)
+    def test_concurrent_downloads_build_once(self):
+        first, second = self.export(), self.export()
+        generate = NovelExport._generate
+        with mock.patch.object(NovelExport, '_generate', autospec=True, side_effect=generate) as spy:
+            building = first.stream()
+            head = next(building)
+            self.assertTrue(os.path.exists(first.lock_path))
+
+            waited = {}
+            waiter = threading.Thread(target=lambda: waited.update(data=b''.join(second.stream())))
+            waiter.start()
+            data = head + b''.join(building)
+            waiter.join(timeout=10)
+
+        self.assertEqual(spy.call_count, 1)
+        self.assertEqual(waited['data'], data)
+        self.assertFalse(os.path.exists(first.lock_path))
+        with open(first.path, 'rb') as fh:
+            self.assertEqual(fh.read(), data)
+
+    def test_stale_lock_is_replaced(self):
+        export = self.export()
+        os.makedirs(export.directory, exist_ok=True)
+        with open(export.lock_path, 'w') as fh:
+            fh.write('crashed')
+        old = time.time() - 3600
+        os.utime(export.lock_path, (old, old))
+
+        b''.join(export.stream())
+        self.assertIsNotNone(export.cached_path())
+        self.assertFalse(os.path.exists(export.lock_path))
+
+
+class NovelChapterStatsTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='author', password='p', role='AUTHOR')
+        self.novel = Novel.objects.create(title='t', author=user.author_profile, description='d')
+
+    def add_chapter(self, order):
+        return Chapter.objects.create(
+            novel=self.novel, title=f'c{order}', order=order, status=Chapter.Status.PUBLISHED
+        )
+
+    def published_count(self):
+        return Novel.objects.values_list('published_chapter_count', flat=True).get(pk=self.novel.pk)
+
+    def test_chapters_in_one_transaction_refresh_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for order in range(1, 6):
+                        self.add_chapter(order)
+        novel_updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "core_novel"')]
+        self.assertEqual(len(novel_updates), 1)
+        self.assertEqual(self.published_count(), 5)
+
+    def test_each_transaction_registers_its_own_refresh(self):
+        for order in (1, 2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.add_chapter(order)
+            self.assertEqual(self.published_count(), order)
+
+    def test_rolled_back_block_does_not_swallow_later_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.add_chapter(1)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.add_chapter(2)
+        self.assertEqual(self.published_count(), 1)
+
+
+class NovelListCacheTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.addCleanup(get_response_cache().clear)
+        user = CustomUser.objects.create_user(username='author', password='p', role='AUTHOR')
+        self.reader = CustomUser.objects.create_user(username='reader', password='p')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.novel = Novel.objects.create(title='t', author=user.author_profile, description='d')
+            self.published = Chapter.objects.create(novel=self.novel, title='c1', order=1, status=Chapter.Status.PUBLISHED)
+            self.draft = Chapter.objects.create(novel=self.novel, title='c2', order=2)
+        self.client = APIClient()
+        self.client.get('/api/novels/')
+
+    def assertCached(self):
+        with self.assertNumQueries(0):
+            return self.client.get('/api/novels/')
+
+    def test_draft_save_keeps_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            draft = Chapter.objects.get(pk=self.draft.pk)
+            draft.title = 'renamed draft'
+            draft.content = '<p>autosave</p>'
+            draft.save()
+        self.assertCached()
+
+    def test_reading_position_update_keeps_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            progress = ReadingProgress.objects.create(user=self.reader, novel=self.novel, last_read_chapter=self.published)
+        self.assertEqual(self.client.get('/api/novels/').data['results'][0]['bookmark_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            progress.last_read_chapter = self.draft
+            progress.save()
+        self.assertCached()
+
+    def test_publishing_and_unpublishing_invalidate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            draft = Chapter.objects.get(pk=self.draft.pk)
+            draft.status = Chapter.Status.PUBLISHED
+            draft.save()
+        self.assertEqual(self.client.get('/api/novels/').data['results'][0]['chapter_count'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            draft.status = Chapter.Status.DRAFT
+            draft.save()
+        self.assertEqual(self.client.get('/api/novels/').data['results'][0]['chapter_count'], 1)
+
+    def test_deleting_published_chapter_invalidates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Chapter.objects.get(pk=self.published.pk).delete()
+        self.assertEqual(self.client.get('/api/novels/').data['results'][0]['chapter_count'], 0)
+
+
+class ChapterAdminTests(TestCase):
+    def setUp(self):
+        admin_user = CustomUser.objects.create_superuser(username='admin', password='p', email='a@example.com')
+        self.client.force_login(admin_user)
+        user = CustomUser.objects.create_user(username='author', password='p', role='AUTHOR')
+        novel = Novel.objects.create(title='t', author=user.author_profile, description='d')
+        self.chapter = Chapter.objects.create(novel=novel, title='c1', order=1, content='<p>old body</p>')
+        self.url = f'/admin/core/chapter/{self.chapter.pk}/change/'
+
+    def test_change_form_edits_content(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, '&lt;p&gt;old body&lt;/p&gt;')
+
+        response = self.client.post(self.url, {
+            'novel': self.chapter.novel_id, 'volume': '', 'title': 'c1', 'order': 1,
+            'views': 0, 'status': Chapter.Status.DRAFT, 'content': '<p>new body</p>',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Chapter.objects.get(pk=self.chapter.pk).content, '<p>new body</p>')
+
+
+@override_settings(VIEW_COUNTER_FLUSH_INTERVAL=60)
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='author', password='p', role='AUTHOR')
+        self.novel = Novel.objects.create(title='t', author=user.author_profile, description='d')
+        self.chapters = [
+            Chapter.objects.create(novel=self.novel, title=f'c{order}', order=order, status=Chapter.Status.PUBLISHED)
+            for order in (1, 2)
+        ]
+        self.counter = ViewCounter()
+        # 測試中直接呼叫 flush()，不啟動背景執行緒
+        self.counter._pid = os.getpid()
+
+    def views(self, model, pk):
+        return model.objects.values_list('views', flat=True).get(pk=pk)
+
+    def test_flush_writes_each_table_in_one_statement(self):
+        for chapter in self.chapters * 3:
+            self.counter.record(self.novel.pk, chapter.pk)
+        with CaptureQueriesContext(connection) as queries:
+            self.counter.flush()
+
+        statements = [q['sql'] for q in queries]
+        self.assertEqual(len([sql for sql in statements if sql.startswith('UPDATE "core_novel"')]), 1)
+        self.assertEqual(len([sql for sql in statements if sql.startswith('UPDATE "core_chapter"')]), 1)
+        self.assertEqual(self.views(Novel, self.novel.pk), 6)
+        self.assertEqual([self.views(Chapter, chapter.pk) for chapter in self.chapters], [3, 3])
+        self.assertEqual(NovelDailyStat.objects.get(novel=self.novel).views, 6)
+        self.assertEqual(
+            sorted(ChapterDailyStat.objects.values_list('chapter_id', 'views')),
+            [(self.chapters[0].pk, 3), (self.chapters[1].pk, 3)],
+        )
+        self.assertEqual(self.counter.pending_novel_views(self.novel.pk), 0)
+
+    def test_failed_flush_requeues_counts(self):
+        self.counter.record(self.novel.pk, self.chapters[0].pk)
+        with mock.patch('core.view_counter.add_daily', side_effect=RuntimeError('db down')), \
+                self.assertLogs('core.view_counter', 'ERROR'):
+            self.counter.flush()
+        self.assertEqual(self.views(Novel, self.novel.pk), 0)
+        self.assertEqual(self.counter.pending_novel_views(self.novel.pk), 1)
+        self.assertEqual(self.counter.pending_chapter_views(self.chapters[0].pk), 1)
+
+        self.counter.record(self.novel.pk, self.chapters[0].pk)
+        self.counter.flush()
+        self.assertEqual(self.views(Novel, self.novel.pk), 2)
+        self.assertEqual(self.views(Chapter, self.chapters[0].pk), 2)
+        self.assertEqual(ChapterDailyStat.objects.get(chapter=self.chapters[0]).views, 2)
+
+    def test_deleted_chapter_is_skipped(self):
+        deleted, kept = self.chapters
+        self.counter.record(self.novel.pk, deleted.pk)
+        self.counter.record(self.novel.pk, kept.pk)
+        deleted.delete()
+        self.counter.flush()
+
+        self.assertEqual(self.views(Novel, self.novel.pk), 2)
+        self.assertEqual(list(ChapterDailyStat.objects.values_list('chapter_id', 'views')), [(kept.pk, 1)])
+        self.assertEqual(self.counter.pending_chapter_views(deleted.pk), 0)
+
+
+# 觀看次數直接寫回，不在測試中啟動 flush 執行緒
+@override_settings(VIEW_COUNTER_FLUSH_INTERVAL=0)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='author', password='p', role='AUTHOR')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.novel = Novel.objects.create(title='t', author=user.author_profile, description='d')
+            self.chapter = Chapter.objects.create(
+                novel=self.novel, title='c1', order=1, status=Chapter.Status.PUBLISHED, content='<p>body</p>'
+            )
+        self.client = APIClient()
+        self.novel_url = f'/api/novels/{self.novel.pk}/'
+        self.chapter_url = f'/api/novels/{self.novel.pk}/chapters/{self.chapter.pk}/'
+
+    def test_novel_not_modified_still_counts_view(self):
+        etag = self.client.get(self.novel_url)['ETag']
+        with mock.patch('core.views.record_novel_view') as record:
+            response = self.client.get(self.novel_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        record.assert_called_once_with(self.novel.pk)
+
+    def test_chapter_not_modified_still_counts_view(self):
+        etag = self.client.get(self.chapter_url)['ETag']
+        with mock.patch('core.views.record_chapter_view') as record:
+            response = self.client.get(self.chapter_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        record.assert_called_once_with(self.novel.pk, self.chapter.pk)
+
+    def test_chapter_edit_changes_etags(self):
+        chapter_etag = self.client.get(self.chapter_url)['ETag']
+        novel_etag = self.client.get(self.novel_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            chapter = Chapter.objects.get(pk=self.chapter.pk)
+            chapter.content = '<p>edited</p>'
+            chapter.save()
+
+        response = self.client.get(self.chapter_url, HTTP_IF_NONE_MATCH=chapter_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], chapter_etag)
+        self.assertEqual(response.data['content'], '<p>edited</p>')
+        response = self.client.get(self.novel_url, HTTP_IF_NONE_MATCH=novel_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], novel_etag)
+
+
+class NovelBatchTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='author', password='p', role='AUTHOR')
+        self.novels, self.chapters = [], []
+        for n in range(5):
+            novel = Novel.objects.create(title=f'n{n}', author=user.author_profile, description='d')
+            self.novels.append(novel)
+            self.chapters.append(Chapter.objects.create(
+                novel=novel, title=f'c{n}', order=1, status=Chapter.Status.PUBLISHED
+            ))
+        self.client = APIClient()
+
+    def fetch(self, novels, chapters):
+        return self.client.get('/api/novels/batch/', {
+            'ids': ','.join(str(novel.pk) for novel in novels),
+            'chapters': ','.join(str(chapter.pk) for chapter in chapters),
+        })
+
+    def test_query_count_does_not_grow_with_ids(self):
+        # 小說卡片一次、章節標題一次
+        with self.assertNumQueries(2):
+            response = self.fetch(self.novels[:1], self.chapters[:1])
+        self.assertEqual(len(response.data['novels']), 1)
+        with self.assertNumQueries(2):
+            response = self.fetch(reversed(self.novels), self.chapters)
+        self.assertEqual([item['id'] for item in response.data['novels']], [n.pk for n in reversed(self.novels)])
+        self.assertEqual(len(response.data['chapters']), 5)
+
+    def test_non_numeric_ids_are_rejected(self):
+        for params in ({'ids': '1,abc'}, {'ids': '1', 'chapters': '2;3'}):
+            response = self.client.get('/api/novels/batch/', params)
+            self.assertEqual(response.status_code, 400)
+
+
+class ChapterSegmentsTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='author', password='p', role='AUTHOR')
+        self.novel = Novel.objects.create(title='t', author=user.author_profile, description='d')
+        paragraph = '<p>' + '字' * (SEGMENT_TARGET_CHARS // 3) + '</p>'
+        self.content = '\n'.join([paragraph] * 10)
+        self.chapter = Chapter.objects.create(
+            novel=self.novel, title='c1', order=1, status=Chapter.Status.PUBLISHED, content=self.content
+        )
+        self.url = f'/api/novels/{self.novel.pk}/chapters/{self.chapter.pk}/segments/'
+        self.client = APIClient()
+
+    def test_boundaries_fall_on_top_level_elements(self):
+        html = '<p>a</p><blockquote><p>' + 'b' * 50 + '</p><p>c</p></blockquote><hr><p>d</p>'
+        self.assertEqual(split_offsets(html, target=1), [0, 8, html.index('<hr>'), html.index('<p>d')])
+
+    def test_segments_are_whole_paragraphs(self):
+        data = self.client.get(self.url).data
+        self.assertGreater(data['segment_count'], 1)
+        self.assertEqual(''.join(segment['html'] for segment in data['segments']), self.content)
+        for segment in data['segments']:
+            self.assertTrue(segment['html'].startswith('<p>'))
+            self.assertTrue(segment['html'].rstrip('\n').endswith('</p>'))
+
+    def test_start_and_count_select_a_range(self):
+        total = self.client.get(self.url).data['segment_count']
+        data = self.client.get(self.url, {'start': 1, 'count': 1}).data
+        self.assertEqual([segment['index'] for segment in data['segments']], [1])
+        data = self.client.get(self.url, {'start': total - 1}).data
+        self.assertEqual([segment['index'] for segment in data['segments']], [total - 1])
+
+    def test_start_past_the_end_is_rejected(self):
+        total = self.client.get(self.url).data['segment_count']
+        response = self.client.get(self.url, {'start': total})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['segment_count'], total)
+
+    def test_empty_chapter_accepts_start_zero(self):
+        chapter = Chapter.objects.create(novel=self.novel, title='c2', order=2, status=Chapter.Status.PUBLISHED)
+        response = self.client.get(f'/api/novels/{self.novel.pk}/chapters/{chapter.pk}/segments/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['segments'], [])
+
+    def test_invalid_start_or_count_is_rejected(self):
+        for params in ({'start': -1}, {'start': 'x'}, {'count': 0}, {'count': -2}, {'count': '1.5'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+@override_settings(VIEW_COUNTER_FLUSH_INTERVAL=0)
+class ChapterBundleTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='author', password='p', role='AUTHOR')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.novel = Novel.objects.create(title='t', author=user.author_profile, description='d')
+            self.chapters = [
+                Chapter.objects.create(
+                    novel=self.novel, title=f'c{order}', order=order, status=Chapter.Status.PUBLISHED,
+                    content='<p>' + '內文' * 200 + '</p>',
+                )
+                for order in range(1, 5)
+            ]
+        self.client = APIClient()
+        self.url = f'/api/novels/{self.novel.pk}/chapters/{self.chapters[0].pk}/bundle/'
+        self.view_url = f'/api/novels/{self.novel.pk}/chapters/{self.chapters[0].pk}/view/'
+
+    def test_bundle_is_gzipped_with_weak_etag(self):
+        response = self.client.get(self.url, {'next': 2}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual([item['id'] for item in data['following']], [c.pk for c in self.chapters[1:3]])
+
+        response = self.client.get(self.url, {'next': 2}, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_next_is_validated_and_capped(self):
+        for value in ('-3', 'x'):
+            self.assertEqual(self.client.get(self.url, {'next': value}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'next': 0}).data['following'], [])
+        with mock.patch('core.views.BUNDLE_MAX_NEXT', 1):
+            following = self.client.get(self.url, {'next': 10}).data['following']
+        self.assertEqual([item['id'] for item in following], [self.chapters[1].pk])
+
+    def test_view_beacon(self):
+        self.assertEqual(self.client.post(self.view_url).status_code, 204)
+        other = Novel.objects.create(title='o', author=self.novel.author, description='d')
+        for url in (
+            f'/api/novels/{other.pk}/chapters/{self.chapters[0].pk}/view/',
+            f'/api/novels/{self.novel.pk}/chapters/999999/view/',
+        ):
+            self.assertEqual(self.client.post(url).status_code, 404)
+
+    def test_bundle_then_beacon_counts_one_view(self):
+        self.client.get(self.url)
+        self.client.post(self.view_url)
+        self.assertEqual(Chapter.objects.get(pk=self.chapters[0].pk).views, 1)
+        self.assertEqual(Chapter.objects.get(pk=self.chapters[1].pk).views, 0)
+        self.assertEqual(Novel.objects.get(pk=self.novel.pk).views, 1)
+
+
+@override_settings(VIEW_COUNTER_FLUSH_INTERVAL=0)
+class ReadingOrderTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='author', password='p', role='AUTHOR')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.novel = Novel.objects.create(title='t', author=user.author_profile, description='d')
+            self.first, self.draft, self.last = [
+                Chapter.objects.create(novel=self.novel, title=f'c{order}', order=order, status=status)
+                for order, status in (
+                    (1, Chapter.Status.PUBLISHED), (2, Chapter.Status.DRAFT), (3, Chapter.Status.PUBLISHED),
+                )
+            ]
+        self.client = APIClient()
+
+    def reading_order(self):
+        return self.client.get(f'/api/novels/{self.novel.pk}/chapters/reading-order/').data['chapter_ids']
+
+    def neighbors(self, chapter):
+        data = self.client.get(f'/api/novels/{self.novel.pk}/chapters/{chapter.pk}/').data
+        return data['previous_chapter_id'], data['next_chapter_id']
+
+    def change(self, chapter, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, value in fields.items():
+                setattr(chapter, name, value)
+            chapter.save()
+
+    def test_publish_reorder_and_delete_update_the_order(self):
+        self.assertEqual(self.reading_order(), [self.first.pk, self.last.pk])
+        self.assertEqual(self.neighbors(self.first), (None, self.last.pk))
+
+        self.change(self.draft, status=Chapter.Status.PUBLISHED)
+        self.assertEqual(self.reading_order(), [self.first.pk, self.draft.pk, self.last.pk])
+        self.assertEqual(self.neighbors(self.first), (None, self.draft.pk))
+
+        self.change(self.last, order=0)
+        self.assertEqual(self.reading_order(), [self.last.pk, self.first.pk, self.draft.pk])
+        self.assertEqual(self.neighbors(self.first), (self.last.pk, self.draft.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.draft.delete()
+        self.assertEqual(self.reading_order(), [self.last.pk, self.first.pk])
+        self.assertEqual(self.neighbors(self.first), (self.last.pk, None))
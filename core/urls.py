@@ -7,10 +7,13 @@ from .views import (
     ReadingProgressViewSet,
     NovelViewSet,
     ChapterViewSet,
+    ChapterSearchView,
     VolumeViewSet,
     ImageView,
     MyTokenObtainPairView, # Re-import our custom view
     novel_analytics,
+    author_analytics,
+    leaderboard,
     log_frontend_error, # Import the new view
     AdminViewSet,
 )
@@ -47,8 +50,15 @@ urlpatterns = [
     # 前端錯誤日誌
     path('log-frontend-error/', log_frontend_error, name='log-frontend-error'),
 
+    # 跨小說的章節內文搜尋
+    path('chapters/search/', ChapterSearchView.as_view(), name='chapter-search'),
+
+    # 排行榜
+    path('leaderboards/', leaderboard, name='leaderboard'),
+
     # 小說分析
     path('novels/<int:pk>/analytics/', novel_analytics, name='novel-analytics'),
+    path('analytics/author/', author_analytics, name='author-analytics'),
 
     # 小說 (必須放在章節 URL 之後，以避免路由衝突)
     path('', include(router.urls)),
@@ -0,0 +1,163 @@
+# novel_backend/core/view_counter.py
+"""
+觀看次數的緩衝計數器。
+
+閱讀請求只把增量累加在行程內的計數器中，再由背景執行緒每隔
+VIEW_COUNTER_FLUSH_INTERVAL 秒以單一條 UPDATE ... FROM (VALUES ...) 批次寫回，
+避免熱門小說在每次閱讀時都搶同一列的 row lock。
+同一個 transaction 中也把增量加到當天的 NovelDailyStat (排行榜) 與 ChapterDailyStat (作者分析) 上。
+行程崩潰時最多遺失一個 flush 週期內的計數。
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, models, transaction
+
+from .daily_stats import add_daily
+from .models import Novel, Chapter, NovelDailyStat, ChapterDailyStat
+
+logger = logging.getLogger(__name__)
+
+
+def _bulk_increment(model, deltas):
+    """以一條 SQL 將 {pk: delta} 加到 model.views 上。"""
+    if not deltas:
+        return
+
+    if connection.vendor != 'postgresql':
+        # 開發環境 (例如 SQLite) 沒有 UPDATE ... FROM，逐列更新即可
+        with transaction.atomic():
+            for pk, delta in deltas.items():
+                model.objects.filter(pk=pk).update(views=models.F('views') + delta)
+        return
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    values = ', '.join(['(%s, %s)'] * len(deltas))
+    params = [value for item in deltas.items() for value in item]
+    sql = (
+        f'UPDATE {table} AS t SET views = t.views + v.delta '
+        f'FROM (VALUES {values}) AS v(id, delta) '
+        f'WHERE t.id = v.id'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+class ViewCounter:
+    """
+    行程內的觀看次數累加器。
+
+    每個 Gunicorn worker 各自持有一份計數，fork 之後會重設並啟動自己的 flush 執行緒。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._novels = Counter()
+        self._chapters = Counter()
+        # chapter_id -> novel_id，寫入 ChapterDailyStat 時使用
+        self._chapter_novels = {}
+        self._pid = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def interval(self):
+        return getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 10)
+
+    def record(self, novel_id, chapter_id=None):
+        """記錄一次閱讀。chapter_id 為 None 時只計入小說本身。"""
+        self._ensure_flusher()
+        with self._lock:
+            self._novels[novel_id] += 1
+            if chapter_id is not None:
+                self._chapters[chapter_id] += 1
+                self._chapter_novels[chapter_id] = novel_id
+
+        if self.interval <= 0:
+            # 關閉緩衝時直接寫回 (方便測試與除錯)
+            self.flush()
+
+    def pending_novel_views(self, novel_id):
+        with self._lock:
+            return self._novels.get(novel_id, 0)
+
+    def pending_chapter_views(self, chapter_id):
+        with self._lock:
+            return self._chapters.get(chapter_id, 0)
+
+    def flush(self):
+        """把目前累積的增量寫回資料庫；失敗時放回計數器，下個週期重試。"""
+        with self._lock:
+            novels, self._novels = self._novels, Counter()
+            chapters, self._chapters = self._chapters, Counter()
+            chapter_novels, self._chapter_novels = self._chapter_novels, {}
+
+        if not novels and not chapters:
+            return
+
+        try:
+            with transaction.atomic():
+                _bulk_increment(Novel, novels)
+                _bulk_increment(Chapter, chapters)
+                add_daily(NovelDailyStat, ['novel'], 'views', {(pk,): delta for pk, delta in novels.items()})
+                add_daily(ChapterDailyStat, ['novel', 'chapter'], 'views', {
+                    (chapter_novels[pk], pk): delta for pk, delta in chapters.items()
+                })
+        except Exception:
+            logger.exception("Failed to flush buffered view counts, will retry next window.")
+            with self._lock:
+                self._novels.update(novels)
+                self._chapters.update(chapters)
+                self._chapter_novels.update(chapter_novels)
+
+    def _ensure_flusher(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            if self.interval > 0:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, name='view-counter-flusher', daemon=True
+                )
+                self._thread.start()
+
+    def _reset_after_fork(self):
+        # 子行程不繼承父行程的計數 (由父行程自己寫回)，也不繼承可能被持有中的鎖
+        self._lock = threading.Lock()
+        self._novels = Counter()
+        self._chapters = Counter()
+        self._chapter_novels = {}
+        self._pid = None
+        self._thread = None
+
+    def _run(self):
+        stop = self._stop
+        while not stop.wait(self.interval):
+            self.flush()
+            # 背景執行緒不經過 request 週期，自行關閉連線避免閒置連線堆積
+            connection.close()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._pid == os.getpid():
+            self.flush()
+
+
+view_counter = ViewCounter()
+atexit.register(view_counter.shutdown)
+os.register_at_fork(after_in_child=view_counter._reset_after_fork)
+
+
+def record_novel_view(novel_id):
+    view_counter.record(novel_id)
+
+
+def record_chapter_view(novel_id, chapter_id):
+    view_counter.record(novel_id, chapter_id)
@@ -5,17 +5,31 @@ from rest_framework import generics, viewsets, status, serializers
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
-from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Sum, Count, Prefetch
+from rest_framework.filters import OrderingFilter
+from django.db.models import Sum, Count, Max, Prefetch, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.db import models
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework_simplejwt.views import TokenObtainPairView as OriginalTokenObtainPairView
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header
 import logging
+from itertools import groupby
 
 # --- Local Imports ---
-from .models import CustomUser, AuthorProfile, Novel, Chapter, ReadingProgress, Volume # 引入 ReadingProgress 和 Volume
+from .models import CustomUser, AuthorProfile, Novel, Chapter, ReadingProgress, Volume, LeaderboardEntry, MediaBlob # 引入 ReadingProgress 和 Volume
 from .permissions import IsAuthorUserForWrite, IsAuthorOrReadOnly, IsAdminRole
+from .view_counter import view_counter, record_novel_view, record_chapter_view
+from .http_cache import ConditionalGetMixin, latest
+from .image_variants import build_variants, variant_srcsets
+from .media_store import store_upload
+from .exports import EXPORT_TYPES, NovelExport
+from .analytics import MAX_RANGE_DAYS, parse_date_range, daily_views, retention_curve, author_dashboard
+from .list_cache import novel_list_cache_key, get_cached_list, set_cached_list, list_cache_stats, get_cache as get_response_cache
+from .reading_order import get_reading_order
+from .search import NovelSearchFilter, search_chapters
 from .serializers import (
     UserRegistrationSerializer,
     UserProfileSerializer,     # 用於個人設定頁
@@ -24,15 +38,20 @@ from .serializers import (
     NovelDetailSerializer,
     ChapterSerializer,          # 用於章節列表
     ChapterDetailSerializer,    # 用於章節詳情
+    ChapterSegmentsSerializer,  # 用於分段載入章節內文
     ChapterEditSerializer,      # 用於章節編輯
+    ChapterSearchResultSerializer, # 用於章節內文搜尋
     ReadingProgressSerializer,   # 用於書架與閱讀進度
+    LeaderboardEntrySerializer,  # 用於排行榜
     ImageUploadSerializer,
     CustomTokenObtainPairSerializer, # 引入新的 Serializer
     VolumeSerializer, # 引入 VolumeSerializer
     VolumeEditSerializer # 引入 VolumeEditSerializer
 )
 
+from django.conf import settings
 from django.core.files.storage import default_storage
+from django.middleware.gzip import GZipMiddleware
 
 logger = logging.getLogger(__name__)
 
@@ -66,12 +85,16 @@ class ImageView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         image = serializer.validated_data['image']
-        # You might want to create a more sophisticated path, 
-        # e.g., based on user or date
-        path = f'chapter_images/{image.name}'
-        saved_path = default_storage.save(path, image)
-        url = default_storage.url(saved_path)
-        return Response({'url': url}, status=status.HTTP_201_CREATED)
+        # 以內容雜湊存放，重複上傳同一張圖時直接回傳既有的網址 (見 core/media_store.py)
+        blob, created = store_upload(image)
+        url = default_storage.url(blob.file)
+        # 章節插圖在上傳時就產生縮圖與 WebP/AVIF 版本，讀者依螢幕寬度下載適當的大小
+        ready = blob.image_variants == blob.file or build_variants(MediaBlob, blob.pk, 'file', blob.file, 'chapter')
+        srcsets = variant_srcsets(blob.file, 'chapter') if ready else None
+        return Response(
+            {'url': url, 'srcset': srcsets['webp'] if srcsets else None},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
 
 
 
@@ -109,7 +132,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 #  作者 (Author) & 小說 (Novel) Views
 # ===================================================================
 
-class AuthorDetailView(generics.RetrieveAPIView):
+class AuthorDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     """
     獲取特定作者的公開資訊及其發表的小說列表。
     - GET /api/authors/{user_id}/
@@ -119,6 +142,20 @@ class AuthorDetailView(generics.RetrieveAPIView):
     permission_classes = [AllowAny]
     lookup_field = 'user_id' # 使用 CustomUser 的 ID 來查詢
 
+    def get_validators(self):
+        # 個人檔案沒有時間戳，直接把顯示的欄位納入 ETag；小說列表以最新的 updated_at 與數量代表。
+        # 個人檔案的修改不會反映在時間戳上，所以不送 Last-Modified，只靠 ETag 驗證
+        row = AuthorProfile.objects.filter(user_id=self.kwargs['user_id']).annotate(
+            novel_count=Count('novels'), novels_updated_at=Max('novels__updated_at'),
+        ).values_list('pen_name', 'bio', 'user__username', 'user__avatar', 'novel_count', 'novels_updated_at').first()
+        return (row, None) if row is not None else None
+
+    def retrieve(self, request, *args, **kwargs):
+        not_modified = self.not_modified_response()
+        if not_modified is not None:
+            return not_modified
+        return super().retrieve(request, *args, **kwargs)
+
 
 class ChapterDetailView(generics.RetrieveAPIView):
     """
@@ -131,9 +168,60 @@ class ChapterDetailView(generics.RetrieveAPIView):
 
     def get_queryset(self):
         """確保章節是從正確的小說中獲取的。"""
-        return Chapter.objects.filter(novel_id=self.kwargs['novel_pk'])
+        return Chapter.objects.filter(novel_id=self.kwargs['novel_pk']).select_related('novel', 'body')
+
+class ChapterSearchView(generics.ListAPIView):
+    """
+    跨所有小說搜尋已發布章節的內文，依相關度排序。
+    - GET /api/chapters/search/?q=...
+    """
+    serializer_class = ChapterSearchResultSerializer
+    permission_classes = [AllowAny]
+
+    def get_search_text(self):
+        return self.request.query_params.get('q', '').strip()
+
+    def get_queryset(self):
+        queryset = Chapter.objects.filter(status=Chapter.Status.PUBLISHED)
+        return search_chapters(queryset, self.get_search_text()).select_related('novel', 'body').order_by(
+            '-search_rank', 'novel_id', 'order'
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['search_text'] = self.get_search_text()
+        return context
 
-class VolumeViewSet(viewsets.ModelViewSet):
+    def list(self, request, *args, **kwargs):
+        if not self.get_search_text():
+            return Response({'q': '搜尋字詞是必填的。'}, status=status.HTTP_400_BAD_REQUEST)
+        return super().list(request, *args, **kwargs)
+
+def export_response(request, novel, volume=None):
+    """
+    下載小說或分卷的離線閱讀檔 (?type=epub 或 zip)。
+    目前版本已產生過時直接回傳快取檔，否則邊產生邊以串流回傳。
+    """
+    export_type = request.query_params.get('type', 'epub')
+    if export_type not in EXPORT_TYPES:
+        return Response({'type': f"必須是 {', '.join(EXPORT_TYPES)} 其中之一。"}, status=status.HTTP_400_BAD_REQUEST)
+
+    export = NovelExport(novel, volume, export_type)
+    etag = f'"{export.version}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    cached = export.cached_path()
+    if cached is not None:
+        response = FileResponse(open(cached, 'rb'), as_attachment=True, filename=export.filename, content_type=export.content_type)
+    else:
+        response = StreamingHttpResponse(export.stream(), content_type=export.content_type)
+        response['Content-Disposition'] = content_disposition_header(True, export.filename)
+    response['ETag'] = etag
+    return response
+
+class VolumeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     處理所有與分卷相關的操作。
     """
@@ -151,7 +239,22 @@ class VolumeViewSet(viewsets.ModelViewSet):
         novel_pk = self.kwargs.get('novel_pk')
         if novel_pk is None:
             return self.queryset.none() # 如果沒有 novel_pk，則不返回任何分卷
-        return self.queryset.filter(novel_id=novel_pk).order_by('order')
+        return self.queryset.filter(novel_id=novel_pk).order_by('order').prefetch_related(
+            Prefetch('chapters', queryset=Chapter.objects.order_by('order'))
+        )
+
+    def get_validators(self):
+        # 分卷內的章節變動都會更新小說的 updated_at (見 update_novel_timestamp)
+        row = Volume.objects.filter(pk=self.kwargs['pk'], novel_id=self.kwargs['novel_pk']).values_list(
+            'updated_at', 'novel__updated_at'
+        ).first()
+        return (row, latest(*row)) if row is not None else None
+
+    def retrieve(self, request, *args, **kwargs):
+        not_modified = self.not_modified_response()
+        if not_modified is not None:
+            return not_modified
+        return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         novel = Novel.objects.get(pk=self.kwargs['novel_pk'])
@@ -160,13 +263,49 @@ class VolumeViewSet(viewsets.ModelViewSet):
         next_order = (last_volume.order + 1) if last_volume else 1
         serializer.save(novel=novel, order=next_order)
 
+    @action(detail=True, methods=['get'])
+    def export(self, request, *args, **kwargs):
+        """
+        下載分卷已發布章節的離線閱讀檔。
+        - GET /api/novels/{novel_pk}/volumes/{pk}/export/?type=epub
+        """
+        volume = get_object_or_404(
+            Volume.objects.select_related('novel__author__user'), pk=self.kwargs['pk'], novel_id=self.kwargs['novel_pk']
+        )
+        return export_response(request, volume.novel, volume)
+
+
+# 批次查詢一次最多接受的小說數
+NOVEL_BATCH_LIMIT = 100
 
-class NovelViewSet(viewsets.ModelViewSet):
+
+def parse_id_list(value):
+    """將 '1,2,3' 轉成不重複且保留順序的整數列表；格式錯誤時拋出 ValueError。"""
+    ids = [int(item) for item in value.split(',') if item.strip()]
+    return list(dict.fromkeys(ids))
+
+
+def with_card_stats(queryset):
+    """
+    為小說卡片加上收藏數。
+    以相關子查詢計算，避免 JOIN 書架後 GROUP BY 造成的計數膨脹；
+    章節數與最新章節則直接讀取 Novel 上的反正規化欄位。
+    """
+    bookmarks = ReadingProgress.objects.filter(novel=OuterRef('pk'))
+    return queryset.annotate(
+        bookmark_count=Coalesce(
+            Subquery(bookmarks.order_by().values('novel').annotate(c=Count('pk')).values('c')), 0
+        ),
+    )
+
+
+class NovelViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     處理所有與小說相關的操作。
     """
     queryset = Novel.objects.all().order_by('-updated_at')
-    filter_backends = [SearchFilter, OrderingFilter]
+    filter_backends = [NovelSearchFilter, OrderingFilter]
+    # 只在非 PostgreSQL 的開發環境中使用 (NovelSearchFilter 退回 ILIKE 搜尋)
     search_fields = ['title', 'author__pen_name', 'author__user__username', 'description']
     ordering_fields = ['views', 'updated_at', 'created_at', 'bookmark_count']
 
@@ -192,6 +331,10 @@ class NovelViewSet(viewsets.ModelViewSet):
                 # If user is authenticated but not an author, return empty queryset for 'my_novels'
                 return Novel.objects.none()
 
+        if self.action == 'list':
+            # 列表只需要卡片資料，不載入分卷與章節樹
+            return with_card_stats(queryset.select_related('author__user'))
+
         # Correctly pre-load related data.
         # By using Prefetch without a custom queryset, Django will correctly
         # filter the related objects based on the parent novel.
@@ -199,7 +342,9 @@ class NovelViewSet(viewsets.ModelViewSet):
         return queryset.prefetch_related(
             Prefetch(
                 'volumes',
-                queryset=Volume.objects.order_by('order').select_related('novel'),
+                queryset=Volume.objects.order_by('order').select_related('novel').prefetch_related(
+                    Prefetch('chapters', queryset=Chapter.objects.order_by('order'))
+                ),
                 to_attr='volumes_ordered'  # Use a different attribute to avoid conflicts
             ),
             Prefetch(
@@ -207,11 +352,7 @@ class NovelViewSet(viewsets.ModelViewSet):
                 queryset=Chapter.objects.filter(volume__isnull=True, status=Chapter.Status.PUBLISHED).order_by('order'),
                 to_attr='chapters_without_volume'
             )
-        ).annotate(
-            # The calculation of total views still only calculates published ones
-            total_views=Sum('chapters__views', filter=models.Q(chapters__status=Chapter.Status.PUBLISHED), default=0),
-            bookmark_count=Count('reading_progresses')
-        )
+        ).select_related('author__user')
 
     def get_serializer_context(self):
         """Passes context to the serializer to determine if it's an author's view."""
@@ -234,7 +375,7 @@ class NovelViewSet(viewsets.ModelViewSet):
         return context
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ['list', 'batch']:
             return NovelListSerializer
         if self.action == 'chapters':
             return ChapterEditSerializer
@@ -253,74 +394,215 @@ class NovelViewSet(viewsets.ModelViewSet):
         else:
             raise serializers.ValidationError("只有作者才能發表小說。")
 
+    def list(self, request, *args, **kwargs):
+        # 匿名讀者的常見列表組合直接回傳快取的結果 (見 core/list_cache.py)
+        cache_key = novel_list_cache_key(request)
+        if cache_key is None:
+            return super().list(request, *args, **kwargs)
+
+        data = get_cached_list(cache_key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            set_cached_list(cache_key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def get_validators(self):
+        # 章節的新增、修改與刪除都會更新小說的 updated_at；分卷另有自己的 updated_at，
+        # 刪除分卷則由數量反映。作者的編輯檢視會多出草稿，所以也納入 ETag
+        row = Novel.objects.filter(pk=self.kwargs['pk']).annotate(
+            volume_count=Count('volumes'), volumes_updated_at=Max('volumes__updated_at'),
+        ).values_list(
+            'updated_at', 'volume_count', 'volumes_updated_at',
+            'author__pen_name', 'author__user__username', 'author__user__avatar',
+        ).first()
+        if row is None:
+            return None
+        is_author_view = self.get_serializer_context()['is_author_view']
+        return (row, is_author_view), latest(row[0], row[2])
+
     def retrieve(self, request, *args, **kwargs):
+        self.load_validators()
+        # 觀看次數先累積在緩衝計數器，由背景執行緒批次寫回 (見 core/view_counter.py)；
+        # 回 304 時同樣計入
+        record_novel_view(int(self.kwargs['pk']))
+        not_modified = self.not_modified_response()
+        if not_modified is not None:
+            return not_modified
+
         instance = self.get_object()
-        # Use update() to avoid triggering save() and auto_now
-        Novel.objects.filter(pk=instance.pk).update(views=models.F('views') + 1)
-        instance.views += 1 
+        instance.views += view_counter.pending_novel_views(instance.pk)
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def export(self, request, *args, **kwargs):
+        """
+        下載整本小說已發布章節的離線閱讀檔，不計入觀看次數。
+        - GET /api/novels/{pk}/export/?type=epub
+        """
+        novel = get_object_or_404(Novel.objects.select_related('author__user'), pk=self.kwargs['pk'])
+        return export_response(request, novel)
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request, *args, **kwargs):
+        """
+        一次取得多本小說的卡片資料 (書架、最近瀏覽)，不計入觀看次數。
+        可另外指定章節 id，一併回傳章節標題，供顯示閱讀進度使用。
+        - GET /api/novels/batch/?ids=1,2,3&chapters=10,20
+        """
+        try:
+            novel_ids = parse_id_list(request.query_params.get('ids', ''))
+            chapter_ids = parse_id_list(request.query_params.get('chapters', ''))
+        except ValueError:
+            return Response({'detail': 'ids 與 chapters 必須是以逗號分隔的整數。'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(novel_ids) > NOVEL_BATCH_LIMIT or len(chapter_ids) > NOVEL_BATCH_LIMIT:
+            return Response(
+                {'detail': f'一次最多查詢 {NOVEL_BATCH_LIMIT} 筆。'}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        novels = {
+            novel.pk: novel
+            for novel in with_card_stats(Novel.objects.filter(pk__in=novel_ids).select_related('author__user'))
+        } if novel_ids else {}
+        # 依請求的順序回傳，不存在的 id 直接略過
+        serializer = self.get_serializer([novels[pk] for pk in novel_ids if pk in novels], many=True)
+
+        chapters = Chapter.objects.filter(
+            pk__in=chapter_ids, novel_id__in=novels.keys()
+        ).values('id', 'title', 'novel_id') if chapter_ids and novels else []
+
+        return Response({
+            'novels': serializer.data,
+            'chapters': {
+                chapter['id']: {'title': chapter['title'], 'novel': chapter['novel_id']} for chapter in chapters
+            },
+        })
+
+# 排行榜一次最多回傳的名次數
+LEADERBOARD_LIMIT = 100
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def leaderboard(request):
+    """
+    預先計算好的排行榜 (由 refresh_leaderboards 指令重建)。
+    - GET /api/leaderboards/?board=views|bookmarks&period=daily|weekly|monthly|all_time&limit=20
+    """
+    board = request.query_params.get('board', LeaderboardEntry.Board.VIEWS)
+    period = request.query_params.get('period', LeaderboardEntry.Period.WEEKLY)
+    if board not in LeaderboardEntry.Board.values or period not in LeaderboardEntry.Period.values:
+        return Response({'detail': '不支援的排行榜。'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(int(request.query_params.get('limit', 20)), LEADERBOARD_LIMIT)
+    except ValueError:
+        return Response({'detail': 'limit 必須是整數。'}, status=status.HTTP_400_BAD_REQUEST)
+
+    entries = list(
+        LeaderboardEntry.objects.filter(board=board, period=period, rank__lte=limit)
+        .order_by('rank')
+        .select_related('novel__author__user')
+    )
+    # 卡片的收藏數使用重建排行榜時記下的值，不再逐列計算
+    for entry in entries:
+        entry.novel.bookmark_count = entry.bookmark_count
+    return Response({
+        'board': board,
+        'period': period,
+        'computed_at': entries[0].computed_at if entries else None,
+        'results': LeaderboardEntrySerializer(entries, many=True, context={'request': request}).data,
+    })
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def novel_analytics(request, pk):
+    """
+    作者查看自己小說的流量。
+    - GET /api/novels/{pk}/analytics/?start=YYYY-MM-DD&end=YYYY-MM-DD
+    labels / data / volumes 為各章節的累計觀看次數；
+    daily 為區間內每天的觀看數，retention 為區間內已發布章節間的留存率 (見 core/analytics.py)。
+    """
     try:
-        novel = Novel.objects.get(pk=pk)
+        novel = Novel.objects.select_related('author').get(pk=pk)
     except Novel.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
 
-    if novel.author.user != request.user:
+    if novel.author.user_id != request.user.id:
         return Response({'detail': '沒有權限。'}, status=status.HTTP_403_FORBIDDEN)
 
-    chapters_analytics = Chapter.objects.filter(novel=novel).select_related('volume').order_by('order')
-    
-    # Group by Volume
-    volumes_data = []
-    current_volume = None
-    current_volume_chapters = []
-
-    for chapter in chapters_analytics:
-        vol_title = chapter.volume.title if chapter.volume else "未分卷"
-        
-        if current_volume != vol_title:
-            if current_volume is not None:
-                volumes_data.append({
-                    'title': current_volume,
-                    'chapters': current_volume_chapters
-                })
-            current_volume = vol_title
-            current_volume_chapters = []
-        
-        current_volume_chapters.append({
-            'title': chapter.title,
-            'views': chapter.views
-        })
-    
-    # Append the last volume
-    if current_volume is not None:
-         volumes_data.append({
-            'title': current_volume,
-            'chapters': current_volume_chapters
-        })
-    # Handle case with only "No Volume" chapters if loop ran
-    elif current_volume is None and len(chapters_analytics) > 0:
-         volumes_data.append({
-            'title': "未分卷",
-            'chapters': [{'title': c.title, 'views': c.views} for c in chapters_analytics]
-        })
-
-
-    # Backward compatibility (flat list)
-    labels = [chapter.title for chapter in chapters_analytics]
-    data = [chapter.views for chapter in chapters_analytics]
+    try:
+        start, end = parse_date_range(request.query_params)
+    except ValueError:
+        return Response({'detail': f'start 與 end 必須是 YYYY-MM-DD，start 不可晚於 end，且區間不可超過 {MAX_RANGE_DAYS} 天。'}, status=status.HTTP_400_BAD_REQUEST)
+
+    chapters = list(
+        Chapter.objects.filter(novel=novel).order_by('order').values_list('title', 'views', 'volume__title')
+    )
+    # 依分卷分組 (章節已依 order 排序，同一卷的章節相鄰)
+    volumes_data = [
+        {
+            'title': volume_title or "未分卷",
+            'chapters': [{'title': title, 'views': views} for title, views, _ in group],
+        }
+        for volume_title, group in groupby(chapters, key=lambda chapter: chapter[2])
+    ]
 
     return Response({
-        'labels': labels, 
-        'data': data,
-        'volumes': volumes_data
+        'labels': [title for title, _, _ in chapters],
+        'data': [views for _, views, _ in chapters],
+        'volumes': volumes_data,
+        'start': start,
+        'end': end,
+        'daily': daily_views(novel.pk, start, end),
+        'retention': retention_curve(novel.pk, start, end),
     })
 
-class ChapterViewSet(viewsets.ModelViewSet):
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def author_analytics(request):
+    """
+    作者所有小說的流量總覽 (總數、各小說摘要、熱門章節、每日觀看與收藏變化)。
+    - GET /api/analytics/author/?start=YYYY-MM-DD&end=YYYY-MM-DD
+    查詢次數固定，不隨小說或章節數量增加；結果可快取 AUTHOR_ANALYTICS_CACHE_TIMEOUT 秒。
+    """
+    author = getattr(request.user, 'author_profile', None)
+    if author is None:
+        return Response({'detail': '只有作者才能查看流量分析。'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        start, end = parse_date_range(request.query_params)
+    except ValueError:
+        return Response({'detail': f'start 與 end 必須是 YYYY-MM-DD，start 不可晚於 end，且區間不可超過 {MAX_RANGE_DAYS} 天。'}, status=status.HTTP_400_BAD_REQUEST)
+
+    timeout = settings.AUTHOR_ANALYTICS_CACHE_TIMEOUT
+    cache_key = f'author_analytics:{author.pk}:{start}:{end}'
+    data = get_response_cache().get(cache_key) if timeout else None
+    if data is None:
+        data = author_dashboard(author, start, end)
+        if timeout:
+            get_response_cache().set(cache_key, data, timeout)
+
+    # 另外組一份回應，不修改快取中的資料 (快取存的是相對路徑)
+    novels = [
+        {**novel, 'cover_image': request.build_absolute_uri(default_storage.url(novel['cover_image'])) if novel['cover_image'] else None}
+        for novel in data['novels']
+    ]
+    return Response({**data, 'novels': novels})
+
+
+# 閱讀器預先載入的章節包：預設附帶的後續章節數、上限，與整包內文的字元數上限
+BUNDLE_DEFAULT_NEXT = 3
+BUNDLE_MAX_NEXT = 5
+BUNDLE_MAX_CHARS = 200_000
+
+class ChapterViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Chapter.objects.all()
     serializer_class = ChapterEditSerializer
     permission_classes = [IsAuthorOrReadOnly]
@@ -333,19 +615,33 @@ class ChapterViewSet(viewsets.ModelViewSet):
         # For list action, including when mode=edit is present
         return ChapterSerializer
 
-    def retrieve(self, request, *args, **kwargs):
-        chapter_instance = self.get_object() # This gets the Chapter object
+    def get_validators(self):
+        # 上一章/下一章取決於整本小說的閱讀順序，所以同時看小說的 updated_at
+        row = self.get_queryset().filter(pk=self.kwargs['pk']).values_list(
+            'novel_id', 'updated_at', 'novel__updated_at'
+        ).first()
+        if row is None:
+            return None
+        self.chapter_novel_id = row[0]
+        parts = row[1:]
+        if self.action == 'segments':
+            # 不同範圍的區段是不同的回應內容
+            parts += (self.request.query_params.get('start'), self.request.query_params.get('count'))
+        elif self.action == 'bundle':
+            # 後續章節的內容變動時，小說的 updated_at 也會跟著改變
+            parts += (self.request.query_params.get('next'),)
+        return parts, latest(*row[1:])
 
-        # Increment views on the associated Novel safely
-        Novel.objects.filter(pk=chapter_instance.novel.pk).update(views=models.F('views') + 1)
+    def retrieve(self, request, *args, **kwargs):
+        self.load_validators()
+        # 小說與章節的觀看次數一起進入緩衝計數器，不在 request 中直接 UPDATE；回 304 時同樣計入
+        record_chapter_view(self.chapter_novel_id, int(self.kwargs['pk']))
+        not_modified = self.not_modified_response()
+        if not_modified is not None:
+            return not_modified
 
-        # Increment views on the Chapter itself safely
-        Chapter.objects.filter(pk=chapter_instance.pk).update(views=models.F('views') + 1)
-        
-        # Manually update local instance for response if needed (though response uses serialized data from DB usually, 
-        # get_object might use cached if not careful, but typically fine. 
-        # Actually serializer uses the instance passed to it.)
-        chapter_instance.views += 1
+        chapter_instance = self.get_object() # This gets the Chapter object
+        chapter_instance.views += view_counter.pending_chapter_views(chapter_instance.pk)
 
         # Serialize the Chapter instance
         serializer = self.get_serializer(chapter_instance)
@@ -359,8 +655,160 @@ class ChapterViewSet(viewsets.ModelViewSet):
         queryset = self.queryset.filter(novel_id=novel_pk)
         if 'volume_pk' in self.kwargs:
             queryset = queryset.filter(volume_id=self.kwargs['volume_pk'])
+        if self.action in ['retrieve', 'segments', 'bundle']:
+            # 上一章/下一章的索引以小說的 updated_at 作為版本
+            queryset = queryset.select_related('novel', 'body')
+        elif self.action in ['update', 'partial_update']:
+            # 內文只在閱讀與編輯單一章節時才一起載入
+            queryset = queryset.select_related('body')
         return queryset
 
+    @action(detail=True, methods=['get'])
+    def segments(self, request, *args, **kwargs):
+        """
+        以段落為邊界分段取得章節內文，長章節可以先載入閱讀位置附近的幾段再補齊其餘部分。
+        - GET /api/novels/{novel_pk}/chapters/{pk}/segments/?start=0&count=3
+        不帶 count 時回傳 start 之後的所有區段；start 超出區段數時回 400。
+        閱讀器開啟章節時的第一個請求帶 view=1，只有它計入觀看次數。
+        """
+        try:
+            start = int(request.query_params.get('start', 0))
+            count = int(request.query_params['count']) if 'count' in request.query_params else None
+        except ValueError:
+            return Response({'detail': 'start 與 count 必須是整數。'}, status=status.HTTP_400_BAD_REQUEST)
+        if start < 0 or (count is not None and count < 1):
+            return Response({'detail': 'start 不可為負數，count 必須大於 0。'}, status=status.HTTP_400_BAD_REQUEST)
+
+        self.load_validators()
+        if request.query_params.get('view') == '1':
+            record_chapter_view(self.chapter_novel_id, int(self.kwargs['pk']))
+        not_modified = self.not_modified_response()
+        if not_modified is not None:
+            return not_modified
+
+        chapter_instance = self.get_object()
+        chapter_instance.views += view_counter.pending_chapter_views(chapter_instance.pk)
+        context = self.get_serializer_context()
+        context.update(segment_start=start, segment_count=count)
+        serializer = ChapterSegmentsSerializer(chapter_instance, context=context)
+        # start 超出範圍多半是閱讀器用了舊的區段數 (內文已被修改)，回 400 讓它重新載入；空內文仍可取 start=0
+        segment_total = serializer.get_segment_count(chapter_instance)
+        if start and start >= segment_total:
+            return Response(
+                {'detail': f'start 超出範圍，這個章節共有 {segment_total} 個區段。', 'segment_count': segment_total},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def bundle(self, request, *args, **kwargs):
+        """
+        一次取得章節與閱讀順序上接下來的幾章 (含內文)，閱讀器翻到下一章時不必再等一次請求。
+        - GET /api/novels/{novel_pk}/chapters/{pk}/bundle/?next=3
+        next 為負數或不是整數時回 400，超過 BUNDLE_MAX_NEXT 時以上限計。
+        後續章節依序加入，整包內文超過 BUNDLE_MAX_CHARS 字元時停止 (目前這章一定包含在內)。
+        這個端點不計觀看次數，閱讀器真正顯示某一章時再呼叫 view/。
+        """
+        try:
+            count = int(request.query_params.get('next', BUNDLE_DEFAULT_NEXT))
+        except ValueError:
+            count = -1
+        if count < 0:
+            return Response({'detail': 'next 必須是不小於 0 的整數。'}, status=status.HTTP_400_BAD_REQUEST)
+        count = min(count, BUNDLE_MAX_NEXT)
+
+        not_modified = self.not_modified_response()
+        if not_modified is not None:
+            return not_modified
+
+        chapter_instance = self.get_object()
+        following_ids = get_reading_order(chapter_instance.novel).following(chapter_instance.pk, count)
+        following = {
+            chapter.pk: chapter
+            for chapter in Chapter.objects.filter(pk__in=following_ids).select_related('novel', 'body')
+        } if following_ids else {}
+
+        serializer_context = self.get_serializer_context()
+        chapters = [chapter_instance]
+        size = len(chapter_instance.content)
+        for pk in following_ids:
+            chapter = following.get(pk)
+            if chapter is None:
+                continue
+            size += len(chapter.content)
+            if size > BUNDLE_MAX_CHARS:
+                break
+            chapters.append(chapter)
+        for chapter in chapters:
+            chapter.views += view_counter.pending_chapter_views(chapter.pk)
+
+        data = ChapterDetailSerializer(chapters, many=True, context=serializer_context).data
+        return Response({'chapter': data[0], 'following': data[1:]})
+
+    @action(detail=True, methods=['post'], url_path='view', permission_classes=[AllowAny])
+    def record_view(self, request, *args, **kwargs):
+        """
+        閱讀器實際顯示某一章時送出的觀看紀錄 (例如以 navigator.sendBeacon)，只進入緩衝計數器。
+        - POST /api/novels/{novel_pk}/chapters/{pk}/view/
+        """
+        novel_pk, pk = self.kwargs['novel_pk'], self.kwargs['pk']
+        try:
+            exists = Chapter.objects.filter(pk=pk, novel_id=novel_pk).exists()
+        except ValueError:
+            exists = False
+        if not exists:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        record_chapter_view(int(novel_pk), int(pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.action == 'bundle' and response.status_code == 200:
+            # 章節包只在這裡壓縮 (客戶端支援 gzip 時)，其餘端點維持原樣
+            response.render()
+            response = GZipMiddleware(lambda request: response).process_response(request, response)
+        return response
+
+    @action(detail=False, methods=['get'])
+    def search(self, request, *args, **kwargs):
+        """
+        在單一小說的章節內文中搜尋，結果依章節順序排列，方便找出第一次出現的位置。
+        作者本人也可以搜尋到自己的草稿。
+        - GET /api/novels/{novel_pk}/chapters/search/?q=...
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'q': '搜尋字詞是必填的。'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_queryset()
+        is_owner = request.user.is_authenticated and Novel.objects.filter(
+            pk=self.kwargs.get('novel_pk'), author__user=request.user
+        ).exists()
+        if not is_owner:
+            queryset = queryset.filter(status=Chapter.Status.PUBLISHED)
+
+        queryset = search_chapters(queryset, text).select_related('novel', 'body').order_by('order')
+        page = self.paginate_queryset(queryset)
+        context = self.get_serializer_context()
+        context['search_text'] = text
+        serializer = ChapterSearchResultSerializer(page, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='reading-order')
+    def reading_order(self, request, *args, **kwargs):
+        """
+        回傳整本小說已發布章節的閱讀順序，供閱讀器預先載入後續章節。
+        - GET /api/novels/{novel_pk}/chapters/reading-order/
+        """
+        try:
+            novel = Novel.objects.only('id', 'updated_at').get(pk=self.kwargs.get('novel_pk'))
+        except Novel.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'novel': novel.pk,
+            'chapter_ids': get_reading_order(novel).chapter_ids,
+        })
+
     def perform_create(self, serializer):
         novel = Novel.objects.get(pk=self.kwargs['novel_pk'])
 
@@ -455,7 +903,8 @@ class AdminViewSet(viewsets.ViewSet):
             'novel_count': novel_count,
             'chapter_count': chapter_count,
             'total_views': total_views,
-            'server_load': load_avg
+            'server_load': load_avg,
+            'novel_list_cache': list_cache_stats(),
         })
 
     @action(detail=False, methods=['get'])
@@ -4,6 +4,9 @@ export interface Author {
   username: string;
 }
 
+// 圖片的 WebP/AVIF 衍生版本 (srcset 字串)；尚未產生時為 null
+export type ImageVariants = { webp?: string; avif?: string } | null;
+
 // 新增 Chapter 介面
 export interface Chapter {
   id: number;
@@ -24,6 +27,7 @@ export interface Volume {
   chapters: Chapter[];
   description: string;
   cover_image: string | null;
+  cover_image_variants?: ImageVariants;
 }
 
 export interface Novel {
@@ -31,6 +35,7 @@ export interface Novel {
   title: string;
   description: string;
   cover_image: string | null;
+  cover_image_variants?: ImageVariants;
   status: 'ONGOING' | 'COMPLETED' | 'HIATUS';
   updated_at: string;
   created_at: string;
@@ -43,6 +48,54 @@ export interface Novel {
   category: string;
   latest_chapter?: string;
   latest_chapter_updated_at?: string;
+  chapter_count?: number; // 列表 API 才有：已發布章節數
+  bookmark_count?: number; // 列表 API 才有：收藏數
+}
+
+// GET /novels/batch/ 的回應：小說卡片與指定章節的標題
+export interface NovelBatchResponse {
+  novels: Novel[];
+  chapters: { [chapterId: string]: { title: string; novel: number } };
+}
+
+export type LeaderboardBoard = 'views' | 'bookmarks';
+export type LeaderboardPeriod = 'daily' | 'weekly' | 'monthly' | 'all_time';
+
+// GET /leaderboards/ 的回應：預先計算好的名次
+export interface LeaderboardResponse {
+  board: LeaderboardBoard;
+  period: LeaderboardPeriod;
+  computed_at: string | null;
+  results: { rank: number; score: number; novel: Novel }[];
+}
+
+// GET /analytics/author/ 的回應：作者所有小說的流量總覽
+export interface AuthorNovelSummary {
+  id: number;
+  title: string;
+  cover_image: string | null;
+  status: string;
+  views: number;
+  published_chapter_count: number;
+  bookmark_count: number;
+  range_views: number;
+  range_bookmarks: number;
+}
+
+export interface AuthorAnalyticsResponse {
+  start: string;
+  end: string;
+  totals: {
+    novels: number;
+    chapters: number;
+    views: number;
+    bookmarks: number;
+    range_views: number;
+    range_bookmarks: number;
+  };
+  novels: AuthorNovelSummary[];
+  top_chapters: { id: number; title: string; novel: number; novel_title: string; views: number; range_views: number }[];
+  daily: { date: string; views: number; bookmarks: number; total_bookmarks: number }[];
 }
 
 // API 回應的分頁格式
@@ -65,6 +118,7 @@ export interface SimpleNovel {
   id: number;
   title: string;
   cover_image: string | null;
+  cover_image_variants?: ImageVariants;
   status: 'ONGOING' | 'COMPLETED' | 'HIATUS';
   updated_at: string;
   description: string;
@@ -78,6 +132,7 @@ export interface AuthorProfile {
   pen_name: string;
   bio: string;
   avatar: string | null;
+  avatar_variants?: ImageVariants;
   role: 'READER' | 'AUTHOR' | 'ADMIN'; // 新增 role 屬性
   // 新增：小說列表
   novels: SimpleNovel[];
@@ -90,6 +145,7 @@ export interface UserProfile {
   pen_name?: string;
   bio?: string;
   avatar: string | null;
+  avatar_variants?: ImageVariants;
   role?: 'READER' | 'AUTHOR' | 'ADMIN';
 }
 
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
@@ -204,5 +205,44 @@ SIMPLE_JWT = {
     "USER_ID_CLAIM": "user_id",
 }
 
+# 觀看次數緩衝計數器的寫回週期 (秒)，設為 0 則每次閱讀直接寫回資料庫
+VIEW_COUNTER_FLUSH_INTERVAL = int(os.getenv('VIEW_COUNTER_FLUSH_INTERVAL', '10'))
+
+# 章節內文的壓縮格式：plain (不壓縮)、zlib 或 zstd (需安裝 zstandard)；小於門檻的內文不壓縮
+CHAPTER_CONTENT_CODEC = os.getenv('CHAPTER_CONTENT_CODEC', 'plain')
+CHAPTER_CONTENT_COMPRESS_MIN_BYTES = int(os.getenv('CHAPTER_CONTENT_COMPRESS_MIN_BYTES', '1024'))
+
+# 快取：default 供閱讀順序索引與 SEO meta 使用 (每個 worker 各自一份)；
+# responses 存放匿名小說列表的回應 (見 core/list_cache.py)，可改用檔案或 Redis 讓所有 worker 共用
+# RESPONSE_CACHE_BACKEND: locmem (預設)、file、redis (需安裝 redis 套件) 或 dummy (停用)
+_RESPONSE_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'novel-responses'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, 'response_cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'dummy': ('django.core.cache.backends.dummy.DummyCache', ''),
+}
+_response_cache_backend, _response_cache_location = _RESPONSE_CACHE_BACKENDS[
+    os.getenv('RESPONSE_CACHE_BACKEND', 'locmem')
+]
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': _response_cache_backend,
+        'LOCATION': os.getenv('RESPONSE_CACHE_LOCATION', _response_cache_location),
+        'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT', '60')),
+    },
+}
+
+# 作者流量總覽的快取秒數 (存放在 responses 快取)，設為 0 則每次重新計算
+AUTHOR_ANALYTICS_CACHE_TIMEOUT = int(os.getenv('AUTHOR_ANALYTICS_CACHE_TIMEOUT', '60'))
+
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# gc_orphan_media 指令搬移孤立檔案的目錄，放在 MEDIA_ROOT 之外 (不會被備份或再次掃描)
+MEDIA_QUARANTINE_ROOT = os.getenv('MEDIA_QUARANTINE_ROOT', os.path.join(BASE_DIR, 'media_quarantine'))
+
+# 離線閱讀匯出檔 (EPUB/zip) 的快取目錄，放在 MEDIA_ROOT 之外，只經由匯出端點下載
+EXPORT_ROOT = os.getenv('EXPORT_ROOT', os.path.join(BASE_DIR, 'exports'))
\ No newline at end of file
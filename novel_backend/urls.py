@@ -3,7 +3,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from django.http import HttpResponse
-from core.seo_views import packet_novel_seo, packet_sitemap, packet_author_seo, packet_general_seo
+from core.seo_views import packet_novel_seo, packet_author_seo, packet_general_seo
+from core.sitemaps import sitemap_index, sitemap_section
 
 def metrics_view(request):
     """A simple view to handle /metrics requests from monitoring systems."""
@@ -30,7 +31,8 @@ urlpatterns = [
     path('updates/', packet_general_seo),
     path('', packet_general_seo), # Home page
 
-    path('sitemap.xml', packet_sitemap), 
+    path('sitemap.xml', sitemap_index),
+    path('sitemap-<str:section>-<int:page>.xml', sitemap_section),
     # Handle /metrics requests to avoid 404 errors in logs
     path('metrics', metrics_view, name='metrics'),
 ]